@@ -2,19 +2,46 @@ import os
 import json
 import logging
 import re
-from typing import Optional, Dict, Any
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Callable, Tuple, Sequence
 import openai
 from dotenv import load_dotenv
+from pydantic import ValidationError
 from models import WeekData, NextWeekPlan
-from data_manager import DataManager
-from config import get_current_model
+from config import get_current_model, get_analysis_mode, MODEL_CONFIG
+from stream_json import WeekDataStreamParser
+from metrics import stage_timer, record_llm_usage
+
+# 周报生成的最大输出 token 数
+ANALYSIS_MAX_TOKENS = 6000
+# 修复调用只需要重新输出 JSON，不需要原始文档上下文
+REPAIR_MAX_TOKENS = 6000
+
+# 并行模式下的分区分组：组内字段互相关联放在同一次调用中，组间相互独立可并发生成
+SECTION_GROUPS = {
+    "facts": ("completed_tasks", "incomplete_tasks"),
+    "reflection": ("motivation_direction", "internal_reflection"),
+    "feedback": ("external_feedback",),
+    "plan": ("next_week_plan",),
+}
+# 单个分组的最大输出 token 数
+SECTION_MAX_TOKENS = 2000
+
+REPAIR_SYSTEM_PROMPT = (
+    "你是 JSON 修复助手。用户会提供一段不符合 Schema 的周报 JSON 和校验错误。"
+    "请只修复错误（补全被截断的结构、修正字段类型、补齐缺失的必填字段），不要改写或删减已有内容，"
+    "只输出修复后的 JSON 对象。"
+)
 
 logger = logging.getLogger(__name__)
 
 class AIAnalyzer:
-    def __init__(self):
-        self.data_manager = DataManager()
+    def __init__(self, usage_ledger=None):
         self._initialized = False
+        # 用量台账（可选），记录每次模型调用的 token 和耗时
+        self.usage_ledger = usage_ledger
 
     def _ensure_initialized(self):
         """确保OpenAI API key已配置"""
@@ -40,6 +67,152 @@ class AIAnalyzer:
             logger.info("OpenAI配置初始化成功")
             self._initialized = True
 
+    @staticmethod
+    def _strict_schema(schema: Any) -> Any:
+        """把 Pydantic 生成的 JSON Schema 转为严格模式：所有字段必填、禁止额外字段、去掉 default/title"""
+        if isinstance(schema, list):
+            return [AIAnalyzer._strict_schema(item) for item in schema]
+        if not isinstance(schema, dict):
+            return schema
+
+        strict = {
+            key: AIAnalyzer._strict_schema(value)
+            for key, value in schema.items()
+            if key not in ("default", "title")
+        }
+        if strict.get("type") == "object" and "properties" in strict:
+            strict["required"] = list(strict["properties"].keys())
+            strict["additionalProperties"] = False
+        return strict
+
+    def _week_data_schema(self, sections: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """由 WeekData 模型生成周报输出的 JSON Schema（week_period 由系统根据日期设置，不让模型生成）
+
+        sections 非空时只保留这些分区，用于并行模式下的分组生成
+        """
+        schema = WeekData.model_json_schema()
+        properties = schema["properties"]
+        properties.pop("week_period", None)
+        if sections:
+            schema["properties"] = {name: properties[name] for name in sections}
+        return self._strict_schema(schema)
+
+    def _response_format(self, model: str, sections: Optional[Sequence[str]] = None) -> Optional[Dict[str, Any]]:
+        """根据模型配置返回结构化输出参数"""
+        mode = MODEL_CONFIG.get(model, {}).get("structured_output")
+        if mode == "json_schema":
+            return {
+                "type": "json_schema",
+                "json_schema": {
+                    "name": "week_data" if not sections else "week_data_" + "_".join(sections),
+                    "schema": self._week_data_schema(sections),
+                    "strict": True
+                }
+            }
+        if mode == "json_object":
+            return {"type": "json_object"}
+        return None
+
+    def _chat_completion(self, model: str, messages: List[dict], max_tokens: int, **kwargs):
+        """调用 ChatCompletion，按模型配置选择输出长度参数"""
+        token_limit_param = MODEL_CONFIG.get(model, {}).get("token_limit_param", "max_tokens")
+        kwargs[token_limit_param] = max_tokens
+        return openai.ChatCompletion.create(model=model, messages=messages, **kwargs)
+
+    @staticmethod
+    def _usage(response) -> Dict[str, int]:
+        usage = response.get('usage', {}) or {}
+        return {
+            'prompt_tokens': usage.get('prompt_tokens', 0),
+            'completion_tokens': usage.get('completion_tokens', 0),
+            'total_tokens': usage.get('total_tokens', 0),
+            # 提示词缓存命中的 token 数
+            'cached_tokens': (usage.get('prompt_tokens_details') or {}).get('cached_tokens', 0)
+        }
+
+    @staticmethod
+    def _empty_usage() -> Dict[str, int]:
+        return {'prompt_tokens': 0, 'completion_tokens': 0, 'total_tokens': 0, 'cached_tokens': 0}
+
+    def _record_usage(self, model: str, purpose: str, usage: Dict[str, int], latency_seconds: float,
+                      usage_context: Optional[dict] = None):
+        """记录一次模型调用：运行指标 + 用量台账"""
+        record_llm_usage(model, purpose, usage)
+        if self.usage_ledger:
+            context = usage_context or {}
+            self.usage_ledger.record(
+                model, purpose, usage, latency_seconds,
+                project_id=context.get('project_id'), week=context.get('week')
+            )
+
+    def _validate_week_data(self, text: str, structured: bool) -> WeekData:
+        """解析并校验模型输出；结构化输出直接解析，否则先从文本中提取 JSON"""
+        if structured:
+            try:
+                return WeekData.model_validate_json(text)
+            except ValidationError as e:
+                # 结构化输出理论上总是合法 JSON；非法时（如被截断）交给下面的提取逻辑统一报错
+                if not any(error["type"] == "json_invalid" for error in e.errors()):
+                    raise
+        cleaned_text = self._extract_json_from_text(text)
+        return WeekData.model_validate(json.loads(cleaned_text))
+
+    def _repair_week_data(self, model: str, broken_text: str, error: Exception,
+                          sections: Optional[Sequence[str]] = None,
+                          usage_context: Optional[dict] = None) -> Optional[Dict[str, Any]]:
+        """针对性修复：只把出错的输出和错误信息发回模型，不重新发送文档内容"""
+        logger.warning("周报 JSON 校验失败，发起修复调用")
+        error_text = str(error)[:2000]
+        messages = [
+            {"role": "system", "content": REPAIR_SYSTEM_PROMPT},
+            {"role": "user", "content": f"校验错误：\n{error_text}\n\n待修复的 JSON：\n{broken_text}"}
+        ]
+        response_format = self._response_format(model, sections)
+        kwargs = {"response_format": response_format} if response_format else {}
+        try:
+            started = time.perf_counter()
+            with stage_timer("llm_repair"):
+                response = self._chat_completion(model, messages, REPAIR_MAX_TOKENS, **kwargs)
+            self._record_usage(model, "repair", self._usage(response), time.perf_counter() - started, usage_context)
+            repaired_text = response.choices[0].message.content.strip()
+            week_data = self._validate_week_data(repaired_text, response_format is not None)
+            logger.info("周报 JSON 修复成功")
+            return {'week_data': week_data, 'usage': self._usage(response)}
+        except Exception as e:
+            logger.error(f"周报 JSON 修复失败: {str(e)}")
+            return None
+
+    def _salvage_week_data(self, text: str) -> WeekData:
+        """修复失败时的兜底：逐项保留能通过校验的内容，而不是整份丢弃"""
+        try:
+            data = json.loads(self._extract_json_from_text(text))
+        except (json.JSONDecodeError, TypeError):
+            return WeekData()
+        if not isinstance(data, dict):
+            return WeekData()
+
+        salvaged = {}
+        for field_name, field in WeekData.model_fields.items():
+            value = data.get(field_name)
+            if value is None:
+                continue
+            if isinstance(value, list):
+                items = []
+                for item in value:
+                    try:
+                        WeekData.model_validate({field_name: [item]})
+                        items.append(item)
+                    except ValidationError:
+                        logger.debug(f"丢弃无法校验的 {field_name} 条目: {item}")
+                salvaged[field_name] = items
+            else:
+                try:
+                    WeekData.model_validate({field_name: value})
+                    salvaged[field_name] = value
+                except ValidationError:
+                    logger.debug(f"丢弃无法校验的字段 {field_name}")
+        return WeekData.model_validate(salvaged)
+
     def _load_prompt(self) -> str:
         """加载分析prompt"""
         prompt_path = os.path.join(os.path.dirname(__file__), "weekly_report_prompt.txt")
@@ -152,7 +325,9 @@ class AIAnalyzer:
             logger.error(f"JSON提取过程中发生错误: {str(e)}")
             return text
 
-    def analyze_html_contents(self, project_id: str, file_contents: list, previous_week_plan: Optional[list] = None) -> Dict[str, Any]:
+    def analyze_html_contents(self, project_id: str, file_contents: list, previous_week_plan: Optional[list] = None,
+                              on_section: Optional[Callable[[str, Any], None]] = None,
+                              week: Optional[int] = None) -> Dict[str, Any]:
         """分析多个文件内容生成周报（支持 html/txt/md），返回包含WeekData和统计信息的字典"""
         logger.info(f"开始分析项目 {project_id} 的 {len(file_contents)} 个文件")
 
@@ -166,17 +341,142 @@ class AIAnalyzer:
             file_summaries.append(f"文件 {i+1}: {filename} ({len(content)} 字符)")
 
             # 根据文件格式提取文本
-            text_content = self._extract_text_from_file(content, filename)
+            with stage_timer("text_extraction"):
+                text_content = self._extract_text_from_file(content, filename)
             merged_text_content += f"\n\n=== 文件: {filename} ===\n{text_content}"
 
         logger.info(f"文件摘要: {', '.join(file_summaries)}")
         logger.debug(f"合并后总文本内容长度: {len(merged_text_content)} 字符")
 
         # 使用原有的单文件分析逻辑
-        return self.analyze_html_content(project_id, merged_text_content, previous_week_plan)
+        return self.analyze_html_content(project_id, merged_text_content, previous_week_plan, on_section, week=week)
+
+    def _stream_completion(self, model: str, messages: List[dict], max_tokens: int,
+                           on_section: Callable[[str, Any], None], **kwargs) -> Tuple[str, Dict[str, int]]:
+        """流式调用模型，每个分区闭合时回调 on_section，返回完整输出文本和 token 统计"""
+        parser = WeekDataStreamParser()
+        usage = self._empty_usage()
+
+        response = self._chat_completion(
+            model, messages, max_tokens,
+            stream=True,
+            stream_options={"include_usage": True},
+            **kwargs
+        )
+        for chunk in response:
+            if chunk.get('usage'):
+                usage = self._usage(chunk)
+            choices = chunk.get('choices') or []
+            if not choices:
+                continue
+            content = choices[0].get('delta', {}).get('content')
+            if not content:
+                continue
+            for name, value in parser.feed(content):
+                logger.info(f"分区 {name} 已生成")
+                try:
+                    on_section(name, value)
+                except Exception as e:
+                    logger.error(f"处理分区 {name} 回调失败: {str(e)}")
+
+        return parser.text, usage
+
+    def _generate_week_data(self, model: str, messages: List[dict], max_tokens: int,
+                            sections: Optional[Sequence[str]] = None,
+                            on_section: Optional[Callable[[str, Any], None]] = None,
+                            usage_context: Optional[dict] = None) -> Tuple[WeekData, Dict[str, int], bool]:
+        """一次模型调用生成周报（或其中的若干分区），失败时修复/兜底，返回 (WeekData, token 统计, 是否经过修复)"""
+        # 结构化输出：由 WeekData 模型生成 JSON Schema 约束输出
+        response_format = self._response_format(model, sections)
+        kwargs = {"response_format": response_format} if response_format else {}
+        started = time.perf_counter()
+        try:
+            with stage_timer("llm_call"):
+                if on_section:
+                    result_text, usage = self._stream_completion(model, messages, max_tokens, on_section, **kwargs)
+                    result_text = result_text.strip()
+                else:
+                    response = self._chat_completion(model, messages, max_tokens, **kwargs)
+                    result_text = response.choices[0].message.content.strip()
+                    usage = self._usage(response)
+        except Exception:
+            record_llm_usage(model, "analysis", {}, outcome="error")
+            raise
+        self._record_usage(model, "analysis", usage, time.perf_counter() - started, usage_context)
+        logger.info("OpenAI API调用成功")
+        logger.debug(f"API响应长度: {len(result_text)} 字符")
 
-    def analyze_html_content(self, project_id: str, text_content: str, previous_week_plan: Optional[list] = None) -> Dict[str, Any]:
-        """分析文本内容生成周报（text_content 应该是已提取的纯文本），返回包含WeekData和统计信息的字典"""
+        try:
+            with stage_timer("json_parse"):
+                week_data = self._validate_week_data(result_text, response_format is not None)
+            logger.info("WeekData对象创建成功")
+            return week_data, usage, False
+        except (json.JSONDecodeError, ValidationError) as e:
+            logger.error(f"周报解析/校验错误: {str(e)[:500]}")
+            logger.debug(f"原始响应内容前200字符: {result_text[:200]}...")
+            logger.debug(f"原始响应内容后200字符: {result_text[-200:]}...")
+
+            repair_result = self._repair_week_data(model, result_text, e, sections, usage_context)
+            if repair_result:
+                for key in usage:
+                    usage[key] += repair_result['usage'][key]
+                return repair_result['week_data'], usage, True
+
+            logger.warning("修复失败，保留原始输出中能通过校验的部分")
+            return self._salvage_week_data(result_text), usage, False
+
+    def _generate_sections_parallel(self, model: str, messages: List[dict],
+                                    on_section: Optional[Callable[[str, Any], None]] = None,
+                                    usage_context: Optional[dict] = None) -> Tuple[WeekData, Dict[str, int], bool]:
+        """并行模式：各分组基于同一份上下文并发生成，合并为完整的 WeekData
+
+        耗时取决于最慢的分组而不是所有分区输出 token 之和。
+        """
+        callback = None
+        if on_section:
+            # 多个分组线程同时回调，串行化以免调用方并发写入
+            callback_lock = threading.Lock()
+
+            def locked_callback(name, value):
+                with callback_lock:
+                    on_section(name, value)
+
+            callback = locked_callback
+
+        def generate(sections: Sequence[str]):
+            group_messages = list(messages)
+            group_messages[-1] = {
+                "role": "user",
+                "content": messages[-1]["content"] + f"\n本次只需要输出以下字段：{', '.join(sections)}。其他字段由其他任务生成，不要输出。\n"
+            }
+            return self._generate_week_data(model, group_messages, SECTION_MAX_TOKENS, sections, callback, usage_context)
+
+        with ThreadPoolExecutor(max_workers=len(SECTION_GROUPS), thread_name_prefix="section") as executor:
+            futures = {
+                group: executor.submit(generate, sections)
+                for group, sections in SECTION_GROUPS.items()
+            }
+            results = {group: future.result() for group, future in futures.items()}
+
+        merged = {}
+        usage = self._empty_usage()
+        repaired = False
+        for group, (group_data, group_usage, group_repaired) in results.items():
+            for name in SECTION_GROUPS[group]:
+                merged[name] = getattr(group_data, name)
+            for key in usage:
+                usage[key] += group_usage[key]
+            repaired = repaired or group_repaired
+        return WeekData(**merged), usage, repaired
+
+    def analyze_html_content(self, project_id: str, text_content: str, previous_week_plan: Optional[list] = None,
+                             on_section: Optional[Callable[[str, Any], None]] = None,
+                             mode: Optional[str] = None, week: Optional[int] = None) -> Dict[str, Any]:
+        """分析文本内容生成周报（text_content 应该是已提取的纯文本），返回包含WeekData和统计信息的字典
+
+        传入 on_section 时使用流式输出，每个分区（completed_tasks 等）生成完毕即回调 on_section(分区名, 值)
+        mode 为 single（一次调用生成全部分区）或 parallel（分组并发生成），默认取配置
+        """
         logger.info(f"开始分析项目 {project_id} 的文本内容")
         logger.debug(f"文本内容长度: {len(text_content)} 字符")
 
@@ -217,71 +517,31 @@ class AIAnalyzer:
             current_model = get_current_model()
             logger.info(f"使用模型: {current_model}")
 
-            if current_model == "gpt-5-nano":
-                response = openai.ChatCompletion.create(
-                    model=current_model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    max_completion_tokens=6000
+            messages = [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ]
+            usage_context = {'project_id': project_id, 'week': week}
+            analysis_mode = mode or get_analysis_mode()
+            if analysis_mode == "parallel":
+                week_data, usage, repaired = self._generate_sections_parallel(
+                    current_model, messages, on_section, usage_context
                 )
             else:
-                response = openai.ChatCompletion.create(
-                    model=current_model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    max_tokens=6000
+                week_data, usage, repaired = self._generate_week_data(
+                    current_model, messages, ANALYSIS_MAX_TOKENS, on_section=on_section, usage_context=usage_context
                 )
+            logger.info(f"OpenAI API token使用统计（{analysis_mode}）: prompt={usage['prompt_tokens']}, completion={usage['completion_tokens']}, total={usage['total_tokens']}")
 
-            result_text = response.choices[0].message.content.strip()
-            logger.info("OpenAI API调用成功")
-            logger.debug(f"API响应长度: {len(result_text)} 字符")
-
-            # 获取token使用统计
-            usage = response.get('usage', {})
-            prompt_tokens = usage.get('prompt_tokens', 0)
-            completion_tokens = usage.get('completion_tokens', 0)
-            total_tokens = usage.get('total_tokens', 0)
-
-            logger.info(f"OpenAI API token使用统计: prompt={prompt_tokens}, completion={completion_tokens}, total={total_tokens}")
-
-            # 尝试解析JSON
-            try:
-                # 清理可能的前后缀和说明文字
-                cleaned_text = self._extract_json_from_text(result_text)
-                result_data = json.loads(cleaned_text)
-                logger.info("JSON解析成功")
-
-                # 转换为WeekData对象
-                week_data = WeekData(**result_data)
-                logger.info("WeekData对象创建成功")
-
-                # 返回包含WeekData和统计信息的字典
-                return {
-                    'week_data': week_data,
-                    'prompt_length': total_prompt_length,
-                    'prompt_tokens': prompt_tokens,
-                    'completion_tokens': completion_tokens,
-                    'total_tokens': total_tokens
-                }
-
-            except json.JSONDecodeError as e:
-                logger.error(f"JSON解析错误: {e}")
-                logger.error(f"清理后的内容: {cleaned_text[:500]}...")
-                logger.error(f"原始响应内容前200字符: {result_text[:200]}...")
-                logger.error(f"原始响应内容后200字符: {result_text[-200:]}...")
-                # 返回默认数据
-                logger.warning("JSON解析失败，返回默认的WeekData对象")
-                return {
-                    'week_data': WeekData(),
-                    'prompt_length': total_prompt_length,
-                    'prompt_tokens': prompt_tokens,
-                    'completion_tokens': completion_tokens,
-                    'total_tokens': total_tokens
-                }
+            # 返回包含WeekData和统计信息的字典
+            return {
+                'week_data': week_data,
+                'prompt_length': total_prompt_length,
+                'prompt_tokens': usage['prompt_tokens'],
+                'completion_tokens': usage['completion_tokens'],
+                'total_tokens': usage['total_tokens'],
+                'repaired': repaired
+            }
 
         except Exception as e:
             logger.error(f"调用OpenAI API时发生错误: {str(e)}")
@@ -294,7 +554,8 @@ class AIAnalyzer:
                 'prompt_length': 0,
                 'prompt_tokens': 0,
                 'completion_tokens': 0,
-                'total_tokens': 0
+                'total_tokens': 0,
+                'repaired': False
             }
 
     def update_week_data_with_plan(self, week_data: WeekData, next_week_plan: list) -> WeekData:
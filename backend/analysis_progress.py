@@ -0,0 +1,136 @@
+"""
+周报分析进度
+后台分析线程写入已完成的分区，SSE 接口读取并推送给前端；分析结束后保留一段时间供晚到的订阅者读取结果。
+指定 data_dir 时进度同时写入 data/progress/，SSE 请求落在其他 worker 进程上也能读到。
+"""
+import os
+import json
+import time
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+
+logger = logging.getLogger(__name__)
+
+# 已结束任务的保留时间（秒）
+FINISHED_TTL_SECONDS = 600
+# 其他进程的任务超过这么久没有更新视为已中断（进程退出等）
+STALE_RUNNING_SECONDS = 1800
+
+
+class AnalysisProgress:
+    """按 (项目, 周) 记录正在进行的分析"""
+
+    def __init__(self, data_dir: Optional[str] = None):
+        self._jobs: Dict[Tuple[str, int], dict] = {}
+        self._lock = threading.Lock()
+        self.progress_dir = os.path.join(data_dir, "progress") if data_dir else None
+
+    def _path(self, key: Tuple[str, int]) -> str:
+        return os.path.join(self.progress_dir, f"{key[0]}_week_{key[1]}.json")
+
+    def _persist(self, key: Tuple[str, int], job: dict):
+        """写入共享的进度文件（调用方持有 self._lock）"""
+        if not self.progress_dir:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.progress_dir, exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(jsonable_encoder(job), f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # 只影响其他 worker 上的进度推送，不影响分析本身
+            logger.warning(f"写入分析进度失败: {str(e)}")
+
+    def _prune(self):
+        now = time.time()
+        expired = [
+            key for key, job in self._jobs.items()
+            if job["status"] != "running" and now - job["updated_at"] > FINISHED_TTL_SECONDS
+        ]
+        for key in expired:
+            del self._jobs[key]
+
+    def start(self, project_id: str, week: int):
+        """开始一次分析（覆盖该周之前的记录）"""
+        with self._lock:
+            self._prune()
+            key = (project_id, week)
+            self._jobs[key] = {
+                "status": "running",
+                "base": {},
+                "sections": {},
+                "error": None,
+                "version": 0,
+                "updated_at": time.time()
+            }
+            self._persist(key, self._jobs[key])
+
+    def set_base(self, project_id: str, week: int, base: dict):
+        """记录分析开始时的周报内容（更新当前周时为已有内容，新周为空白周报），与已完成的分区合成部分结果"""
+        with self._lock:
+            key = (project_id, week)
+            job = self._jobs.get(key)
+            if not job:
+                return
+            job["base"] = base
+            job["version"] += 1
+            job["updated_at"] = time.time()
+            self._persist(key, job)
+
+    def update_section(self, project_id: str, week: int, name: str, value: Any):
+        """记录一个已完成的分区"""
+        with self._lock:
+            key = (project_id, week)
+            job = self._jobs.get(key)
+            if not job:
+                return
+            job["sections"][name] = value
+            job["version"] += 1
+            job["updated_at"] = time.time()
+            self._persist(key, job)
+
+    def finish(self, project_id: str, week: int, error: Optional[str] = None):
+        """分析结束（error 非空表示失败）"""
+        with self._lock:
+            key = (project_id, week)
+            job = self._jobs.get(key)
+            if not job:
+                return
+            job["status"] = "failed" if error else "completed"
+            job["error"] = error
+            job["version"] += 1
+            job["updated_at"] = time.time()
+            self._persist(key, job)
+
+    def snapshot(self, project_id: str, week: int) -> Optional[dict]:
+        """当前进度的浅拷贝；没有记录时返回 None
+
+        本进程正在运行的任务直接读内存，其余情况读取进度文件（该周可能已由其他 worker 重新分析）。
+        """
+        with self._lock:
+            job = self._jobs.get((project_id, week))
+            if job and (job["status"] == "running" or not self.progress_dir):
+                return {**job, "sections": dict(job["sections"])}
+        if not self.progress_dir:
+            return None
+
+        try:
+            with open(self._path((project_id, week)), "r", encoding="utf-8") as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        age = time.time() - job["updated_at"]
+        ttl = STALE_RUNNING_SECONDS if job["status"] == "running" else FINISHED_TTL_SECONDS
+        return job if age <= ttl else None
+
+    def partial_week(self, project_id: str, week: int) -> Optional[dict]:
+        """正在分析的周报的部分结果（分析开始时的内容 + 已完成的分区），没有进行中的分析时返回 None"""
+        snapshot = self.snapshot(project_id, week)
+        if not snapshot or snapshot["status"] != "running":
+            return None
+        return {**snapshot.get("base", {}), **snapshot["sections"]}
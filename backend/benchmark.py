@@ -0,0 +1,736 @@
+"""
+性能基准测试
+基于本地模拟 LLM（fake_llm.py）对比不同实现的耗时，不消耗真实模型额度。
+
+用法：
+    python benchmark.py analysis --runs 3 --tokens-per-second 600 --section-tokens 1000
+    python benchmark.py upload --uploads 20 --files 20 --file-chars 20000
+    python benchmark.py suite --corpora small medium huge --output report.json --compare last_release.json
+
+suite 依次运行 pipeline（上传 / 分析下一周端到端吞吐）、datamanager（项目数扩展到 1 万时的读写延迟）、
+storage（projects.json 各存储格式的保存/加载耗时和文件大小）、
+files（周文档按原文件存放与 blob 存储的磁盘占用和读取延迟）、extraction（文本提取 MB/s）
+和 chat（聊天接口首字节时间），结果写入 JSON 报告，
+指定 --compare 时与上一次的报告逐项对比。各子命令也可以单独运行，并同样支持 --output。
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import subprocess
+import atexit
+import random
+import socket
+import platform
+import threading
+import http.client
+import statistics
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import openai
+
+from fake_llm import FakeLLMServer, DEFAULT_SECTIONS, build_output
+from synthetic_corpus import CORPUS_PRESETS, notion_corpus, corpus_bytes
+
+
+def _sample_document(chars: int) -> str:
+    """生成指定长度的示例周文档"""
+    lines = []
+    index = 1
+    while sum(len(line) + 1 for line in lines) < chars:
+        lines.append(f"- [x] 任务 {index}：完成模块 {index} 的开发与联调，记录遇到的问题和下一步安排")
+        index += 1
+    return "# 本周进展\n" + "\n".join(lines)
+
+
+def _summary(durations: List[float]) -> dict:
+    return {
+        "mean": statistics.mean(durations),
+        "p50": statistics.median(durations),
+        "min": min(durations),
+        "max": max(durations),
+    }
+
+
+@contextmanager
+def _fake_llm(args):
+    """启动模拟 LLM 并让 openai 客户端指向它（--api-base 指定时使用已有服务）"""
+    server = None
+    if getattr(args, "api_base", None):
+        openai.api_base = args.api_base
+    else:
+        server = FakeLLMServer(
+            latency=args.latency,
+            tokens_per_second=args.tokens_per_second,
+            section_tokens=args.section_tokens
+        ).start()
+        openai.api_base = server.api_base
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    try:
+        yield server
+    finally:
+        if server:
+            server.stop()
+
+
+_app_module = None
+
+
+def _load_app():
+    """导入应用（数据目录指向进程退出时删除的临时目录）；应用的全局状态在导入时创建，同一进程只导入一次"""
+    global _app_module
+    if _app_module is None:
+        work_dir = tempfile.mkdtemp(prefix="teamie-benchmark-")
+        atexit.register(shutil.rmtree, work_dir, True)
+        os.environ["DATA_DIR"] = os.path.join(work_dir, "data")
+        os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+        import main as app_main
+        _app_module = app_main
+    return _app_module
+
+
+@contextmanager
+def _serve(app):
+    """在后台线程中用 uvicorn 运行应用，返回基础地址（用于测量真实连接上的首字节时间）"""
+    import uvicorn
+
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, name="benchmark-uvicorn", daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("uvicorn 启动失败")
+        time.sleep(0.01)
+    try:
+        yield "127.0.0.1", port
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+def _multipart_files(corpus: List[dict]) -> list:
+    return [("files", (item["filename"], item["content"].encode("utf-8"), "text/html" if item["filename"].endswith(".html") else "text/markdown"))
+            for item in corpus]
+
+
+def run_pipeline_benchmark(args) -> dict:
+    """/api/upload 与 analyze-next-week 的端到端吞吐（请求 + 后台保存文件 + 模拟周报生成 + 持久化）"""
+    from fastapi.testclient import TestClient
+
+    results = {}
+    with _fake_llm(args):
+        client = TestClient(_load_app().app)
+        for preset in args.corpora:
+            corpus = notion_corpus(preset, seed=args.seed)
+            size = corpus_bytes(corpus)
+            data = {"week_start_date": "2025-01-06"}
+            file_paths = [item["relative_path"] or "" for item in corpus]
+
+            upload_durations, next_week_durations = [], []
+            for run in range(args.runs):
+                # TestClient 同步执行后台任务，因此耗时覆盖整条 ingest-analyze-persist 流水线
+                started = time.perf_counter()
+                response = client.post("/api/upload", files=_multipart_files(corpus),
+                                       data={**data, "project_name": f"{preset}-{run}", "file_paths": file_paths})
+                upload_durations.append(time.perf_counter() - started)
+                response.raise_for_status()
+                project_id = response.json()["project_id"]
+
+                started = time.perf_counter()
+                response = client.post(f"/api/projects/{project_id}/analyze-next-week", files=_multipart_files(corpus),
+                                       data={"week_start_date": "2025-01-13", "file_paths": file_paths})
+                next_week_durations.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+            results[preset] = {
+                "files": len(corpus),
+                "bytes": size,
+                "upload": {**_summary(upload_durations), "mb_per_second": size / statistics.mean(upload_durations) / 1e6},
+                "analyze_next_week": {**_summary(next_week_durations),
+                                      "mb_per_second": size / statistics.mean(next_week_durations) / 1e6},
+            }
+
+    print(f"\n端到端流水线（runs={args.runs}, 模拟 LLM latency={args.latency}s, {args.tokens_per_second:g} tokens/s）")
+    print(f"{'语料':<8}{'文件数':>8}{'MB':>8}{'上传(s)':>10}{'上传MB/s':>10}{'下一周(s)':>11}{'下一周MB/s':>11}")
+    for preset, stats in results.items():
+        print(f"{preset:<8}{stats['files']:>8}{stats['bytes'] / 1e6:>8.2f}{stats['upload']['mean']:>10.2f}"
+              f"{stats['upload']['mb_per_second']:>10.2f}{stats['analyze_next_week']['mean']:>11.2f}"
+              f"{stats['analyze_next_week']['mb_per_second']:>11.2f}")
+    return results
+
+
+def _seed_projects(data_manager, count: int, week_data):
+    """一次事务写入 count 个项目（与逐个 create_project 得到的存储内容相同）"""
+    from models import Project
+
+    with data_manager.transaction() as projects:
+        for index in range(len(projects), count):
+            project_id = f"project_{index + 1}"
+            projects[project_id] = Project(id=project_id, name=f"项目 {index + 1}", weeks={1: week_data.model_copy()})
+            data_manager._mark_dirty(project_id, [1])
+
+
+def run_datamanager_benchmark(args) -> dict:
+    """DataManager 各读写操作的延迟随项目数的变化"""
+    from data_manager import DataManager
+    from models import WeekData
+
+    week_data = WeekData(**json.loads(build_output(DEFAULT_SECTIONS, args.section_tokens)))
+    document = _sample_document(args.file_chars)
+    rng = random.Random(args.seed)
+    work_dir = tempfile.mkdtemp(prefix="teamie-datamanager-")
+    results = {}
+    try:
+        manager = DataManager(os.path.join(work_dir, "data"))
+        for count in sorted(args.project_counts):
+            _seed_projects(manager, count, week_data)
+            manager.save_file_content("project_1", document, "周会纪要.md", week=1)
+            operations = {
+                "get_project": lambda: manager.get_project(f"project_{rng.randint(1, count)}"),
+                "project_exists": lambda: manager.project_exists(f"project_{rng.randint(1, count)}"),
+                "get_project_meta": lambda: manager.get_project_meta(f"project_{rng.randint(1, count)}"),
+                "get_week_data": lambda: manager.get_week_data(f"project_{rng.randint(1, count)}", 1),
+                "get_all_projects": manager.get_all_projects,
+                "get_dashboard": manager.get_dashboard,
+                "update_week_data": lambda: manager.update_week_data(f"project_{rng.randint(1, count)}", 1, week_data),
+                "save_file_content": lambda: manager.save_file_content(
+                    f"project_{rng.randint(1, count)}", document, "周会纪要.md", week=1),
+                "get_file_content_by_name": lambda: manager.get_file_content_by_name("project_1", 1, "周会纪要.md"),
+            }
+            stats = {}
+            for name, operation in operations.items():
+                durations = []
+                for _ in range(args.repeats):
+                    started = time.perf_counter()
+                    operation()
+                    durations.append(time.perf_counter() - started)
+                stats[name] = _summary(durations)
+            stats["projects_file_bytes"] = os.path.getsize(manager.projects_file)
+            results[str(count)] = stats
+            # create_project 会增加项目数，放在最后测量且只执行一次
+            started = time.perf_counter()
+            manager.create_project("benchmark")
+            stats["create_project"] = _summary([time.perf_counter() - started])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    names = [name for name in next(iter(results.values())) if name != "projects_file_bytes"]
+    print(f"\nDataManager 延迟（毫秒，平均值，repeats={args.repeats}）")
+    print(f"{'操作':<26}" + "".join(f"{count + '个项目':>14}" for count in results))
+    for name in names:
+        print(f"{name:<26}" + "".join(f"{stats[name]['mean'] * 1000:>14.2f}" for stats in results.values()))
+    return results
+
+
+def _legacy_save(projects, path: str):
+    """改动前的保存方式（dict + 缩进 JSON），作为存储格式对比的基线"""
+    data = {project_id: project.model_dump() for project_id, project in projects.items()}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+
+
+def _legacy_load(path: str):
+    from models import Project
+
+    with open(path, "r", encoding="utf-8") as f:
+        return {project_id: Project(**data) for project_id, data in json.load(f).items()}
+
+
+def run_storage_benchmark(args) -> dict:
+    """projects.json 各存储格式的保存/加载耗时和文件大小"""
+    from models import Project, WeekData
+    from storage_format import dump_projects, load_projects, orjson
+
+    week_data = WeekData(**json.loads(build_output(DEFAULT_SECTIONS, args.section_tokens)))
+    work_dir = tempfile.mkdtemp(prefix="teamie-storage-")
+
+    def save_with(storage_format):
+        def save(projects, path):
+            with open(path, "wb") as f:
+                f.write(dump_projects(projects, storage_format))
+        return save
+
+    def load(path):
+        with open(path, "rb") as f:
+            return load_projects(f.read())
+
+    formats = {
+        "baseline": (_legacy_save, _legacy_load),
+        "json": (save_with("json"), load),
+        "compact": (save_with("compact"), load),
+    }
+    results = {}
+    try:
+        for count in sorted(args.project_counts):
+            projects = {
+                f"project_{index}": Project(id=f"project_{index}", name=f"项目 {index}", weeks={1: week_data.model_copy()})
+                for index in range(1, count + 1)
+            }
+            stats = {}
+            for name, (save, load_fn) in formats.items():
+                path = os.path.join(work_dir, f"{name}.json")
+                save_durations, load_durations = [], []
+                for _ in range(args.repeats):
+                    started = time.perf_counter()
+                    save(projects, path)
+                    save_durations.append(time.perf_counter() - started)
+                    started = time.perf_counter()
+                    loaded = load_fn(path)
+                    load_durations.append(time.perf_counter() - started)
+                assert len(loaded) == count
+                stats[name] = {
+                    "save": _summary(save_durations),
+                    "load": _summary(load_durations),
+                    "file_bytes": os.path.getsize(path),
+                }
+            results[str(count)] = stats
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n项目存储格式（毫秒，平均值，repeats={args.repeats}，orjson {'已安装' if orjson else '未安装'}）")
+    print(f"{'项目数':<10}{'格式':<10}{'保存':>12}{'加载':>12}{'文件MB':>10}")
+    for count, stats in results.items():
+        for name, item in stats.items():
+            print(f"{count:<10}{name:<10}{item['save']['mean'] * 1000:>12.1f}{item['load']['mean'] * 1000:>12.1f}"
+                  f"{item['file_bytes'] / 1e6:>10.2f}")
+    return results
+
+
+def _disk_bytes(path: str) -> int:
+    """目录中全部文件占用的字节数"""
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+def run_files_benchmark(args) -> dict:
+    """周文档的磁盘占用和读取延迟：旧的按周目录存原文件 vs 压缩的内容寻址 blob 存储
+
+    模拟每周重新上传一次 Notion 导出，其中约 80% 的文档与上周相同。
+    """
+    from blob_store import BlobStore
+    from file_catalog import FileCatalog
+
+    rng = random.Random(args.seed)
+    corpus = notion_corpus(args.corpora[0], seed=args.seed)
+    weeks = []
+    for week in range(1, args.weeks + 1):
+        changed = notion_corpus(args.corpora[0], seed=args.seed + week)
+        weeks.append([
+            dict(item, content=changed[index]["content"]) if week > 1 and rng.random() < 0.2 else item
+            for index, item in enumerate(corpus)
+        ])
+
+    def rel_path(item):
+        return f"{item['relative_path']}/{item['filename']}" if item["relative_path"] else item["filename"]
+
+    work_dir = tempfile.mkdtemp(prefix="teamie-files-")
+    results = {}
+    try:
+        raw_dir = os.path.join(work_dir, "raw")
+        started = time.perf_counter()
+        for week, items in enumerate(weeks, start=1):
+            for item in items:
+                path = os.path.join(raw_dir, "project_1", f"week_{week}", rel_path(item))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(item["content"])
+        raw_write = time.perf_counter() - started
+
+        blob_dir = os.path.join(work_dir, "blob")
+        catalog = FileCatalog(blob_dir, BlobStore(blob_dir))
+        started = time.perf_counter()
+        for week, items in enumerate(weeks, start=1):
+            for item in items:
+                catalog.write("project_1", week, rel_path(item), item["content"].encode("utf-8"))
+        blob_write = time.perf_counter() - started
+
+        samples = [(rng.randint(1, args.weeks), rel_path(rng.choice(corpus))) for _ in range(args.repeats * 20)]
+        raw_durations, blob_durations = [], []
+        for week, path in samples:
+            started = time.perf_counter()
+            with open(os.path.join(raw_dir, "project_1", f"week_{week}", path), "rb") as f:
+                f.read()
+            raw_durations.append(time.perf_counter() - started)
+            started = time.perf_counter()
+            assert catalog.read("project_1", week, path) is not None
+            blob_durations.append(time.perf_counter() - started)
+
+        results = {
+            "content_bytes": sum(corpus_bytes(items) for items in weeks),
+            "raw": {"disk_bytes": _disk_bytes(raw_dir), "write_s": raw_write, "read": _summary(raw_durations)},
+            "blob": {"disk_bytes": _disk_bytes(blob_dir), "write_s": blob_write, "read": _summary(blob_durations)},
+        }
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n周文档存储（语料 {args.corpora[0]}，{args.weeks} 周，原始内容 {results['content_bytes'] / 1e6:.2f} MB）")
+    print(f"{'方式':<8}{'磁盘MB':>10}{'写入秒':>10}{'读取ms(均值)':>14}{'读取ms(p50)':>14}")
+    for name in ("raw", "blob"):
+        item = results[name]
+        print(f"{name:<8}{item['disk_bytes'] / 1e6:>10.2f}{item['write_s']:>10.2f}"
+              f"{item['read']['mean'] * 1000:>14.3f}{item['read']['p50'] * 1000:>14.3f}")
+    return results
+
+
+def run_extraction_benchmark(args) -> dict:
+    """按文件格式统计文本提取速度（MB/s，按输入的 UTF-8 字节数计算）"""
+    from ai_analyzer import AIAnalyzer
+
+    analyzer = AIAnalyzer()
+    results = {}
+    for preset in args.corpora:
+        corpus = notion_corpus(preset, seed=args.seed)
+        by_format: Dict[str, dict] = {}
+        for item in corpus:
+            fmt = item["filename"].rsplit(".", 1)[-1]
+            entry = by_format.setdefault(fmt, {"files": 0, "bytes": 0, "seconds": 0.0})
+            started = time.perf_counter()
+            for _ in range(args.repeats):
+                analyzer._extract_text_from_file(item["content"], item["filename"])
+            entry["seconds"] += (time.perf_counter() - started) / args.repeats
+            entry["files"] += 1
+            entry["bytes"] += len(item["content"].encode("utf-8"))
+        for entry in by_format.values():
+            entry["mb_per_second"] = entry["bytes"] / entry["seconds"] / 1e6 if entry["seconds"] else None
+        results[preset] = by_format
+
+    print(f"\n文本提取速度（MB/s，repeats={args.repeats}）")
+    print(f"{'语料':<8}" + "".join(f"{fmt:>10}" for fmt in ("html", "md")))
+    for preset, by_format in results.items():
+        print(f"{preset:<8}" + "".join(f"{(by_format.get(fmt) or {}).get('mb_per_second') or 0:>10.2f}" for fmt in ("html", "md")))
+    return results
+
+
+def run_chat_benchmark(args) -> dict:
+    """/api/ai/chat 的首字节时间（TTFB）：应用通过 uvicorn 在真实连接上提供服务"""
+    with _fake_llm(args):
+        app_main = _load_app()
+        # 准备一个带周报和文档的项目，让聊天请求走完整的上下文构建路径
+        week_data_json = json.loads(build_output(DEFAULT_SECTIONS, args.section_tokens))
+        project_id = app_main.data_manager.create_project("chat-benchmark", app_main.WeekData(**week_data_json))
+        app_main.data_manager.save_file_content(project_id, _sample_document(args.file_chars), "周会纪要.md", week=1)
+        payload = json.dumps({
+            "message": "请根据 @周会纪要.md 优化本周的完成任务描述",
+            "context": {"focused_section": "completed_tasks"},
+            "project_id": project_id,
+            "week": 1,
+        }, ensure_ascii=False).encode("utf-8")
+
+        ttfb, totals = [], []
+        with _serve(app_main.app) as (host, port):
+            for _ in range(args.requests):
+                connection = http.client.HTTPConnection(host, port, timeout=60)
+                started = time.perf_counter()
+                connection.request("POST", "/api/ai/chat", body=payload, headers={"Content-Type": "application/json"})
+                response = connection.getresponse()
+                ttfb.append(time.perf_counter() - started)
+                response.read()
+                totals.append(time.perf_counter() - started)
+                connection.close()
+                if response.status != 200:
+                    raise RuntimeError(f"聊天接口返回 {response.status}")
+
+    results = {"ttfb": _summary(ttfb), "total": _summary(totals), "requests": args.requests}
+    print(f"\n聊天接口（requests={args.requests}, 模拟 LLM latency={args.latency}s）")
+    print(f"TTFB 平均 {results['ttfb']['mean'] * 1000:.1f} ms（p50 {results['ttfb']['p50'] * 1000:.1f} ms）, "
+          f"完整响应平均 {results['total']['mean'] * 1000:.1f} ms")
+    return results
+
+
+SUITE_BENCHMARKS = {
+    "pipeline": run_pipeline_benchmark,
+    "datamanager": run_datamanager_benchmark,
+    "storage": run_storage_benchmark,
+    "files": run_files_benchmark,
+    "extraction": run_extraction_benchmark,
+    "chat": run_chat_benchmark,
+}
+
+
+def run_suite(args) -> dict:
+    """依次运行各项基准测试，汇总为一份报告"""
+    return {name: SUITE_BENCHMARKS[name](args) for name in args.benchmarks}
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        completed = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=os.path.dirname(os.path.abspath(__file__)),
+                                   stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, timeout=10)
+        return completed.stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _flatten(value, prefix: str = "") -> Dict[str, float]:
+    """把嵌套结果展开为 {"pipeline.small.upload.mean": 1.2, ...}，只保留数值"""
+    if isinstance(value, dict):
+        flat = {}
+        for key, item in value.items():
+            flat.update(_flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+        return flat
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return {prefix: float(value)}
+    return {}
+
+
+def _print_comparison(results: dict, baseline_path: str, threshold: float):
+    """与基线报告对比：耗时类指标增大、速度类指标（*_per_second）减小超过阈值时标记为回退"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = _flatten(json.load(f).get("results", {}))
+    current = _flatten(results)
+
+    print(f"\n与基线 {baseline_path} 对比（阈值 {threshold:.0%}）")
+    regressions = 0
+    for key in sorted(current):
+        if key not in baseline or not baseline[key]:
+            continue
+        if key.endswith((".min", ".max", ".files", ".bytes", ".requests")):
+            continue
+        change = (current[key] - baseline[key]) / baseline[key]
+        higher_is_better = key.endswith("per_second")
+        regressed = change < -threshold if higher_is_better else change > threshold
+        regressions += regressed
+        if regressed or abs(change) > threshold:
+            print(f"{'回退' if regressed else '提升'}  {key}: {baseline[key]:.4g} -> {current[key]:.4g} ({change:+.1%})")
+    print(f"共 {regressions} 项回退")
+
+
+def write_report(args, results: dict):
+    """写入 JSON 报告（含运行环境和参数，便于不同版本间对比）"""
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "command": args.command,
+            "parameters": {key: value for key, value in vars(args).items() if key not in ("func", "output", "compare")},
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n报告已写入 {args.output}")
+
+
+def run_analysis_benchmark(args) -> dict:
+    """对比 single（一次生成全部分区）和 parallel（分组并发生成）两种模式的墙钟耗时"""
+    from ai_analyzer import AIAnalyzer
+    analyzer = AIAnalyzer()
+    document = _sample_document(args.doc_chars)
+
+    results = {}
+    with _fake_llm(args):
+        for mode in args.modes:
+            durations = []
+            completion_tokens = 0
+            for _ in range(args.runs):
+                started = time.perf_counter()
+                result = analyzer.analyze_html_content("benchmark", document, mode=mode)
+                durations.append(time.perf_counter() - started)
+                completion_tokens = result["completion_tokens"]
+            results[mode] = {**_summary(durations), "completion_tokens": completion_tokens}
+
+    print(f"\n周报生成耗时（runs={args.runs}, latency={args.latency}s, "
+          f"{args.tokens_per_second:g} tokens/s, 每分区 {args.section_tokens} tokens）")
+    print(f"{'模式':<10}{'平均(s)':>10}{'最小(s)':>10}{'最大(s)':>10}{'输出tokens':>12}")
+    for mode, stats in results.items():
+        print(f"{mode:<10}{stats['mean']:>10.2f}{stats['min']:>10.2f}{stats['max']:>10.2f}{stats['completion_tokens']:>12}")
+    if "single" in results and "parallel" in results and results["parallel"]["mean"] > 0:
+        print(f"parallel 加速比: {results['single']['mean'] / results['parallel']['mean']:.2f}x")
+    return results
+
+
+# 上传基准对比的日志配置：legacy 为同步写日志 + 调试级别明细 + 写后回读校验（等同于调整前的行为）
+UPLOAD_LOG_PROFILES = {
+    "legacy": {"LOG_ASYNC": "0", "LOG_LEVELS": "main=DEBUG,data_manager=DEBUG", "LOG_SAMPLE_EVERY": "1",
+               "DEBUG_VERIFY_WRITES": "1"},
+    "async": {"LOG_ASYNC": "1", "LOG_LEVELS": "", "DEBUG_VERIFY_WRITES": "0"},
+}
+
+
+def _run_upload_profile(args) -> dict:
+    """在子进程中执行：按当前环境变量中的日志配置导入应用，测量上传和文件编辑吞吐"""
+    server = FakeLLMServer(latency=0, tokens_per_second=1e6, section_tokens=20).start()
+    openai.api_base = server.api_base
+
+    from fastapi.testclient import TestClient
+    import main as app_main
+
+    client = TestClient(app_main.app)
+    document = _sample_document(args.file_chars)
+    upload_bytes = len(document.encode("utf-8")) * args.files
+    try:
+        durations = []
+        project_id = None
+        for index in range(args.uploads):
+            files = [("files", (f"doc_{i}.md", document.encode("utf-8"), "text/markdown")) for i in range(args.files)]
+            started = time.perf_counter()
+            # TestClient 同步执行后台任务，耗时包含文件保存和（模拟的）周报生成
+            response = client.post("/api/upload", files=files,
+                                   data={"project_name": f"benchmark-{index}", "week_start_date": "2025-01-06"})
+            durations.append(time.perf_counter() - started)
+            response.raise_for_status()
+            project_id = response.json()["project_id"]
+
+        edit_durations = []
+        for index in range(args.edits):
+            started = time.perf_counter()
+            response = client.put(f"/api/projects/{project_id}/week/1/files/doc_{index % args.files}.md",
+                                  content=document.encode("utf-8"))
+            edit_durations.append(time.perf_counter() - started)
+            response.raise_for_status()
+    finally:
+        server.stop()
+
+    upload_total = sum(durations)
+    edit_total = sum(edit_durations)
+    return {
+        "uploads_per_second": args.uploads / upload_total,
+        "upload_mb_per_second": args.uploads * upload_bytes / upload_total / 1e6,
+        "upload_latency": _summary(durations),
+        "edits_per_second": args.edits / edit_total if edit_total else None,
+        "edit_latency": _summary(edit_durations) if edit_durations else None,
+    }
+
+
+def run_upload_benchmark(args) -> dict:
+    """对比调整前后的日志配置下 /api/upload 与文件编辑接口的吞吐（每种配置在独立进程和临时数据目录中运行）"""
+    if args.profile_child:
+        print(json.dumps(_run_upload_profile(args)))
+        return {}
+
+    results = {}
+    for profile in args.profiles:
+        work_dir = tempfile.mkdtemp(prefix=f"teamie-upload-{profile}-")
+        env = {
+            **os.environ,
+            **UPLOAD_LOG_PROFILES[profile],
+            "DATA_DIR": os.path.join(work_dir, "data"),
+            "LOG_FILE": os.path.join(work_dir, "app.log"),
+            "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "sk-benchmark"),
+        }
+        command = [sys.executable, os.path.abspath(__file__), "upload", "--profile-child",
+                   "--uploads", str(args.uploads), "--files", str(args.files),
+                   "--file-chars", str(args.file_chars), "--edits", str(args.edits)]
+        try:
+            # 控制台日志丢弃，文件日志写入临时目录，两者的写入开销都计入结果
+            completed = subprocess.run(command, env=env, cwd=os.path.dirname(os.path.abspath(__file__)),
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, check=True)
+            results[profile] = json.loads(completed.stdout.strip().splitlines()[-1])
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"\n上传吞吐（uploads={args.uploads}, 每次 {args.files} 个文件 × {args.file_chars} 字符, edits={args.edits}）")
+    print(f"{'日志配置':<10}{'上传/秒':>10}{'MB/秒':>10}{'上传平均(ms)':>14}{'编辑/秒':>10}{'编辑平均(ms)':>14}")
+    for profile, stats in results.items():
+        edit_mean = stats["edit_latency"]["mean"] * 1000 if stats["edit_latency"] else 0
+        print(f"{profile:<10}{stats['uploads_per_second']:>10.2f}{stats['upload_mb_per_second']:>10.2f}"
+              f"{stats['upload_latency']['mean'] * 1000:>14.1f}{stats['edits_per_second'] or 0:>10.1f}{edit_mean:>14.2f}")
+    return results
+
+
+def _add_fake_llm_arguments(parser, latency: float, tokens_per_second: float, section_tokens: int):
+    parser.add_argument("--latency", type=float, default=latency, help="模拟首 token 延迟（秒）")
+    parser.add_argument("--tokens-per-second", type=float, default=tokens_per_second, help="模拟单请求输出速度")
+    parser.add_argument("--section-tokens", type=int, default=section_tokens, help="每个分区输出的 token 数")
+    parser.add_argument("--api-base", help="使用已运行的模拟服务（如 http://127.0.0.1:8090/v1）")
+
+
+def _add_suite_arguments(parser, benchmarks: List[str]):
+    """suite 及其包含的子命令共用的参数"""
+    if any(name in benchmarks for name in ("pipeline", "extraction", "files")):
+        parser.add_argument("--corpora", nargs="+", default=list(CORPUS_PRESETS), choices=list(CORPUS_PRESETS),
+                            help="模拟 Notion 导出语料规模")
+    if any(name in benchmarks for name in ("pipeline", "extraction", "datamanager", "files")):
+        parser.add_argument("--seed", type=int, default=0, help="语料和随机访问的种子")
+    if "pipeline" in benchmarks:
+        parser.add_argument("--runs", type=int, default=3)
+    if "datamanager" in benchmarks or "storage" in benchmarks:
+        parser.add_argument("--project-counts", nargs="+", type=int, default=[100, 1000, 10000])
+    if any(name in benchmarks for name in ("datamanager", "storage", "extraction", "files")):
+        parser.add_argument("--repeats", type=int, default=5, help="每项操作的重复次数")
+    if "files" in benchmarks:
+        parser.add_argument("--weeks", type=int, default=8, help="模拟的周数")
+    if "datamanager" in benchmarks or "chat" in benchmarks:
+        parser.add_argument("--file-chars", type=int, default=20000, help="文档长度（字符）")
+    if "chat" in benchmarks:
+        parser.add_argument("--requests", type=int, default=20, help="聊天请求数")
+    if any(name in benchmarks for name in ("pipeline", "datamanager", "storage", "chat")):
+        # 默认让模拟 LLM 足够快，使结果主要反映应用自身的开销
+        _add_fake_llm_arguments(parser, latency=0.05, tokens_per_second=20000, section_tokens=200)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Teamie 性能基准测试")
+    parser.add_argument("--verbose", action="store_true", help="输出应用日志")
+    parser.add_argument("--output", help="把结果写入 JSON 报告")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    analysis = subparsers.add_parser("analysis", help="对比 single / parallel 周报生成模式")
+    analysis.add_argument("--runs", type=int, default=3)
+    analysis.add_argument("--modes", nargs="+", default=["single", "parallel"], choices=["single", "parallel"])
+    analysis.add_argument("--doc-chars", type=int, default=20000, help="示例文档长度（字符）")
+    _add_fake_llm_arguments(analysis, latency=0.3, tokens_per_second=600, section_tokens=1000)
+    analysis.set_defaults(func=run_analysis_benchmark)
+
+    upload = subparsers.add_parser("upload", help="对比日志配置对上传/文件编辑吞吐的影响")
+    upload.add_argument("--uploads", type=int, default=20, help="上传请求数")
+    upload.add_argument("--files", type=int, default=20, help="每次上传的文件数")
+    upload.add_argument("--file-chars", type=int, default=20000, help="每个文件的长度（字符）")
+    upload.add_argument("--edits", type=int, default=200, help="文件编辑（PUT）请求数")
+    upload.add_argument("--profiles", nargs="+", default=list(UPLOAD_LOG_PROFILES), choices=list(UPLOAD_LOG_PROFILES))
+    upload.add_argument("--profile-child", action="store_true", help=argparse.SUPPRESS)
+    upload.set_defaults(func=run_upload_benchmark)
+
+    helps = {
+        "pipeline": "/api/upload 与 analyze-next-week 端到端吞吐",
+        "datamanager": "DataManager 读写延迟随项目数的变化",
+        "storage": "projects.json 各存储格式的保存/加载耗时和文件大小",
+        "files": "周文档的磁盘占用和读取延迟（原文件 vs blob 存储）",
+        "extraction": "文本提取速度（MB/s）",
+        "chat": "/api/ai/chat 首字节时间",
+    }
+    for name, func in SUITE_BENCHMARKS.items():
+        sub = subparsers.add_parser(name, help=helps[name])
+        _add_suite_arguments(sub, [name])
+        sub.set_defaults(func=func)
+
+    suite = subparsers.add_parser("suite", help="运行全部基准测试并生成报告")
+    suite.add_argument("--benchmarks", nargs="+", default=list(SUITE_BENCHMARKS), choices=list(SUITE_BENCHMARKS))
+    suite.add_argument("--compare", help="与之前生成的 JSON 报告对比")
+    suite.add_argument("--threshold", type=float, default=0.1, help="对比时视为回退的变化比例")
+    _add_suite_arguments(suite, list(SUITE_BENCHMARKS))
+    suite.set_defaults(func=run_suite)
+
+    args = parser.parse_args(argv)
+    if getattr(args, "profile_child", False):
+        # 子进程使用应用自身的日志配置（logging_setup）
+        args.func(args)
+        return
+    # 应用导入时的日志配置使用相同的级别，且不写 app.log
+    os.environ.setdefault("LOG_LEVEL", "INFO" if args.verbose else "WARNING")
+    os.environ.setdefault("LOG_FILE", "")
+    from logging_setup import setup_logging
+    setup_logging()
+
+    results = args.func(args)
+    if args.output:
+        write_report(args, results)
+    if getattr(args, "compare", None):
+        _print_comparison(results, args.compare, args.threshold)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+内容寻址的文档存储
+上传的文档按内容的 SHA-256 存为 data/blobs/{前两位}/{哈希}.z（zlib 压缩），内容相同的文件只存一份；
+各周的文件列表由 file_catalog 中的清单（路径 -> 哈希）维护。
+没有清单引用的 blob 由 collect_garbage 定期清理。
+按字节范围读取时流式解压，只解压到范围末尾，不在内存中展开整个文档。
+"""
+import os
+import time
+import zlib
+import hashlib
+import threading
+import logging
+from typing import BinaryIO, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+BLOBS_DIRNAME = "blobs"
+BLOB_SUFFIX = ".z"
+COMPRESSION_LEVEL = 6
+# 清理时跳过最近写入或复用过的 blob：blob 先于清单写入，避免删掉正在上传的文件
+GC_GRACE_SECONDS = 3600
+# 流式读取时每次读入的压缩数据和每次最多解压出的数据
+READ_CHUNK_SIZE = 64 * 1024
+STREAM_CHUNK_SIZE = 256 * 1024
+
+
+class BlobStore:
+    """按内容哈希存储的压缩 blob"""
+
+    def __init__(self, data_dir: str):
+        self.blobs_dir = os.path.join(data_dir, BLOBS_DIRNAME)
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.blobs_dir, digest[:2], digest + BLOB_SUFFIX)
+
+    def contains(self, digest: str) -> bool:
+        return os.path.exists(self.path(digest))
+
+    def touch(self, digest: str) -> bool:
+        """刷新已有 blob 的修改时间（重新被引用时调用，防止被并发的清理删除），blob 不存在时返回 False"""
+        try:
+            os.utime(self.path(digest), None)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def put(self, data: bytes) -> str:
+        """写入内容，返回哈希；内容已存在时不重复写入"""
+        digest = hashlib.sha256(data).hexdigest()
+        if not self.touch(digest):
+            self.put_compressed(digest, zlib.compress(data, COMPRESSION_LEVEL))
+        return digest
+
+    def put_compressed(self, digest: str, compressed: bytes):
+        """写入已压缩的 blob（从归档恢复时使用）"""
+        path = self.path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(compressed)
+        os.replace(tmp_path, path)
+
+    def get(self, digest: str) -> Optional[bytes]:
+        """读取并解压内容，blob 不存在时返回 None"""
+        try:
+            with open(self.path(digest), "rb") as f:
+                return zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+
+    def open_range(self, digest: str, start: int = 0, end: Optional[int] = None) -> Optional[Iterator[bytes]]:
+        """按块返回解压后内容的 [start, end] 闭区间（end 为 None 时到末尾），blob 不存在时返回 None"""
+        try:
+            f = open(self.path(digest), "rb")
+        except FileNotFoundError:
+            return None
+        return self._iter_range(f, start, end)
+
+    def _iter_range(self, f: BinaryIO, start: int, end: Optional[int]) -> Iterator[bytes]:
+        with f:
+            decompressor = zlib.decompressobj()
+            position = 0
+            while not decompressor.eof and (end is None or position <= end):
+                data = decompressor.unconsumed_tail or f.read(READ_CHUNK_SIZE)
+                if not data:
+                    break
+                # max_length 限制单次解压的大小，高压缩比的文档也不会一次展开
+                chunk = decompressor.decompress(data, STREAM_CHUNK_SIZE)
+                chunk_start, position = position, position + len(chunk)
+                if position <= start:
+                    continue
+                chunk = chunk[max(start - chunk_start, 0):]
+                if end is not None and position > end + 1:
+                    chunk = chunk[:len(chunk) - (position - end - 1)]
+                if chunk:
+                    yield chunk
+
+    def collect_garbage(self, referenced: Iterable[str]) -> int:
+        """删除没有被引用的 blob（跳过宽限期内的），返回删除的数量"""
+        referenced = set(referenced)
+        cutoff = time.time() - GC_GRACE_SECONDS
+        removed = 0
+        try:
+            prefixes = os.listdir(self.blobs_dir)
+        except FileNotFoundError:
+            return 0
+        for prefix in prefixes:
+            directory = os.path.join(self.blobs_dir, prefix)
+            try:
+                names = os.listdir(directory)
+            except (NotADirectoryError, FileNotFoundError):
+                continue
+            for name in names:
+                if not name.endswith(BLOB_SUFFIX) or name[:-len(BLOB_SUFFIX)] in referenced:
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    if os.path.getmtime(path) < cutoff:
+                        os.remove(path)
+                        removed += 1
+                except FileNotFoundError:
+                    pass
+        if removed:
+            logger.info(f"已清理 {removed} 个未引用的文档 blob")
+        return removed
@@ -0,0 +1,75 @@
+"""
+周报变更日志
+字段级 PATCH 只把增量追加到 changes.jsonl，不重写整个 projects.json；
+加载项目时在 projects.json 之上按顺序重放日志，日志过大或发生整体保存时压缩（并入 projects.json 后清空）。
+"""
+import os
+import json
+import logging
+import threading
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+CHANGE_LOG_FILENAME = "changes.jsonl"
+
+# 超过任一阈值时压缩
+COMPACT_MAX_ENTRIES = 500
+COMPACT_MAX_BYTES = 4 * 1024 * 1024
+
+
+class ChangeLog:
+    """只追加的 JSON Lines 日志"""
+
+    def __init__(self, data_dir: str):
+        self.path = os.path.join(data_dir, CHANGE_LOG_FILENAME)
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def append(self, entry: dict):
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+                f.flush()
+                os.fsync(f.fileno())
+            if self._entries is not None:
+                self._entries += 1
+
+    def read(self) -> List[dict]:
+        """读取全部完整的日志行（写到一半的末行会被忽略）"""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            lines = []
+
+        entries = []
+        for line in lines:
+            if not line.endswith("\n"):
+                logger.warning("变更日志末尾存在未写完的记录，已忽略")
+                break
+            try:
+                entries.append(json.loads(line))
+            except json.JSONDecodeError:
+                logger.warning("变更日志中存在无法解析的行，已跳过")
+        with self._lock:
+            self._entries = len(entries)
+        return entries
+
+    def clear(self):
+        """清空日志（内容已并入 projects.json 之后调用）"""
+        with self._lock:
+            if os.path.exists(self.path):
+                with open(self.path, "w", encoding="utf-8"):
+                    pass
+            self._entries = 0
+
+    def needs_compaction(self) -> bool:
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return False
+        with self._lock:
+            entries = self._entries or 0
+        return entries >= COMPACT_MAX_ENTRIES or size >= COMPACT_MAX_BYTES
@@ -9,16 +9,22 @@ import logging
 logger = logging.getLogger(__name__)
 
 # 模型配置表
+# structured_output: 周报生成使用的结构化输出模式（json_schema / json_object / None 表示仅靠提示词约束）
+# token_limit_param: 限制输出长度使用的参数名
 MODEL_CONFIG = {
     "gpt-4o-mini": {
         "tokens_per_second": 1000,
         "encoding_model": "gpt-4",
-        "display_name": "GPT-4o Mini"
+        "display_name": "GPT-4o Mini",
+        "structured_output": "json_schema",
+        "token_limit_param": "max_tokens"
     },
     "gpt-5-nano": {
         "tokens_per_second": 600,
         "encoding_model": "gpt-4",
-        "display_name": "GPT-5 Nano"
+        "display_name": "GPT-5 Nano",
+        "structured_output": "json_schema",
+        "token_limit_param": "max_completion_tokens"
     }
 }
 
@@ -29,19 +35,28 @@ if not os.path.exists(data_dir):
     os.makedirs(data_dir, exist_ok=True)
 CONFIG_FILE = os.path.join(data_dir, "model_config.json")
 
+# 模型配置按文件 mtime 缓存：多个 worker 共享同一个配置文件，任一 worker 切换模型后其他 worker 下次读取即生效
+_model_cache = {"mtime": None, "model": None}
+
 def get_default_model():
     """获取默认模型（从环境变量或使用默认值）"""
     return os.getenv("AI_MODEL", "gpt-5-nano")
 
 def get_current_model():
-    """获取当前使用的模型"""
+    """获取当前使用的模型（所有 worker 以 data 目录中的配置文件为准）"""
     try:
         if os.path.exists(CONFIG_FILE):
+            stat = os.stat(CONFIG_FILE)
+            # 配置每次写入都是原子替换（新的 inode）
+            mtime = (stat.st_ino, stat.st_mtime_ns)
+            if _model_cache["mtime"] == mtime:
+                return _model_cache["model"]
             with open(CONFIG_FILE, 'r', encoding='utf-8') as f:
                 config = json.load(f)
                 model = config.get("current_model", get_default_model())
                 # 验证模型是否在配置表中
                 if model in MODEL_CONFIG:
+                    _model_cache.update(mtime=mtime, model=model)
                     return model
                 else:
                     logger.warning(f"配置的模型 {model} 不在配置表中，使用默认模型")
@@ -64,14 +79,63 @@ def set_current_model(model_name: str):
         config = {
             "current_model": model_name
         }
-        with open(CONFIG_FILE, 'w', encoding='utf-8') as f:
+        # 先写临时文件再原子替换，其他 worker 不会读到写了一半的配置
+        tmp_file = f"{CONFIG_FILE}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
             json.dump(config, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_file, CONFIG_FILE)
         logger.info(f"模型配置已更新为: {model_name}")
         return True
     except Exception as e:
         logger.error(f"保存模型配置失败: {str(e)}")
         raise
 
+# 周报生成模式：single（一次调用生成全部分区）/ parallel（分组并发生成）
+ANALYSIS_MODES = ("single", "parallel")
+
+def get_analysis_mode():
+    """获取周报生成模式（环境变量 ANALYSIS_MODE，默认 single）"""
+    mode = os.getenv("ANALYSIS_MODE", "single").strip().lower()
+    if mode not in ANALYSIS_MODES:
+        logger.warning(f"未知的周报生成模式 {mode}，使用 single")
+        return "single"
+    return mode
+
+# projects.json 的写入格式：json（缩进，便于查看）/ compact（紧凑，保存更快、文件更小），读取时两种格式通用
+STORAGE_FORMATS = ("json", "compact")
+
+def get_storage_format():
+    """获取项目存储格式（环境变量 STORAGE_FORMAT，默认 json）"""
+    storage_format = os.getenv("STORAGE_FORMAT", "json").strip().lower()
+    if storage_format not in STORAGE_FORMATS:
+        logger.warning(f"未知的存储格式 {storage_format}，使用 json")
+        return "json"
+    return storage_format
+
+def get_archive_policy():
+    """项目归档策略（环境变量）
+
+    ARCHIVE_STATUSES：视为已结束、可以归档的状态（逗号分隔，默认 已完成,已结束,已关闭）
+    ARCHIVE_IDLE_DAYS：超过多少天未更新的项目也归档（默认 180，0 表示不按时间归档）
+    ARCHIVE_SWEEP_HOURS：后台归档检查的间隔（默认 0，即不自动归档，只能通过接口手动触发；设为例如 24 开启）
+    """
+    statuses = os.getenv("ARCHIVE_STATUSES", "已完成,已结束,已关闭")
+    try:
+        idle_days = float(os.getenv("ARCHIVE_IDLE_DAYS", "180"))
+        sweep_hours = float(os.getenv("ARCHIVE_SWEEP_HOURS", "0"))
+    except ValueError:
+        logger.warning("归档策略配置无效，使用默认值")
+        idle_days, sweep_hours = 180.0, 0.0
+    return {
+        "statuses": [status.strip() for status in statuses.split(",") if status.strip()],
+        "idle_days": idle_days,
+        "sweep_hours": sweep_hours,
+    }
+
+def is_write_verification_enabled():
+    """写入后是否回读校验（调试用，环境变量 DEBUG_VERIFY_WRITES=1 开启）"""
+    return os.getenv("DEBUG_VERIFY_WRITES", "").strip().lower() in ("1", "true", "yes")
+
 def get_available_models():
     """获取所有可用的模型列表"""
     return [
@@ -81,6 +145,3 @@ def get_available_models():
         }
         for model_id, config in MODEL_CONFIG.items()
     ]
-
-# 当前使用的模型（从配置文件读取）
-AI_MODEL = get_current_model()
\ No newline at end of file
@@ -0,0 +1,32 @@
+"""
+测试公共配置：导入 main 之前把数据目录指向临时目录，关闭日志文件、编辑合并和后台归档；
+client 使用独立数据目录的 DataManager
+"""
+import os
+import tempfile
+
+import pytest
+
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="teamie-test-")
+os.environ["LOG_FILE"] = ""
+os.environ["EDIT_COALESCE_SECONDS"] = "0"
+os.environ["ARCHIVE_SWEEP_HOURS"] = "0"
+
+
+@pytest.fixture
+def data_manager(tmp_path, monkeypatch):
+    import main
+    from data_manager import DataManager
+
+    manager = DataManager(str(tmp_path))
+    monkeypatch.setattr(main, "data_manager", manager)
+    yield manager
+    manager.close()
+
+
+@pytest.fixture
+def client(data_manager):
+    from fastapi.testclient import TestClient
+    import main
+
+    return TestClient(main.app)
@@ -0,0 +1,56 @@
+"""
+项目总览统计
+根据周报数据计算每周完成情况、计划优先级分布和跨周趋势
+"""
+from typing import Dict, Optional
+from models import Project, WeekData, WeekStats, ProjectDashboard
+
+PRIORITIES = ("P0", "P1", "P2")
+
+
+def build_week_stats(week: int, week_data: WeekData) -> WeekStats:
+    """计算单周统计"""
+    completed = len(week_data.completed_tasks)
+    incomplete = len(week_data.incomplete_tasks)
+    total = completed + incomplete
+
+    plan_counts = {priority: 0 for priority in PRIORITIES}
+    for plan in week_data.next_week_plan:
+        priority = (plan.priority or "P1").upper()
+        plan_counts[priority] = plan_counts.get(priority, 0) + 1
+
+    return WeekStats(
+        week=week,
+        week_period=week_data.week_period,
+        completed_count=completed,
+        incomplete_count=incomplete,
+        completion_rate=round(completed / total, 4) if total else 0.0,
+        plan_counts=plan_counts
+    )
+
+
+def build_project_dashboard(project: Project, week_stats: Optional[Dict[int, WeekStats]] = None) -> ProjectDashboard:
+    """汇总项目统计；week_stats 为已计算好的周统计（增量更新时复用），缺失的周会重新计算"""
+    stats = dict(week_stats or {})
+    for week, week_data in project.weeks.items():
+        if week not in stats:
+            stats[week] = build_week_stats(week, week_data)
+    # 只保留项目中仍存在的周
+    ordered = [stats[week] for week in sorted(project.weeks.keys())]
+
+    trend = [item.completion_rate for item in ordered]
+    current_rate = trend[-1] if trend else 0.0
+    trend_delta = round(trend[-1] - trend[-2], 4) if len(trend) >= 2 else 0.0
+
+    return ProjectDashboard(
+        id=project.id,
+        name=project.name,
+        status=project.status,
+        current_week=max(project.weeks.keys()) if project.weeks else 1,
+        total_weeks=len(project.weeks),
+        updated_at=project.updated_at,
+        completion_rate=current_rate,
+        trend_delta=trend_delta,
+        trend=trend,
+        weeks=ordered
+    )
@@ -0,0 +1,74 @@
+"""
+物化的项目总览统计
+data/dashboard.json 保存 {项目ID: 总览统计}；写入时只把变化的项目追加到 dashboard.jsonl，
+不重写全部项目的统计（见 snapshot_journal），日志过长时压缩回 dashboard.json。
+读取在内存中缓存，只补读其他 worker 新追加的日志。
+"""
+import os
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from models import ProjectDashboard
+from snapshot_journal import SnapshotJournal
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_FILENAME = "dashboard.json"
+DASHBOARD_JOURNAL_FILENAME = "dashboard.jsonl"
+
+
+class DashboardStore:
+    """项目总览统计的持久化
+
+    日志条目：{"s": {项目ID: 总览统计}}、{"r": [项目ID]}
+    """
+
+    def __init__(self, data_dir: str):
+        self.path = os.path.join(data_dir, DASHBOARD_FILENAME)
+        self._lock = threading.Lock()
+        self._items: Dict[str, ProjectDashboard] = {}
+        self._journal = SnapshotJournal(self.path, os.path.join(data_dir, DASHBOARD_JOURNAL_FILENAME),
+                                        self._load_snapshot, self._apply_entry)
+
+    def _load_snapshot(self, data: dict):
+        self._items = {project_id: ProjectDashboard(**item) for project_id, item in data.items()}
+
+    def _apply_entry(self, entry: dict):
+        for project_id in entry.get("r", ()):
+            self._items.pop(project_id, None)
+        for project_id, item in entry.get("s", {}).items():
+            self._items[project_id] = ProjectDashboard(**item)
+
+    def _snapshot(self) -> dict:
+        return {project_id: item.model_dump(mode="json") for project_id, item in self._items.items()}
+
+    def load(self) -> Optional[Dict[str, ProjectDashboard]]:
+        """全部项目的总览统计，文件不存在或损坏时返回 None（需要 replace 重建）"""
+        with self._lock:
+            if not self._journal.refresh():
+                return None
+            return dict(self._items)
+
+    def replace(self, dashboard: Dict[str, ProjectDashboard]):
+        """整体写入全部项目的总览统计（需持有存储写锁）"""
+        with self._lock:
+            self._items = dict(dashboard)
+            self._journal.compact(self._snapshot())
+
+    def update(self, items: Dict[str, ProjectDashboard], removals: List[str]) -> bool:
+        """追加部分项目的统计变化和删除（需持有存储写锁），统计文件不可用时返回 False"""
+        if not items and not removals:
+            return True
+        with self._lock:
+            if not self._journal.refresh():
+                return False
+            entry = {}
+            if removals:
+                entry["r"] = list(removals)
+            if items:
+                entry["s"] = {project_id: item.model_dump(mode="json") for project_id, item in items.items()}
+            self._journal.append(entry)
+            if self._journal.needs_compaction():
+                self._journal.compact(self._snapshot())
+            return True
@@ -1,268 +1,781 @@
-import json
 import os
 import logging
-from typing import Dict, List, Optional
-from datetime import datetime
-from models import Project, WeekData, ProjectSummary
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from datetime import datetime, timedelta
+from models import Project, ProjectMeta, WeekData, ProjectSummary, ProjectDashboard
+from file_catalog import FileCatalog
+from blob_store import BlobStore
+from file_names import storage_path
+from change_log import ChangeLog
+from write_coalescer import WriteCoalescer, DEFAULT_WINDOW_SECONDS
+from file_lock import FileLock
+from project_index import ProjectIndex
+from project_archive import ProjectArchive
+from week_patch import apply_week_patch, apply_delta
+from week_history import WeekHistory
+from storage_format import dump_projects, load_projects, loads
+from metrics import timed
+from config import is_write_verification_enabled, get_storage_format, get_archive_policy
+from dashboard import build_project_dashboard
+from dashboard_store import DashboardStore
 
 logger = logging.getLogger(__name__)
 
+# 按需加载的周报缓存条目数
+WEEK_CACHE_SIZE = 256
+
 class DataManager:
     def __init__(self, data_dir: str = "data"):
         self.data_dir = data_dir
         os.makedirs(data_dir, exist_ok=True)
         self.projects_file = os.path.join(data_dir, "projects.json")
+        # projects.json 的写入格式（json / compact），读取时自动兼容
+        self.storage_format = get_storage_format()
+        # 物化的项目总览统计，随每次写入增量更新（只追加变化的项目）
+        self.dashboard = DashboardStore(data_dir)
+        # 上传的文档按内容哈希压缩存储（相同内容只存一份），各周清单记录路径到内容的映射
+        self.blob_store = BlobStore(data_dir)
+        self.file_catalog = FileCatalog(data_dir, self.blob_store)
+        # 字段级修改的增量日志，加载时在 projects.json 之上重放
+        self.change_log = ChangeLog(data_dir)
+        # 项目 ID 计数器和名称/状态索引，新建项目和判断项目是否存在不需要加载全部项目
+        self.project_index = ProjectIndex(data_dir)
+        # 已结束或长期未更新的项目归档为 data/archive/{项目ID}.tar.gz，索引中保留元数据，访问时自动恢复
+        self.archive = ProjectArchive(data_dir)
+        # 按需加载的单个周报，{(项目ID, 周): (项目是否存在, 周报)}，存储文件变化后整体失效
+        self._week_cache: "OrderedDict[Tuple[str, int], Tuple[bool, Optional[WeekData]]]" = OrderedDict()
+        self._week_cache_signature = None
+        self._week_cache_lock = threading.Lock()
+        # 周报版本历史（增量 + 定期快照），只在写入和查询历史时访问
+        self.history = WeekHistory(data_dir)
+        # 写事务：同一时间只有一个线程（跨 worker 进程）修改存储，读取持有共享锁；事务状态按线程隔离
+        self._write_lock = FileLock(os.path.join(data_dir, ".storage.lock"))
+        self._tx = threading.local()
+        # 内联编辑的补丁先在内存中合并，编辑停顿后一次写入；
+        # 多 worker 时缓存在其他 worker 上不可见，默认不合并（前端已做防抖合并）
+        default_window = DEFAULT_WINDOW_SECONDS if int(os.getenv("WEB_CONCURRENCY", "1")) <= 1 else 0
+        self.edit_buffer = WriteCoalescer(
+            lambda project_id, week, operations: self.patch_week_data(project_id, week, operations),
+            self._write_lock,
+            window_seconds=float(os.getenv("EDIT_COALESCE_SECONDS", default_window)),
+        )
+
+    def close(self):
+        """写入尚未落盘的编辑（进程退出前调用）"""
+        self.edit_buffer.close()
+
+    def _flush_edits(self):
+        """读取存储前先写入缓存的编辑，保证读到最新内容"""
+        if self.edit_buffer.has_pending():
+            self.edit_buffer.flush()
 
     def _load_projects(self) -> Dict[str, Project]:
-        """加载所有项目数据"""
-        if not os.path.exists(self.projects_file):
-            return {}
+        """加载所有项目数据（事务中返回事务内的数据）"""
+        tx_projects = getattr(self._tx, "projects", None)
+        if tx_projects is not None:
+            return tx_projects
+
+        self._flush_edits()
+        # 共享锁保证 projects.json 与变更日志来自同一次提交（其他 worker 可能正在压缩日志）
+        with self._write_lock.shared():
+            projects = {}
+            # projects.json 不存在时变更日志中仍可能有新建的项目
+            if os.path.exists(self.projects_file):
+                try:
+                    with open(self.projects_file, 'rb') as f:
+                        projects = load_projects(f.read())
+                except Exception as e:
+                    print(f"Error loading projects: {e}")
+                    return {}
+
+            self._replay_change_log(projects)
+        return projects
+
+    def _replay_change_log(self, projects: Dict[str, Project]):
+        """把尚未压缩的字段级修改应用到刚加载的项目上"""
+        for entry in self.change_log.read():
+            if "c" in entry:
+                # 新建项目的记录（已压缩进 projects.json 时跳过）
+                if entry["p"] not in projects:
+                    projects[entry["p"]] = Project(**entry["c"])
+                continue
+            project = projects.get(entry.get("p"))
+            if project is None:
+                continue
+            try:
+                week = int(entry["w"])
+                project.weeks[week] = apply_delta(project.weeks.get(week) or WeekData(), entry["d"])
+                project.updated_at = datetime.fromisoformat(entry["t"])
+            except Exception as e:
+                logger.warning(f"重放变更日志失败，已跳过该条记录: {e}")
 
+    def _save_projects(self, projects: Dict[str, Project]):
+        """保存所有项目数据（先写临时文件再原子替换，避免写到一半的文件）"""
         try:
-            with open(self.projects_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                projects = {}
-                for project_id, project_data in data.items():
-                    projects[project_id] = Project(**project_data)
-                return projects
+            tmp_file = self.projects_file + ".tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(dump_projects(projects, self.storage_format))
+            os.replace(tmp_file, self.projects_file)
+            # 保存的数据已包含日志中的修改
+            self.change_log.clear()
         except Exception as e:
-            print(f"Error loading projects: {e}")
-            return {}
+            print(f"Error saving projects: {e}")
 
-    def _save_projects(self, projects: Dict[str, Project]):
-        """保存所有项目数据"""
+    @contextmanager
+    def transaction(self):
+        """存储事务：事务内的所有修改共享一次加载，提交时只写一次文件
+
+        可以嵌套使用，内层事务直接复用外层的数据，由最外层统一提交；
+        事务内抛出异常时丢弃所有修改。
+        """
+        if getattr(self._tx, "projects", None) is not None:
+            yield self._tx.projects
+            return
+
+        with self._write_lock:
+            self._tx.projects = self._load_projects()
+            self._tx.dirty = {}
+            self._tx.history = []
+            try:
+                yield self._tx.projects
+                projects, dirty, history = self._tx.projects, self._tx.dirty, self._tx.history
+            finally:
+                self._tx.projects = None
+                self._tx.dirty = None
+                self._tx.history = None
+
+            if dirty:
+                self._save_projects(projects)
+                self._refresh_dashboard(projects, dirty)
+                self._sync_index(projects, dirty)
+            for record in history:
+                self._record_history(*record)
+
+    def _ensure_index(self):
+        """项目索引不存在或损坏时根据全部项目重建（只在首次使用时发生）"""
+        if self.project_index.ready():
+            return
+        with self._write_lock:
+            if not self.project_index.ready():
+                projects = getattr(self._tx, "projects", None) or self._load_projects()
+                entries = {project_id: self._index_entry(project) for project_id, project in projects.items()}
+                # 归档项目不在 projects.json 中，元数据从归档读取
+                for project_id in self.archive.list_ids():
+                    project = self.archive.read_project(project_id)
+                    if project is not None and project_id not in entries:
+                        entries[project_id] = {**self._index_entry(project), "archived": True}
+                self.project_index.rebuild(entries)
+                logger.info(f"已重建项目索引，共 {len(entries)} 个项目")
+
+    def _sync_index(self, projects: Dict[str, Project], changes: Dict[str, Set[int]]):
+        """事务提交后把发生变化的项目的元数据写入索引"""
+        if not self.project_index.ready():
+            self._ensure_index()
+            return
+        upserts = {project_id: self._index_entry(projects[project_id]) for project_id in changes if project_id in projects}
+        self.project_index.apply(upserts, [project_id for project_id in changes if project_id not in projects])
+
+    @staticmethod
+    def _index_entry(project: Project) -> dict:
+        """项目在索引中的元数据（不含周报内容）"""
+        return {
+            "name": project.name,
+            "status": project.status,
+            "created_at": project.created_at.isoformat(),
+            "updated_at": project.updated_at.isoformat(),
+            "weeks": sorted(project.weeks),
+        }
+
+    def _mark_dirty(self, project_id: str, weeks: Optional[List[int]] = None):
+        """记录事务中发生变化的项目和周，提交时保存并增量刷新总览统计"""
+        changed: Set[int] = self._tx.dirty.setdefault(project_id, set())
+        changed.update(weeks or [])
+
+    def _track_history(self, project_id: str, week: int, previous: Optional[WeekData], current: WeekData, source: str):
+        """记录周报的新版本（事务中推迟到提交之后）"""
+        history = getattr(self._tx, "history", None)
+        if history is not None:
+            history.append((project_id, week, previous, current, source))
+        else:
+            self._record_history(project_id, week, previous, current, source)
+
+    def _record_history(self, project_id: str, week: int, previous: Optional[WeekData], current: WeekData, source: str):
         try:
-            data = {}
-            for project_id, project in projects.items():
-                data[project_id] = project.dict()
+            self.history.record(project_id, week, previous, current, source)
+        except Exception as e:
+            # 历史写入失败不影响周报本身的保存
+            logger.error(f"记录项目 {project_id} 第 {week} 周的版本历史失败: {str(e)}")
 
-            with open(self.projects_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    def _load_dashboard(self) -> Optional[Dict[str, ProjectDashboard]]:
+        """加载物化的项目总览统计，文件不存在或损坏时返回 None"""
+        try:
+            return self.dashboard.load()
         except Exception as e:
-            print(f"Error saving projects: {e}")
+            logger.warning(f"加载项目总览统计失败，将重新计算: {e}")
+            return None
+
+    def _save_dashboard(self, items: Dict[str, ProjectDashboard], removals: List[str] = ()) -> bool:
+        """追加部分项目的总览统计变化，统计文件不可用时返回 False"""
+        try:
+            return self.dashboard.update(items, list(removals))
+        except Exception as e:
+            logger.error(f"保存项目总览统计失败，将重新计算: {e}")
+            return False
+
+    def _rebuild_dashboard(self, projects: Dict[str, Project]) -> Dict[str, ProjectDashboard]:
+        """根据全部项目重新计算总览统计（包括已归档的项目）"""
+        dashboard = {project_id: build_project_dashboard(project) for project_id, project in projects.items()}
+        for project_id in self.archive.list_ids():
+            project = self.archive.read_project(project_id)
+            if project is not None and project_id not in dashboard:
+                dashboard[project_id] = build_project_dashboard(project).model_copy(update={"archived": True})
+        try:
+            self.dashboard.replace(dashboard)
+        except Exception as e:
+            logger.error(f"保存项目总览统计失败: {e}")
+        return dashboard
+
+    def _refresh_dashboard(self, projects: Dict[str, Project], changes: Dict[str, Set[int]]):
+        """增量更新发生变化的项目的总览统计；changes 为 {项目ID: 变化的周}，周为空时只刷新项目级字段"""
+        dashboard = self._load_dashboard()
+        if dashboard is None:
+            # projects 可能只包含发生变化的项目，重建时加载全部项目
+            self._rebuild_dashboard(self._load_projects())
+            return
+
+        items, removals = {}, []
+        for project_id, weeks in changes.items():
+            if project_id not in projects:
+                if project_id in dashboard:
+                    removals.append(project_id)
+                continue
+            existing = dashboard.get(project_id)
+            reuse = {item.week: item for item in existing.weeks if item.week not in weeks} if existing else {}
+            items[project_id] = build_project_dashboard(projects[project_id], reuse)
+        if not self._save_dashboard(items, removals):
+            self._rebuild_dashboard(self._load_projects())
+
+    def get_dashboard(self) -> List[ProjectDashboard]:
+        """获取所有项目的总览统计（一次返回，无需逐个加载周报）"""
+        self._flush_edits()
+        with self._write_lock.shared():
+            dashboard = self._load_dashboard()
+        if dashboard is None:
+            with self._write_lock:
+                dashboard = self._rebuild_dashboard(self._load_projects())
+        return list(dashboard.values())
 
     def create_project(self, name: str, initial_data: Optional[WeekData] = None) -> str:
-        """创建新项目"""
-        projects = self._load_projects()
-        project_id = f"project_{len(projects) + 1}"
-        project = Project(
-            id=project_id,
-            name=name,
-            weeks={1: initial_data or WeekData()}
-        )
-        projects[project_id] = project
-        self._save_projects(projects)
-        return project_id
+        """创建新项目
+
+        ID 由持久化的计数器分配（删除过的 ID 不会复用）；不在事务中时只把新项目追加到变更日志，
+        不加载也不重写 projects.json。
+        """
+        with self._write_lock:
+            self._ensure_index()
+            project_id = self.project_index.allocate_id()
+            now = datetime.now()
+            project = Project(
+                id=project_id,
+                name=name,
+                created_at=now,
+                updated_at=now,
+                weeks={1: initial_data or WeekData()}
+            )
+
+            projects = getattr(self._tx, "projects", None)
+            if projects is not None:
+                projects[project_id] = project
+                self._mark_dirty(project_id, [1])
+                return project_id
+
+            self.change_log.append({"t": now.isoformat(), "p": project_id, "c": project.model_dump(mode="json")})
+            self.project_index.apply({project_id: self._index_entry(project)}, [])
+            self._refresh_dashboard({project_id: project}, {project_id: {1}})
+            if self.change_log.needs_compaction():
+                self._save_projects(self._load_projects())
+            return project_id
+
+    def project_exists(self, project_id: str) -> bool:
+        """项目是否存在（查索引，不加载项目数据）"""
+        self._ensure_index()
+        return self.project_index.get(project_id) is not None
+
+    def find_projects_by_name(self, name: str) -> List[str]:
+        """按名称查找项目 ID"""
+        self._ensure_index()
+        return self.project_index.find_by_name(name)
+
+    def find_projects_by_status(self, status: str) -> List[str]:
+        """按状态查找项目 ID"""
+        self._ensure_index()
+        return self.project_index.find_by_status(status)
 
     def get_project(self, project_id: str) -> Optional[Project]:
         """获取项目"""
+        self._ensure_hot(project_id)
         projects = self._load_projects()
         return projects.get(project_id)
 
-    def update_week_data(self, project_id: str, week: int, data: WeekData):
-        """更新周数据"""
-        projects = self._load_projects()
-        if project_id not in projects:
-            return False
+    def get_projects(self) -> Dict[str, Project]:
+        """获取所有项目的完整数据"""
+        return self._load_projects()
+
+    @timed("update_week_data")
+    def update_week_data(self, project_id: str, week: int, data: WeekData, source: str = "edit"):
+        """更新周数据，source 记录在版本历史中（edit / analysis / plan / import / restore）"""
+        self._ensure_hot(project_id)
+        with self.transaction() as projects:
+            if project_id not in projects:
+                return False
+
+            previous = projects[project_id].weeks.get(week)
+            projects[project_id].weeks[week] = data
+            self._track_history(project_id, week, previous, data, source)
+            projects[project_id].updated_at = datetime.now()
+            self._mark_dirty(project_id, [week])
+            return True
 
-        projects[project_id].weeks[week] = data
-        projects[project_id].updated_at = datetime.now()
-        self._save_projects(projects)
-        return True
+    @timed("patch_week_data")
+    def patch_week_data(self, project_id: str, week: int, operations: List[dict], source: str = "patch") -> Optional[WeekData]:
+        """按 JSON Patch 修改周报，返回修改后的周报（项目不存在时返回 None）
+
+        只把增量追加到变更日志，不重写 projects.json；日志超过阈值时压缩。
+        在事务中调用时与其他修改一起在提交时整体保存。补丁无效时抛出 PatchError。
+        """
+        self._ensure_hot(project_id)
+        if getattr(self._tx, "projects", None) is not None:
+            projects = self._tx.projects
+            project = projects.get(project_id)
+            if project is None:
+                return None
+            previous = project.weeks.get(week)
+            patched, delta = apply_week_patch(previous or WeekData(), operations)
+            if delta:
+                project.weeks[week] = patched
+                project.updated_at = datetime.now()
+                self._mark_dirty(project_id, [week])
+                self._track_history(project_id, week, previous, patched, source)
+            return patched
+
+        with self._write_lock:
+            projects = self._load_projects()
+            project = projects.get(project_id)
+            if project is None:
+                return None
+            previous = project.weeks.get(week)
+            patched, delta = apply_week_patch(previous or WeekData(), operations)
+            if not delta:
+                return patched
+
+            now = datetime.now()
+            self.change_log.append({"t": now.isoformat(), "p": project_id, "w": week, "d": delta})
+            project.weeks[week] = patched
+            project.updated_at = now
+            self.project_index.apply({project_id: self._index_entry(project)}, [])
+            self._refresh_dashboard(projects, {project_id: {week}})
+            if self.change_log.needs_compaction():
+                self._save_projects(projects)
+            self._record_history(project_id, week, previous, patched, source)
+            return patched
+
+    def submit_week_patch(self, project_id: str, week: int, operations: List[dict]) -> Optional[WeekData]:
+        """提交内联编辑的补丁，返回修改后的周报（项目不存在时返回 None）
+
+        补丁立即校验（无效时抛出 PatchError），但写入会合并到编辑停顿后统一进行；
+        期间的读取会先触发写入。EDIT_COALESCE_SECONDS=0 时立即写入。
+        """
+        def load_base() -> Optional[WeekData]:
+            exists, week_data = self._load_week(project_id, week)
+            if not exists:
+                return None
+            return week_data or WeekData()
+
+        return self.edit_buffer.submit(
+            (project_id, week), operations, load_base,
+            lambda current, ops: apply_week_patch(current, ops)[0],
+        )
 
     def get_week_data(self, project_id: str, week: int) -> Optional[WeekData]:
-        """获取周数据"""
-        project = self.get_project(project_id)
-        if not project:
+        """获取周数据（按需加载，不构造其他项目和其他周）"""
+        return self._load_week(project_id, week)[1]
+
+    def _storage_signature(self) -> tuple:
+        """projects.json 和变更日志的版本（inode + mtime + 大小），任一变化时按需加载的周报缓存失效"""
+        signature = []
+        for path in (self.projects_file, self.change_log.path):
+            try:
+                stat = os.stat(path)
+                signature.append((stat.st_ino, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _load_week(self, project_id: str, week: int) -> Tuple[bool, Optional[WeekData]]:
+        """按需加载单个周报，返回 (项目是否存在, 周报)；结果按存储版本缓存，返回的是副本"""
+        projects = getattr(self._tx, "projects", None)
+        if projects is not None:
+            project = projects.get(project_id)
+            return project is not None, (project.weeks.get(week) if project else None)
+
+        self._ensure_hot(project_id)
+        self._flush_edits()
+        key = (project_id, week)
+        with self._write_lock.shared():
+            signature = self._storage_signature()
+            with self._week_cache_lock:
+                if signature != self._week_cache_signature:
+                    self._week_cache.clear()
+                    self._week_cache_signature = signature
+                cached = self._week_cache.get(key)
+                if cached is not None:
+                    self._week_cache.move_to_end(key)
+            if cached is None:
+                cached = self._read_week(project_id, week)
+                with self._week_cache_lock:
+                    if self._week_cache_signature == signature:
+                        self._week_cache[key] = cached
+                        while len(self._week_cache) > WEEK_CACHE_SIZE:
+                            self._week_cache.popitem(last=False)
+
+        exists, week_data = cached
+        return exists, (week_data.model_copy(deep=True) if week_data else None)
+
+    def _read_week(self, project_id: str, week: int) -> Tuple[bool, Optional[WeekData]]:
+        """从 projects.json 和变更日志还原单个周报（调用方持有共享锁）
+
+        projects.json 只做 JSON 解析，只有目标周构造为模型；日志中该周的增量依次应用在其上。
+        """
+        project = None
+        if os.path.exists(self.projects_file):
+            try:
+                with open(self.projects_file, 'rb') as f:
+                    project = loads(f.read()).get(project_id)
+            except Exception as e:
+                logger.error(f"加载项目数据失败: {e}")
+                return False, None
+        week_raw = project["weeks"].get(str(week)) if project else None
+
+        deltas = []
+        for entry in self.change_log.read():
+            if entry.get("p") != project_id:
+                continue
+            if "c" in entry:
+                if project is None:
+                    project = entry["c"]
+                    week_raw = project["weeks"].get(str(week))
+            elif project is not None and int(entry.get("w", 0)) == week:
+                deltas.append(entry["d"])
+        if project is None:
+            return False, None
+
+        week_data = WeekData.model_validate(week_raw) if week_raw is not None else None
+        for delta in deltas:
+            try:
+                week_data = apply_delta(week_data or WeekData(), delta)
+            except Exception as e:
+                logger.warning(f"重放变更日志失败，已跳过该条记录: {e}")
+        return True, week_data
+
+    def get_week_versions(self, project_id: str, week: int) -> Optional[List[dict]]:
+        """列出周报的历史版本（从新到旧），项目不存在时返回 None"""
+        if not self.project_exists(project_id):
+            return None
+        self._ensure_hot(project_id)
+        return self.history.list_versions(project_id, week)
+
+    def get_week_version(self, project_id: str, week: int, version: int) -> Optional[WeekData]:
+        """重建周报的指定历史版本"""
+        self._ensure_hot(project_id)
+        return self.history.get_version(project_id, week, version)
+
+    def restore_week_version(self, project_id: str, week: int, version: int) -> Optional[WeekData]:
+        """把周报恢复为指定历史版本（恢复本身也记录为一个新版本），版本不存在时返回 None"""
+        self._ensure_hot(project_id)
+        week_data = self.history.get_version(project_id, week, version)
+        if week_data is None or not self.update_week_data(project_id, week, week_data, source="restore"):
             return None
-        return project.weeks.get(week)
+        return week_data
+
+    def get_project_meta(self, project_id: str) -> Optional[ProjectMeta]:
+        """获取项目元数据（名称、状态、时间戳、周列表），查索引，不加载周报内容"""
+        projects = getattr(self._tx, "projects", None)
+        if projects is not None:
+            project = projects.get(project_id)
+            return ProjectMeta(id=project_id, **self._index_entry(project)) if project else None
+
+        self._flush_edits()
+        self._ensure_index()
+        entry = self.project_index.get(project_id)
+        return ProjectMeta(id=project_id, **entry) if entry else None
 
     def get_all_projects(self) -> List[ProjectSummary]:
-        """获取所有项目摘要"""
-        projects = self._load_projects()
+        """获取所有项目摘要（来自索引中的元数据，不加载周报内容）"""
+        self._flush_edits()
+        self._ensure_index()
         summaries = []
 
-        for project in projects.values():
-            current_week = max(project.weeks.keys()) if project.weeks else 1
-
+        for project_id, entry in self.project_index.entries().items():
+            weeks = entry["weeks"]
             summaries.append(ProjectSummary(
-                id=project.id,
-                name=project.name,
-                current_week=current_week,
-                status=project.status,
-                total_weeks=len(project.weeks)
+                id=project_id,
+                name=entry["name"],
+                current_week=weeks[-1] if weeks else 1,
+                status=entry["status"],
+                total_weeks=len(weeks),
+                archived=entry.get("archived", False)
             ))
 
         return summaries
 
     def update_project_status(self, project_id: str, status: str) -> bool:
         """更新项目状态"""
-        projects = self._load_projects()
-        if project_id not in projects:
-            return False
-
-        projects[project_id].status = status
-        projects[project_id].updated_at = datetime.now()
-        self._save_projects(projects)
-        return True
+        self._ensure_hot(project_id)
+        with self.transaction() as projects:
+            if project_id not in projects:
+                return False
+
+            projects[project_id].status = status
+            projects[project_id].updated_at = datetime.now()
+            self._mark_dirty(project_id)
+            return True
 
     def delete_week_data(self, project_id: str, week: int) -> bool:
         """删除指定项目的指定周数据"""
-        projects = self._load_projects()
-        if project_id not in projects:
-            return False
+        self._ensure_hot(project_id)
+        with self.transaction() as projects:
+            if project_id not in projects:
+                return False
+
+            project = projects[project_id]
+
+            # 删除周数据
+            if week not in project.weeks:
+                return False
 
-        project = projects[project_id]
-        
-        # 删除周数据
-        if week in project.weeks:
             del project.weeks[week]
-            
+
             # 更新更新时间
             project.updated_at = datetime.now()
-            
-            # 保存更新后的项目数据
-            self._save_projects(projects)
-            
-            # 删除该周的文件目录
-            import shutil
-            week_dir = os.path.join(self.data_dir, project_id, f"week_{week}")
-            if os.path.exists(week_dir):
-                shutil.rmtree(week_dir)
-            
-            return True
-        
-        return False
+            self._mark_dirty(project_id, [week])
 
-    def delete_project(self, project_id: str) -> bool:
-        """删除项目"""
-        projects = self._load_projects()
-        if project_id not in projects:
-            return False
+        # 事务提交后删除该周的文件目录和版本历史（重新创建该周时不接着旧的版本链）
+        import shutil
+        week_dir = os.path.join(self.data_dir, project_id, f"week_{week}")
+        if os.path.exists(week_dir):
+            shutil.rmtree(week_dir)
+        self.file_catalog.invalidate(project_id, week)
+        self.history.remove(project_id, week)
 
-        # 删除项目
-        del projects[project_id]
+        return True
 
-        # 保存更新后的项目数据
-        self._save_projects(projects)
+    def delete_project(self, project_id: str) -> bool:
+        """删除项目（已归档的项目直接删除归档）"""
+        if self.archive.contains(project_id):
+            with self._write_lock:
+                if self.archive.contains(project_id):
+                    self.archive.remove(project_id)
+                    self.project_index.apply({}, [project_id])
+                    self._refresh_dashboard({}, {project_id: set()})
+                    self.file_catalog.invalidate(project_id)
+                    self.history.remove(project_id)
+                    return True
+
+        with self.transaction() as projects:
+            if project_id not in projects:
+                return False
+
+            # 删除项目
+            del projects[project_id]
+            self._mark_dirty(project_id)
 
         # 删除相关的项目目录（包含所有文件）
         import shutil
         project_dir = os.path.join(self.data_dir, project_id)
         if os.path.exists(project_dir):
             shutil.rmtree(project_dir)
+        self.file_catalog.invalidate(project_id)
+        self.history.remove(project_id)
 
         return True
 
-    def _clean_filename(self, filename: str) -> str:
-        """清理Notion文件名，去掉ID部分，支持 html/txt/md 格式"""
-        if not filename:
-            return "content.html"
-
-        # 获取文件扩展名
-        import re
-        ext_match = re.search(r'\.(html?|txt|md)$', filename.lower())
-        file_ext = ext_match.group(1) if ext_match else 'html'
-        
-        # 去掉扩展名
-        name = re.sub(r'\.(html?|txt|md)$', '', filename, flags=re.IGNORECASE)
-
-        # Notion文件名通常包含32位十六进制ID，我们需要去掉这些ID
-        id_pattern = r'[a-f0-9]{32}'  # 匹配32位十六进制ID
-        name = re.sub(id_pattern, '', name, flags=re.IGNORECASE).strip()
-
-        # 清理多余的空格
-        name = re.sub(r'\s+', ' ', name).strip()
-
-        # 如果清理后文件名太短，使用默认名称
-        if not name or len(name) < 2:
-            name = "未命名文档"
-
-        # 重新添加原扩展名
-        if file_ext == 'htm':
-            file_ext = 'html'
-        name = name + f'.{file_ext}'
-
-        return name
+    def _ensure_hot(self, project_id: str):
+        """项目已归档时先恢复到热存储，使归档对调用方透明
+
+        事务中不恢复（恢复本身需要一个事务），批量方法在开启事务前对涉及的项目调用。
+        """
+        if getattr(self._tx, "projects", None) is not None:
+            return
+        if self.archive.contains(project_id):
+            self.restore_project(project_id)
+
+    @contextmanager
+    def _hot_files(self, project_id: str):
+        """写入项目目录：持有共享锁期间项目不会被归档（归档会打包并删除项目目录），已归档时先恢复"""
+        while True:
+            self._ensure_hot(project_id)
+            with self._write_lock.shared():
+                if not self.archive.contains(project_id):
+                    yield
+                    return
+
+    def archive_project(self, project_id: str) -> bool:
+        """归档项目：周报和项目目录打包为 tar.gz，从 projects.json 和 data 目录中移除，索引中保留元数据
+
+        项目不存在或已归档时返回 False。
+        """
+        import shutil
+        project_dir = os.path.join(self.data_dir, project_id)
+        with self._write_lock:
+            with self.transaction() as projects:
+                project = projects.get(project_id)
+                if project is None:
+                    return False
+                size = self.archive.write(project, project_dir, self.blob_store, self.file_catalog.project_hashes(project_id))
+                del projects[project_id]
+                self._mark_dirty(project_id)
+            # 事务提交时项目已从索引和总览统计中移除，重新写入带归档标记的元数据和统计
+            self.project_index.apply({project_id: {**self._index_entry(project), "archived": True}}, [])
+            if not self._save_dashboard({project_id: build_project_dashboard(project).model_copy(update={"archived": True})}):
+                self._rebuild_dashboard(self._load_projects())
+            if os.path.exists(project_dir):
+                shutil.rmtree(project_dir)
+            self.file_catalog.invalidate(project_id)
+        logger.info(f"项目 {project_id} 已归档，归档大小 {size} 字节")
+        return True
 
-    def save_file_content(self, project_id: str, content: str, filename: str = None, week: int = 1, relative_path: str = None):
-        """保存文件内容（支持 html/txt/md）用于后续分析，支持文件夹结构"""
-        # 创建分层目录结构: data/project_id/week/
+    def restore_project(self, project_id: str) -> bool:
+        """把归档项目恢复到热存储（解包项目目录、放回 projects.json），未归档时返回 False"""
         project_dir = os.path.join(self.data_dir, project_id)
-        week_dir = os.path.join(project_dir, f"week_{week}")
-        os.makedirs(week_dir, exist_ok=True)
-
-        if filename:
-            # 清理文件名，去掉ID部分
-            cleaned_filename = self._clean_filename(filename)
-
-            # 确保文件名是文件系统安全的
-            safe_filename = "".join(c for c in cleaned_filename if c.isalnum() or c in (' ', '-', '_', '.')).rstrip()
-            
-            # 如果有相对路径，构建文件夹结构
-            if relative_path:
-                # 处理相对路径，relative_path 应该只包含文件夹路径，不包含文件名
-                path_parts = relative_path.replace('\\', '/').split('/')
-                # 清理文件夹名称，确保是文件系统安全的
-                safe_folders = []
-                for folder in path_parts:
-                    if folder and folder != '.' and folder != '..':
-                        safe_folder = "".join(c for c in folder if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                        if safe_folder:
-                            safe_folders.append(safe_folder)
-                
-                if safe_folders:
-                    # 创建文件夹路径
-                    folder_path = os.path.join(week_dir, *safe_folders)
-                    os.makedirs(folder_path, exist_ok=True)
-                    filepath = os.path.join(folder_path, safe_filename)
-                else:
-                    filepath = os.path.join(week_dir, safe_filename)
+        with self._write_lock:
+            if not self.archive.contains(project_id):
+                return False
+            with self.transaction() as projects:
+                # 恢复后删除归档前中断时项目已在热存储中，保留热存储中的版本
+                if project_id not in projects:
+                    project = self.archive.extract(project_id, project_dir, self.blob_store)
+                    projects[project_id] = project
+                    self._mark_dirty(project_id, list(project.weeks))
+            self.archive.remove(project_id)
+            self.file_catalog.invalidate(project_id)
+        logger.info(f"项目 {project_id} 已从归档恢复")
+        return True
+
+    def collect_garbage(self) -> int:
+        """清理没有被任何周清单引用的文档 blob（删除周、项目或归档之后产生），返回清理的数量"""
+        return self.blob_store.collect_garbage(self.file_catalog.referenced_hashes())
+
+    def archive_inactive(self) -> List[str]:
+        """按归档策略归档已结束（状态）或长期未更新的项目，返回本次归档的项目 ID"""
+        policy = get_archive_policy()
+        cutoff = datetime.now() - timedelta(days=policy["idle_days"]) if policy["idle_days"] > 0 else None
+        self._ensure_index()
+        archived = []
+        for project_id, entry in self.project_index.entries().items():
+            if entry.get("archived"):
+                continue
+            finished = entry["status"] in policy["statuses"]
+            idle = cutoff is not None and datetime.fromisoformat(entry["updated_at"]) < cutoff
+            if (finished or idle) and self.archive_project(project_id):
+                archived.append(project_id)
+        return archived
+
+    def import_weeks(self, items: List[dict]) -> List[dict]:
+        """批量导入周数据（单个事务，只写一次存储）
+
+        items 中每项包含 week、data(WeekData)，以及 project_id 或 project_name；
+        只给 project_name 时会创建新项目，同一批次中同名项目只创建一次。
+        """
+        results = []
+        # 事务中不恢复归档项目，先在事务外恢复
+        for item in items:
+            if item.get("project_id"):
+                self._ensure_hot(item["project_id"])
+        with self.transaction() as projects:
+            created: Dict[str, str] = {}
+            for item in items:
+                project_id = item.get("project_id")
+                if not project_id:
+                    name = item["project_name"]
+                    if name not in created:
+                        created[name] = self.create_project(name)
+                        # create_project 默认的空第一周会被导入数据覆盖
+                        del projects[created[name]].weeks[1]
+                    project_id = created[name]
+
+                success = self.update_week_data(project_id, item["week"], item["data"], source="import")
+                results.append({"project_id": project_id, "week": item["week"], "success": success})
+        return results
+
+    def update_project_statuses(self, items: List[dict]) -> List[dict]:
+        """批量更新项目状态（单个事务，只写一次存储）"""
+        for item in items:
+            self._ensure_hot(item["project_id"])
+        with self.transaction():
+            return [
+                {"project_id": item["project_id"], "success": self.update_project_status(item["project_id"], item["status"])}
+                for item in items
+            ]
+
+    def export_projects(self, project_ids: Optional[List[str]] = None, weeks: Optional[List[int]] = None) -> Dict[str, dict]:
+        """批量导出项目数据（只加载一次存储），可按项目和周过滤；归档项目直接从归档读取，不恢复"""
+        projects = self._load_projects()
+        archived = self.archive.list_ids()
+        selected = project_ids if project_ids else list(projects.keys()) + [project_id for project_id in archived if project_id not in projects]
+
+        exported = {}
+        for project_id in selected:
+            project = projects.get(project_id)
+            if not project and project_id in archived:
+                project = self.archive.read_project(project_id)
+            if not project:
+                continue
+            data = project.dict()
+            if weeks:
+                data["weeks"] = {week: week_data for week, week_data in data["weeks"].items() if week in weeks}
+            exported[project_id] = data
+        return exported
+
+    @timed("save_file_content")
+    def save_file_content(self, project_id: str, content: str, filename: str = None, week: int = 1, relative_path: str = None,
+                          source: str = None):
+        """保存文件内容（支持 html/txt/md）用于后续分析，支持文件夹结构
+
+        内容按哈希压缩存入 blob 存储（与已有文件相同时不重复存储），周清单记录路径到内容的映射；
+        source 为上传时的原始相对路径（见 file_names.upload_source），未指定时沿用已有文件的记录。
+        """
+        # 未指定文件名时为单文件模式（content.html）
+        path = storage_path(filename, relative_path)
+
+        logger.debug(f"保存文件 {project_id} 第 {week} 周 {path}, 内容长度: {len(content)} 字符")
+
+        with self._hot_files(project_id):
+            self.file_catalog.write(project_id, week, path, content.encode('utf-8'), source)
+
+        # 回读校验只在调试时开启，避免每次写入多一次读取和解压
+        if is_write_verification_enabled():
+            saved = self.file_catalog.read(project_id, week, path)
+            if saved is not None and saved.decode('utf-8') == content:
+                logger.info(f"文件保存成功，文件大小: {len(saved)} 字节")
             else:
-                filepath = os.path.join(week_dir, safe_filename)
-        else:
-            # 单文件模式：使用默认文件名
-            final_filename = "content.html"
-            filepath = os.path.join(week_dir, final_filename)
-
-        # 记录保存的文件路径（用于调试）
-        import logging
-        logger = logging.getLogger(__name__)
-        logger.info(f"保存文件到路径: {filepath}")
-        logger.info(f"文件内容长度: {len(content)} 字符")
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        # 验证文件是否真的写入了
-        if os.path.exists(filepath):
-            actual_size = os.path.getsize(filepath)
-            logger.info(f"文件保存成功，文件大小: {actual_size} 字节")
-        else:
-            logger.error(f"文件保存失败，文件不存在: {filepath}")
+                logger.error(f"文件保存失败，回读内容不一致: {path}")
 
     def get_file_content(self, project_id: str, week: int = 1) -> Optional[str]:
-        """获取指定项目和周的所有文件内容（支持 html/txt/md）"""
-        week_dir = os.path.join(self.data_dir, project_id, f"week_{week}")
-
-        if not os.path.exists(week_dir):
-            return None
-
-        # 获取所有支持格式的文件
-        supported_extensions = ('.html', '.htm', '.txt', '.md')
-        files = [f for f in os.listdir(week_dir) 
-                 if any(f.lower().endswith(ext) for ext in supported_extensions)]
-        
+        """获取指定项目和周的所有文件内容（支持 html/txt/md），只包含周目录顶层的文件"""
+        self._ensure_hot(project_id)
+        files = [path for path in self.file_catalog.list_files(project_id, week) if '/' not in path]
         if not files:
             return None
 
         merged_content = ""
         for filename in sorted(files):  # 按文件名排序确保一致性
-            filepath = os.path.join(week_dir, filename)
             try:
-                with open(filepath, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    merged_content += f"\n\n=== 文件: {filename} ===\n{content}"
+                content = self.file_catalog.read(project_id, week, filename)
+                if content is not None:
+                    merged_content += f"\n\n=== 文件: {filename} ===\n{content.decode('utf-8')}"
             except Exception as e:
                 logger.warning(f"读取文件 {filename} 失败: {str(e)}")
 
@@ -270,58 +783,40 @@ class DataManager:
 
     def get_files(self, project_id: str, week: int = 1) -> list:
         """获取指定项目和周的所有文件列表（支持 html/txt/md），返回文件夹结构"""
-        week_dir = os.path.join(self.data_dir, project_id, f"week_{week}")
-
-        if not os.path.exists(week_dir):
-            return []
-
-        supported_extensions = ('.html', '.htm', '.txt', '.md')
-        
-        def get_files_recursive(directory, base_path=""):
-            """递归获取文件列表，保持文件夹结构"""
-            files = []
-            try:
-                items = os.listdir(directory)
-            except PermissionError:
-                return files
-            
-            for item in sorted(items):
-                item_path = os.path.join(directory, item)
-                relative_path = os.path.join(base_path, item) if base_path else item
-                
-                if os.path.isdir(item_path):
-                    # 递归处理子文件夹
-                    sub_files = get_files_recursive(item_path, relative_path)
-                    files.extend(sub_files)
-                elif os.path.isfile(item_path):
-                    # 检查文件扩展名
-                    if any(item.lower().endswith(ext) for ext in supported_extensions):
-                        # 统一使用 / 作为路径分隔符
-                        files.append(relative_path.replace('\\', '/'))
-            
-            return files
-        
-        files = get_files_recursive(week_dir)
-        return files
+        self._ensure_hot(project_id)
+        return self.file_catalog.list_files(project_id, week)
+
+    def list_directory(self, project_id: str, week: int, path: str = "", cursor: Optional[str] = None, limit: int = 200) -> Optional[dict]:
+        """分页获取指定周某一目录下的文件和子文件夹（含大小和修改时间），用于懒加载文件树"""
+        self._ensure_hot(project_id)
+        return self.file_catalog.list_directory(project_id, week, path, cursor, limit)
+
+    def get_file_info(self, project_id: str, week: int, filename: str) -> Optional[dict]:
+        """获取指定项目、周和文件名（可包含文件夹路径）的元数据 {path, hash, size, mtime[, source]}，文件不存在或越界时返回 None"""
+        self._ensure_hot(project_id)
+        info = self.file_catalog.stat(project_id, week, filename)
+        if info is None:
+            logger.warning(f"File not found: {project_id}/week_{week}/{filename}")
+        return info
+
+    def get_file_bytes(self, project_id: str, week: int, filename: str) -> Optional[bytes]:
+        """获取指定项目、周和文件名的原始内容（已解压）"""
+        self._ensure_hot(project_id)
+        return self.file_catalog.read(project_id, week, filename)
+
+    def open_file_range(self, project_id: str, week: int, filename: str, start: int = 0, end: Optional[int] = None) -> Optional[Iterator[bytes]]:
+        """按块流式读取指定文件内容的 [start, end] 闭区间（end 为 None 时到末尾），不在内存中展开整个文件"""
+        self._ensure_hot(project_id)
+        return self.file_catalog.open_range(project_id, week, filename, start, end)
 
     def get_file_content_by_name(self, project_id: str, week: int, filename: str) -> Optional[str]:
         """获取指定项目、周和文件名的文件内容（支持 html/txt/md），支持文件夹路径"""
-        week_dir = os.path.join(self.data_dir, project_id, f"week_{week}")
-        # filename 可能包含文件夹路径，如 "其他文档/file.html"
-        filepath = os.path.join(week_dir, filename.replace('/', os.sep))
-
-        logger.debug(f"Looking for file: {filepath}")
-        logger.debug(f"Week dir: {week_dir}")
-        logger.debug(f"Filename: {filename}")
-        logger.debug(f"Filepath exists: {os.path.exists(filepath)}")
-
-        if not os.path.exists(filepath):
-            logger.warning(f"File not found: {filepath}")
+        data = self.get_file_bytes(project_id, week, filename)
+        if data is None:
             return None
 
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                return f.read()
+            return data.decode('utf-8')
         except Exception as e:
-            logger.error(f"读取文件 {filepath} 失败: {str(e)}")
+            logger.error(f"读取文件 {filename} 失败: {str(e)}")
             return None
@@ -0,0 +1,239 @@
+"""
+分析耗时预估
+从已完成的分析任务中学习，按 (模型, 生成模式) 维护最近若干个样本的滚动回归：
+    prompt tokens      ≈ a + b × 输入字符数
+    completion tokens  ≈ c + d × prompt tokens
+    耗时(秒)           ≈ e + f × prompt tokens + g × completion tokens + h × 提交时排队任务数
+置信区间取历史样本上“实际耗时 / 预测耗时”的分位数；样本不足时退回固定常数估算
+"""
+import os
+import json
+import time
+import logging
+import threading
+from collections import defaultdict, deque
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+SAMPLES_FILENAME = "eta_samples.jsonl"
+
+# 每个 (模型, 模式) 保留的样本数
+WINDOW_SIZE = 50
+# 启用学习结果所需的最少样本数
+MIN_SAMPLES = 5
+# 置信区间分位数
+LOWER_QUANTILE = 0.1
+UPPER_QUANTILE = 0.9
+# 岭回归正则项，避免样本较少或特征共线时无解
+RIDGE = 1e-6
+# 样本文件超过这么多行时在启动时压缩
+COMPACT_THRESHOLD_LINES = 2000
+
+# 样本不足时的区间倍数
+DEFAULT_LOWER_RATIO = 0.6
+DEFAULT_UPPER_RATIO = 1.8
+
+
+def _solve(matrix: List[List[float]], vector: List[float]) -> Optional[List[float]]:
+    """高斯消元求解线性方程组"""
+    n = len(vector)
+    augmented = [row[:] + [vector[i]] for i, row in enumerate(matrix)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(augmented[r][col]))
+        if abs(augmented[pivot][col]) < 1e-12:
+            return None
+        augmented[col], augmented[pivot] = augmented[pivot], augmented[col]
+        for row in range(n):
+            if row == col:
+                continue
+            factor = augmented[row][col] / augmented[col][col]
+            if factor:
+                for k in range(col, n + 1):
+                    augmented[row][k] -= factor * augmented[col][k]
+    return [augmented[i][n] / augmented[i][i] for i in range(n)]
+
+
+def _least_squares(rows: Sequence[Sequence[float]], targets: Sequence[float]) -> Optional[List[float]]:
+    """最小二乘拟合（rows 已包含常数项列），通过正规方程 + 岭正则求解"""
+    if not rows:
+        return None
+    width = len(rows[0])
+    # 按列缩放，避免 token 数与排队数量级相差过大导致数值不稳定
+    scales = [max(abs(row[j]) for row in rows) or 1.0 for j in range(width)]
+    scaled = [[row[j] / scales[j] for j in range(width)] for row in rows]
+
+    normal = [[sum(r[i] * r[j] for r in scaled) + (RIDGE if i == j else 0.0) for j in range(width)] for i in range(width)]
+    rhs = [sum(r[i] * y for r, y in zip(scaled, targets)) for i in range(width)]
+    solution = _solve(normal, rhs)
+    if solution is None:
+        return None
+    return [value / scales[j] for j, value in enumerate(solution)]
+
+
+def _predict(coefficients: Sequence[float], features: Sequence[float]) -> float:
+    return sum(c * x for c, x in zip(coefficients, features))
+
+
+def _quantile(values: List[float], q: float) -> float:
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class EtaEstimator:
+    """分析任务耗时预估器，同时跟踪正在进行的任务数（排队深度）"""
+
+    def __init__(self, data_dir: str):
+        self.path = os.path.join(data_dir, SAMPLES_FILENAME)
+        self._lock = threading.Lock()
+        self._samples: Dict[Tuple[str, str], Deque[dict]] = defaultdict(lambda: deque(maxlen=WINDOW_SIZE))
+        self._models: Dict[Tuple[str, str], Optional[dict]] = {}
+        self._in_flight = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return
+        except OSError as e:
+            logger.warning(f"读取耗时样本失败: {str(e)}")
+            return
+
+        for line in lines:
+            try:
+                sample = json.loads(line)
+                self._samples[(sample["model"], sample["mode"])].append(sample)
+            except (json.JSONDecodeError, KeyError):
+                continue
+
+        if len(lines) > COMPACT_THRESHOLD_LINES:
+            # 只保留每个窗口内的样本
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                for samples in self._samples.values():
+                    for sample in samples:
+                        f.write(json.dumps(sample, ensure_ascii=False, separators=(",", ":")) + "\n")
+            os.replace(temp_path, self.path)
+
+    @property
+    def queue_depth(self) -> int:
+        """已提交但尚未完成的分析任务数"""
+        with self._lock:
+            return self._in_flight
+
+    def _fit(self, key: Tuple[str, str]) -> Optional[dict]:
+        """拟合（带缓存，新增样本后失效）"""
+        if key in self._models:
+            return self._models[key]
+
+        samples = list(self._samples.get(key, ()))
+        model = None
+        if len(samples) >= MIN_SAMPLES:
+            prompt_fit = _least_squares([(1.0, s["input_chars"]) for s in samples], [s["prompt_tokens"] for s in samples])
+            completion_fit = _least_squares([(1.0, s["prompt_tokens"]) for s in samples], [s["completion_tokens"] for s in samples])
+            time_fit = _least_squares(
+                [(1.0, s["prompt_tokens"], s["completion_tokens"], s["queue_depth"]) for s in samples],
+                [s["seconds"] for s in samples]
+            )
+            if prompt_fit and completion_fit and time_fit:
+                model = {"prompt": prompt_fit, "completion": completion_fit, "time": time_fit}
+                # 用整条预测链在历史样本上的误差比例作为置信区间
+                ratios = []
+                for s in samples:
+                    predicted = self._predict_seconds(model, s["input_chars"], s["queue_depth"])[0]
+                    if predicted > 0:
+                        ratios.append(s["seconds"] / predicted)
+                if ratios:
+                    model["lower_ratio"] = min(1.0, _quantile(ratios, LOWER_QUANTILE))
+                    model["upper_ratio"] = max(1.0, _quantile(ratios, UPPER_QUANTILE))
+                else:
+                    model["lower_ratio"], model["upper_ratio"] = DEFAULT_LOWER_RATIO, DEFAULT_UPPER_RATIO
+                model["samples"] = len(samples)
+        self._models[key] = model
+        return model
+
+    @staticmethod
+    def _predict_seconds(model: dict, input_chars: int, queue_depth: int) -> Tuple[float, float, float]:
+        prompt_tokens = max(0.0, _predict(model["prompt"], (1.0, input_chars)))
+        completion_tokens = max(0.0, _predict(model["completion"], (1.0, prompt_tokens)))
+        seconds = _predict(model["time"], (1.0, prompt_tokens, completion_tokens, queue_depth))
+        return max(seconds, 0.0), prompt_tokens, completion_tokens
+
+    def estimate(self, model_name: str, mode: str, input_chars: int,
+                 fallback_tokens: int, fallback_tokens_per_second: float) -> dict:
+        """预估新提交任务的耗时；fallback_* 为样本不足时使用的常数估算"""
+        key = (model_name, mode)
+        with self._lock:
+            queue_depth = self._in_flight
+            model = self._fit(key)
+
+        if model:
+            seconds, prompt_tokens, completion_tokens = self._predict_seconds(model, input_chars, queue_depth)
+            if seconds > 0:
+                return {
+                    "seconds": seconds,
+                    "lower_seconds": seconds * model["lower_ratio"],
+                    "upper_seconds": seconds * model["upper_ratio"],
+                    "tokens": int(prompt_tokens + completion_tokens),
+                    "queue_depth": queue_depth,
+                    "samples": model["samples"],
+                    "method": "learned"
+                }
+
+        seconds = fallback_tokens / fallback_tokens_per_second if fallback_tokens_per_second else 0.0
+        return {
+            "seconds": seconds,
+            "lower_seconds": seconds * DEFAULT_LOWER_RATIO,
+            # 样本不足时无法判断并发程度，按排队任务串行执行估算上界
+            "upper_seconds": seconds * DEFAULT_UPPER_RATIO * (1 + queue_depth),
+            "tokens": fallback_tokens,
+            "queue_depth": queue_depth,
+            "samples": len(self._samples.get(key, ())),
+            "method": "default"
+        }
+
+    def start_job(self, model_name: str, mode: str, input_chars: int) -> dict:
+        """任务提交时调用，返回的句柄在任务结束时传给 finish_job / abandon_job"""
+        with self._lock:
+            job = {
+                "model": model_name,
+                "mode": mode,
+                "input_chars": input_chars,
+                "queue_depth": self._in_flight,
+                "started_at": time.time()
+            }
+            self._in_flight += 1
+        return job
+
+    def finish_job(self, job: dict, prompt_tokens: int, completion_tokens: int):
+        """任务成功完成：记录样本（耗时从提交开始计算，包含排队时间）"""
+        sample = {
+            **{k: job[k] for k in ("model", "mode", "input_chars", "queue_depth")},
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "seconds": round(time.time() - job["started_at"], 3)
+        }
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if prompt_tokens <= 0:
+                # 调用失败时没有 token 统计，不作为样本
+                return
+            key = (sample["model"], sample["mode"])
+            self._samples[key].append(sample)
+            self._models.pop(key, None)
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(sample, ensure_ascii=False, separators=(",", ":")) + "\n")
+            except OSError as e:
+                logger.error(f"保存耗时样本失败: {str(e)}")
+
+    def abandon_job(self, job: dict):
+        """任务失败：只减少排队计数"""
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
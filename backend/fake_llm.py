@@ -0,0 +1,211 @@
+"""
+本地模拟 LLM 服务
+兼容 OpenAI Chat Completions 接口（含 stream），按配置的首 token 延迟和 tokens/秒 输出符合周报 Schema 的 JSON，
+用于在不调用真实模型的情况下做性能对比和压测。
+
+用法：
+    python fake_llm.py --port 8090 --latency 0.5 --tokens-per-second 600
+    OPENAI_API_BASE=http://127.0.0.1:8090/v1 python main.py
+"""
+import json
+import time
+import uuid
+import argparse
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 每个模拟 token 对应的字符数
+CHARS_PER_TOKEN = 2
+# 流式输出的发送间隔（秒）
+STREAM_TICK_SECONDS = 0.02
+
+DEFAULT_SECTIONS = (
+    "completed_tasks",
+    "incomplete_tasks",
+    "motivation_direction",
+    "internal_reflection",
+    "external_feedback",
+    "next_week_plan",
+)
+
+
+def _section_item(section: str, index: int):
+    """生成一条分区示例数据"""
+    filler = "模拟输出内容用于性能测试"
+    if section == "completed_tasks":
+        return {"task": f"完成任务 {index}", "description": f"{filler}（第 {index} 项）"}
+    if section == "incomplete_tasks":
+        return {"task": f"未完成任务 {index}", "expected": f"预期目标 {index}", "reason": filler}
+    if section == "external_feedback":
+        return {"source": f"反馈来源 {index}", "content": filler}
+    if section == "next_week_plan":
+        return {"task": f"下周任务 {index}", "priority": "P1", "goal": filler}
+    return f"{filler} {index}"
+
+
+def build_output(sections, section_tokens: int) -> str:
+    """按分区生成 JSON 文本，每个分区约 section_tokens 个模拟 token"""
+    target_chars = section_tokens * CHARS_PER_TOKEN
+    data = {}
+    for section in sections:
+        items = []
+        while len(json.dumps(items, ensure_ascii=False)) < target_chars:
+            items.append(_section_item(section, len(items) + 1))
+        data[section] = items
+    return json.dumps(data, ensure_ascii=False)
+
+
+def _requested_sections(body: dict):
+    """从 response_format 的 JSON Schema 中读取需要输出的分区"""
+    response_format = body.get("response_format") or {}
+    schema = (response_format.get("json_schema") or {}).get("schema") or {}
+    properties = schema.get("properties")
+    if properties:
+        return tuple(name for name in properties if name in DEFAULT_SECTIONS) or DEFAULT_SECTIONS
+    return DEFAULT_SECTIONS
+
+
+class FakeLLMServer:
+    """在后台线程中运行的模拟服务"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.3,
+                 tokens_per_second: float = 600, section_tokens: int = 1000):
+        self.latency = latency
+        self.tokens_per_second = tokens_per_second
+        self.section_tokens = section_tokens
+        self.request_count = 0
+        self._count_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def api_base(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "FakeLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-llm", daemon=True)
+        self._thread.start()
+        logger.info(f"模拟 LLM 服务已启动: {self.api_base}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        logger.info(f"模拟 LLM 服务已启动: {self.api_base}")
+        self._server.serve_forever()
+
+    def _handler_class(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def do_POST(self):
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(length) or b"{}")
+                with fake._count_lock:
+                    fake.request_count += 1
+
+                output = build_output(_requested_sections(body), fake.section_tokens)
+                prompt_chars = sum(len(message.get("content") or "") for message in body.get("messages", []))
+                usage = {
+                    "prompt_tokens": prompt_chars // CHARS_PER_TOKEN,
+                    "completion_tokens": len(output) // CHARS_PER_TOKEN,
+                }
+                usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+
+                time.sleep(fake.latency)
+                if body.get("stream"):
+                    self._stream(body, output, usage)
+                else:
+                    time.sleep(usage["completion_tokens"] / fake.tokens_per_second)
+                    self._send_json({
+                        "id": f"chatcmpl-{uuid.uuid4().hex}",
+                        "object": "chat.completion",
+                        "created": int(time.time()),
+                        "model": body.get("model"),
+                        "choices": [{
+                            "index": 0,
+                            "message": {"role": "assistant", "content": output},
+                            "finish_reason": "stop"
+                        }],
+                        "usage": usage
+                    })
+
+            def _send_json(self, payload: dict):
+                data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _stream(self, body: dict, output: str, usage: Dict[str, int]):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                chunk_id = f"chatcmpl-{uuid.uuid4().hex}"
+                chars_per_tick = max(1, int(fake.tokens_per_second * STREAM_TICK_SECONDS * CHARS_PER_TOKEN))
+
+                def event(payload: dict):
+                    self.wfile.write(f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                for start in range(0, len(output), chars_per_tick):
+                    event({
+                        "id": chunk_id,
+                        "object": "chat.completion.chunk",
+                        "model": body.get("model"),
+                        "choices": [{"index": 0, "delta": {"content": output[start:start + chars_per_tick]}, "finish_reason": None}]
+                    })
+                    time.sleep(STREAM_TICK_SECONDS)
+                event({
+                    "id": chunk_id,
+                    "object": "chat.completion.chunk",
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]
+                })
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    event({"id": chunk_id, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="本地模拟 LLM 服务（OpenAI Chat Completions 兼容）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency", type=float, default=0.3, help="首 token 延迟（秒）")
+    parser.add_argument("--tokens-per-second", type=float, default=600, help="单个请求的输出速度")
+    parser.add_argument("--section-tokens", type=int, default=1000, help="每个分区输出的 token 数")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    server = FakeLLMServer(args.host, args.port, args.latency, args.tokens_per_second, args.section_tokens)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,303 @@
+"""
+周文件目录
+每周的文件列表保存在 data/{项目}/week_{n}/manifest.jsonl（只追加，每行 {path, hash, size, mtime}，
+上传的文件另有 source 记录原始相对路径；同一路径以最后一行为准），
+文件内容按哈希存放在 blob_store 中。目录按清单文件的版本缓存，支持游标分页。
+旧版本直接写在周目录中的文件在第一次访问该周时迁移到 blob 存储。
+"""
+import os
+import glob
+import json
+import time
+import bisect
+import logging
+import threading
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from blob_store import BlobStore
+from file_names import SUPPORTED_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = "manifest.jsonl"
+
+# 单页默认/最大条目数
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 1000
+
+
+class _WeekListing:
+    """一周的文件清单：{路径: 条目} 和按目录分组、按名称排序的条目"""
+
+    def __init__(self, files: Dict[str, dict]):
+        self.files = files
+        self.dirs: Dict[str, List[dict]] = {"": []}
+        folders: Dict[str, dict] = {}
+        for path, entry in files.items():
+            parts = path.split('/')
+            for depth in range(1, len(parts)):
+                folder_path = '/'.join(parts[:depth])
+                folder = folders.get(folder_path)
+                if folder is None:
+                    folder = folders[folder_path] = {
+                        "name": parts[depth - 1], "path": folder_path, "type": "folder", "size": None, "mtime": entry["mtime"]
+                    }
+                    self.dirs.setdefault('/'.join(parts[:depth - 1]), []).append(folder)
+                    self.dirs.setdefault(folder_path, [])
+                folder["mtime"] = max(folder["mtime"], entry["mtime"])
+            self.dirs.setdefault('/'.join(parts[:-1]), []).append({
+                "name": parts[-1], "path": path, "type": "file", "size": entry["size"], "mtime": entry["mtime"]
+            })
+        for entries in self.dirs.values():
+            entries.sort(key=lambda item: item["name"])
+
+
+class FileCatalog:
+    """按 (项目, 周) 缓存的文件目录
+
+    缓存以清单文件的 inode + mtime + 大小为版本号，其他进程追加的条目下次读取时生效。
+    """
+
+    def __init__(self, data_dir: str, blob_store: BlobStore):
+        self.data_dir = data_dir
+        self.blobs = blob_store
+        # (project_id, week) -> (清单版本, 文件清单)
+        self._cache: Dict[Tuple[str, int], Tuple[tuple, _WeekListing]] = {}
+        self._lock = threading.Lock()
+
+    def _week_dir(self, project_id: str, week: int) -> str:
+        return os.path.join(self.data_dir, project_id, f"week_{week}")
+
+    def _manifest_path(self, project_id: str, week: int) -> str:
+        return os.path.join(self._week_dir(project_id, week), MANIFEST_FILENAME)
+
+    @staticmethod
+    def _normalize_dir(path: Optional[str]) -> str:
+        """规范化目录相对路径，拒绝越界访问"""
+        if not path:
+            return ""
+        parts = [p for p in path.replace('\\', '/').split('/') if p and p != '.']
+        if any(p == '..' for p in parts):
+            raise ValueError(f"非法目录路径: {path}")
+        return '/'.join(parts)
+
+    def invalidate(self, project_id: str, week: Optional[int] = None):
+        """删除周/项目后失效缓存；week 为空时失效整个项目"""
+        with self._lock:
+            if week is None:
+                for key in [k for k in self._cache if k[0] == project_id]:
+                    del self._cache[key]
+            else:
+                self._cache.pop((project_id, week), None)
+
+    def _migrate(self, project_id: str, week: int):
+        """把旧版本写在周目录中的文件移入 blob 存储并生成清单
+
+        清单用硬链接创建（已存在时放弃本次结果），多个进程同时迁移时只有一个生效；
+        原文件在清单生效之后才删除。
+        """
+        week_dir = self._week_dir(project_id, week)
+        lines = []
+        migrated = []
+        for root, _, names in os.walk(week_dir):
+            for name in sorted(names):
+                if not name.lower().endswith(SUPPORTED_EXTENSIONS):
+                    continue
+                filepath = os.path.join(root, name)
+                try:
+                    with open(filepath, "rb") as f:
+                        data = f.read()
+                    mtime = os.stat(filepath).st_mtime
+                except FileNotFoundError:
+                    continue
+                path = os.path.relpath(filepath, week_dir).replace(os.sep, '/')
+                lines.append(json.dumps({"path": path, "hash": self.blobs.put(data), "size": len(data), "mtime": mtime},
+                                        ensure_ascii=False) + "\n")
+                migrated.append(filepath)
+
+        manifest = self._manifest_path(project_id, week)
+        tmp_path = f"{manifest}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(lines)
+        try:
+            os.link(tmp_path, manifest)
+        except FileExistsError:
+            return
+        finally:
+            os.remove(tmp_path)
+
+        for filepath in migrated:
+            try:
+                os.remove(filepath)
+            except FileNotFoundError:
+                pass
+        # 删除迁移后留下的空文件夹
+        for root, dirs, names in os.walk(week_dir, topdown=False):
+            if root != week_dir and not dirs and not names:
+                try:
+                    os.rmdir(root)
+                except OSError:
+                    pass
+        if migrated:
+            logger.info(f"已把项目 {project_id} 第 {week} 周的 {len(migrated)} 个文件迁移到 blob 存储")
+
+    def _listing(self, project_id: str, week: int) -> Optional[_WeekListing]:
+        """获取该周的文件清单（清单变化时重新读取），该周没有文件时返回 None"""
+        manifest = self._manifest_path(project_id, week)
+        try:
+            stat = os.stat(manifest)
+        except FileNotFoundError:
+            if not os.path.isdir(self._week_dir(project_id, week)):
+                self.invalidate(project_id, week)
+                return None
+            self._migrate(project_id, week)
+            stat = os.stat(manifest)
+
+        signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        key = (project_id, week)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[0] == signature:
+                return cached[1]
+
+        files: Dict[str, dict] = {}
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    # 其他进程正在追加的末行
+                    break
+                try:
+                    entry = json.loads(line)
+                    files[entry["path"]] = entry
+                except (ValueError, KeyError):
+                    logger.warning(f"项目 {project_id} 第 {week} 周的文件清单中存在无法解析的行，已跳过")
+        listing = _WeekListing(files)
+        with self._lock:
+            self._cache[key] = (signature, listing)
+        return listing
+
+    def write(self, project_id: str, week: int, path: str, data: bytes, source: Optional[str] = None):
+        """写入文件：内容存入 blob 存储，清单追加一行（覆盖同一路径的旧内容）
+
+        source 为上传时的原始相对路径，未指定时沿用同一路径旧条目的 source（例如在线编辑）。
+        """
+        week_dir = self._week_dir(project_id, week)
+        manifest = self._manifest_path(project_id, week)
+        if os.path.isdir(week_dir) and not os.path.exists(manifest):
+            self._migrate(project_id, week)
+        os.makedirs(week_dir, exist_ok=True)
+
+        entry = {"path": path, "hash": self.blobs.put(data), "size": len(data), "mtime": time.time()}
+        if source is None:
+            previous = self.stat(project_id, week, path)
+            source = previous.get("source") if previous else None
+        if source is not None:
+            entry["source"] = source
+        line = json.dumps(entry, ensure_ascii=False) + "\n"
+        # O_APPEND 单次写入，多个进程同时追加时各行保持完整
+        fd = os.open(manifest, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+        self.invalidate(project_id, week)
+
+    def stat(self, project_id: str, week: int, path: str) -> Optional[dict]:
+        """文件的清单条目 {path, hash, size, mtime[, source]}，不存在或路径越界时返回 None"""
+        try:
+            path = self._normalize_dir(path)
+        except ValueError:
+            logger.warning(f"拒绝访问周目录之外的文件: {path}")
+            return None
+        listing = self._listing(project_id, week)
+        entry = listing.files.get(path) if listing else None
+        return dict(entry) if entry else None
+
+    def read(self, project_id: str, week: int, path: str) -> Optional[bytes]:
+        """读取文件内容（自动解压），不存在时返回 None"""
+        entry = self.stat(project_id, week, path)
+        if entry is None:
+            return None
+        data = self.blobs.get(entry["hash"])
+        if data is None:
+            logger.error(f"文件 {path} 的内容 {entry['hash']} 在 blob 存储中不存在")
+        return data
+
+    def open_range(self, project_id: str, week: int, path: str, start: int = 0, end: Optional[int] = None) -> Optional[Iterator[bytes]]:
+        """按块流式读取文件内容的 [start, end] 闭区间（只解压到 end），不存在时返回 None"""
+        entry = self.stat(project_id, week, path)
+        if entry is None:
+            return None
+        chunks = self.blobs.open_range(entry["hash"], start, end)
+        if chunks is None:
+            logger.error(f"文件 {path} 的内容 {entry['hash']} 在 blob 存储中不存在")
+        return chunks
+
+    def project_hashes(self, project_id: str) -> Set[str]:
+        """项目各周清单引用的全部 blob"""
+        return self._hashes(os.path.join(self.data_dir, project_id, "week_*", MANIFEST_FILENAME))
+
+    def referenced_hashes(self) -> Set[str]:
+        """所有项目的清单引用的全部 blob（清理未引用的 blob 时使用）"""
+        return self._hashes(os.path.join(self.data_dir, "*", "week_*", MANIFEST_FILENAME))
+
+    @staticmethod
+    def _hashes(pattern: str) -> Set[str]:
+        """按清单文件模式收集引用的 blob（同一路径只计最后一行，被覆盖的旧内容不再算作引用）"""
+        hashes = set()
+        for manifest in glob.glob(pattern):
+            latest: Dict[str, str] = {}
+            try:
+                with open(manifest, "r", encoding="utf-8") as f:
+                    for line in f:
+                        try:
+                            entry = json.loads(line)
+                            latest[entry["path"]] = entry["hash"]
+                        except (ValueError, KeyError):
+                            continue
+            except FileNotFoundError:
+                continue
+            hashes.update(latest.values())
+        return hashes
+
+    def list_files(self, project_id: str, week: int) -> List[str]:
+        """递归获取所有文件的相对路径（每层按名称排序，文件夹在其名称位置展开）"""
+        listing = self._listing(project_id, week)
+        if listing is None:
+            return []
+        files: List[str] = []
+
+        def walk(rel_dir: str):
+            for item in listing.dirs.get(rel_dir, ()):
+                if item["type"] == "folder":
+                    walk(item["path"])
+                else:
+                    files.append(item["path"])
+
+        walk("")
+        return files
+
+    def list_directory(self, project_id: str, week: int, path: str = "", cursor: Optional[str] = None,
+                       limit: int = DEFAULT_PAGE_SIZE) -> Optional[dict]:
+        """获取单个目录的一页条目，cursor 为上一页最后一个条目的名称"""
+        rel_dir = self._normalize_dir(path)
+        limit = max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+
+        listing = self._listing(project_id, week)
+        entries = listing.dirs.get(rel_dir) if listing else None
+        if entries is None:
+            return None
+
+        start = 0
+        if cursor:
+            names = [item["name"] for item in entries]
+            start = bisect.bisect_right(names, cursor)
+
+        page = entries[start:start + limit]
+        has_more = start + limit < len(entries)
+        return {
+            "path": rel_dir,
+            "entries": page,
+            "total": len(entries),
+            "next_cursor": page[-1]["name"] if has_more and page else None
+        }
@@ -0,0 +1,113 @@
+"""
+跨进程文件锁
+多个 uvicorn worker 共享 data 目录时，用 fcntl.flock 协调对存储的读写：
+写入持有排他锁，读取持有共享锁；同一进程内的线程另外由 RLock 串行化写入。
+不支持 fcntl 的平台（Windows）退化为只有进程内锁，此时只能单进程运行。
+"""
+import os
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+
+def _open_lock_file(path: str) -> int:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    return os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+
+class FileLock:
+    """读写锁：with lock 获取排他锁（同一线程可重入），with lock.shared() 获取共享锁
+
+    持有排他锁的线程再获取共享锁时直接通过；持有共享锁时不能再获取排他锁（会死锁）。
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._thread_lock = threading.RLock()
+        self._local = threading.local()
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        depth = getattr(self._local, "depth", 0)
+        if depth == 0 and fcntl is not None:
+            try:
+                fd = _open_lock_file(self.path)
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            except Exception:
+                self._thread_lock.release()
+                raise
+            self._local.fd = fd
+        self._local.depth = depth + 1
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self._local.depth -= 1
+        try:
+            if self._local.depth == 0 and fcntl is not None:
+                fd, self._local.fd = self._local.fd, None
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+        finally:
+            self._thread_lock.release()
+
+    @contextmanager
+    def shared(self):
+        """共享锁：等待其他进程的写入完成，读取期间阻止写入"""
+        if fcntl is None or getattr(self._local, "depth", 0) > 0 or getattr(self._local, "shared", 0) > 0:
+            yield
+            return
+
+        fd = _open_lock_file(self.path)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            self._local.shared = 1
+            yield
+        finally:
+            self._local.shared = 0
+            os.close(fd)
+
+
+class JobClaims:
+    """分析任务认领：同一 (项目, 周) 同一时间只允许一个 worker 运行分析
+
+    用非阻塞排他锁实现，持有锁的进程退出时锁自动释放，不会留下失效的认领。
+    """
+
+    def __init__(self, data_dir: str):
+        self.jobs_dir = os.path.join(data_dir, "jobs")
+        self._lock = threading.Lock()
+        self._held = {}
+
+    def _path(self, project_id: str, week: int) -> str:
+        return os.path.join(self.jobs_dir, f"{project_id}_week_{week}.lock")
+
+    def claim(self, project_id: str, week: int) -> bool:
+        """尝试认领任务，已被（本进程或其他进程）认领时返回 False"""
+        key = (project_id, week)
+        with self._lock:
+            if key in self._held:
+                return False
+            fd = _open_lock_file(self._path(project_id, week))
+            if fcntl is not None:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    return False
+            self._held[key] = fd
+            return True
+
+    def release(self, project_id: str, week: int):
+        """释放认领（未认领时忽略）"""
+        with self._lock:
+            fd: Optional[int] = self._held.pop((project_id, week), None)
+        if fd is None:
+            return
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
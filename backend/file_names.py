@@ -0,0 +1,129 @@
+"""
+上传文件的名称规范化
+- clean_filename：去掉 Notion 导出文件名中的 32 位 ID，统一扩展名（.htm -> .html，缺省为 .html），用作展示和分析的文档名
+- storage_path：文档名 + 相对文件夹 -> 周目录中的存储路径（只保留文件系统安全的字符）
+- normalize_uploads：批量处理一次上传的全部文件，规范化后与本批或目标周已有的其他文档存储路径相同的文件自动加序号，避免互相覆盖
+- upload_source：上传时的原始相对路径，记录在周清单中，用于判断再次上传的是否为同一文档
+正则在导入时编译；一批上传中相同的文件夹只清理一次。
+"""
+import re
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+SUPPORTED_EXTENSIONS = ('.html', '.htm', '.txt', '.md')
+DEFAULT_FILENAME = "content.html"
+UNTITLED_NAME = "未命名文档"
+
+_EXTENSION_RE = re.compile(r'\.(html?|txt|md)$', re.IGNORECASE)
+# Notion 文件名通常包含 32 位十六进制 ID
+_NOTION_ID_RE = re.compile(r'[a-f0-9]{32}', re.IGNORECASE)
+_SPACES_RE = re.compile(r'\s+')
+# \w 与 str.isalnum() 一致（另含下划线），与原来逐字符过滤保留的字符相同
+_UNSAFE_FILENAME_RE = re.compile(r'[^\w \-.]')
+_UNSAFE_FOLDER_RE = re.compile(r'[^\w \-]')
+
+
+def file_extension(filename: Optional[str]) -> str:
+    """小写的扩展名（含点），没有扩展名时返回空字符串；filename 可以带路径"""
+    if not filename:
+        return ''
+    basename = filename.replace('\\', '/').rsplit('/', 1)[-1]
+    _, dot, ext = basename.rpartition('.')
+    return '.' + ext.lower() if dot else ''
+
+
+def is_supported(filename: Optional[str]) -> bool:
+    """是否为支持的文档格式（html/htm/txt/md）"""
+    return file_extension(filename) in SUPPORTED_EXTENSIONS
+
+
+def clean_filename(filename: Optional[str]) -> str:
+    """清理 Notion 文件名，去掉 ID 部分，支持 html/txt/md 格式"""
+    if not filename:
+        return DEFAULT_FILENAME
+
+    ext_match = _EXTENSION_RE.search(filename)
+    file_ext = ext_match.group(1).lower() if ext_match else 'html'
+    name = filename[:ext_match.start()] if ext_match else filename
+
+    name = _NOTION_ID_RE.sub('', name)
+    name = _SPACES_RE.sub(' ', name).strip()
+
+    # 如果清理后文件名太短，使用默认名称
+    if len(name) < 2:
+        name = UNTITLED_NAME
+
+    if file_ext == 'htm':
+        file_ext = 'html'
+    return f"{name}.{file_ext}"
+
+
+def _safe_folders(relative_path: Optional[str]) -> List[str]:
+    """相对路径 -> 文件系统安全的文件夹名列表（丢弃空段、. 和 ..）"""
+    if not relative_path:
+        return []
+    folders = []
+    for folder in relative_path.replace('\\', '/').split('/'):
+        if folder and folder not in ('.', '..'):
+            safe_folder = _UNSAFE_FOLDER_RE.sub('', folder).rstrip()
+            if safe_folder:
+                folders.append(safe_folder)
+    return folders
+
+
+def storage_path(filename: Optional[str], relative_path: Optional[str] = None) -> str:
+    """文档在周目录中的存储路径（文件夹/文件名，以 / 分隔）"""
+    if not filename:
+        return DEFAULT_FILENAME
+    safe_filename = _UNSAFE_FILENAME_RE.sub('', clean_filename(filename)).rstrip()
+    return '/'.join(_safe_folders(relative_path) + [safe_filename])
+
+
+def upload_source(filename: Optional[str], relative_path: Optional[str] = None) -> str:
+    """上传时的原始相对路径（文件夹/原文件名，未清理），同一文档再次上传时相同"""
+    folders = [folder for folder in (relative_path or '').replace('\\', '/').split('/') if folder]
+    return '/'.join(folders + [filename or ''])
+
+
+def normalize_uploads(files: Sequence[Tuple[Optional[str], Optional[str]]],
+                      existing: Iterable[str] = (),
+                      same_document: Optional[Callable[[int, str], bool]] = None) -> List[Tuple[str, str]]:
+    """批量规范化一次上传的文件
+
+    files 为 [(原文件名, 相对文件夹)]，返回与之一一对应的 [(文档名, 存储路径)]；
+    existing 为目标周中已有文件的存储路径（file_catalog 清单中的路径）。
+    规范化后存储路径重复的文件（例如只有 Notion ID 不同的两个页面）中，第一个保留原名，
+    其余依次改名为 "名称 2.html"、"名称 3.html"。与已有文件重复时，same_document(序号, 路径) 为真
+    （再次上传的是同一文档，包括之前已编号保存的）则覆盖该文件，否则同样改名。
+    """
+    folder_cache: Dict[Optional[str], str] = {}
+    results = []
+    for filename, relative_path in files:
+        prefix = folder_cache.get(relative_path)
+        if prefix is None:
+            prefix = folder_cache[relative_path] = ''.join(folder + '/' for folder in _safe_folders(relative_path))
+        name = clean_filename(filename)
+        results.append((name, prefix, prefix + _UNSAFE_FILENAME_RE.sub('', name).rstrip()))
+
+    existing = set(existing)
+    used = existing | {path for _, _, path in results}
+    claimed = set()
+
+    def replaces(index: int, path: str) -> bool:
+        return path in existing and path not in claimed and same_document is not None and same_document(index, path)
+
+    normalized = []
+    for index, (name, prefix, path) in enumerate(results):
+        if path in claimed or (path in existing and not replaces(index, path)):
+            stem, ext = name.rsplit('.', 1)
+            counter = 2
+            while True:
+                name = f"{stem} {counter}.{ext}"
+                path = prefix + _UNSAFE_FILENAME_RE.sub('', name).rstrip()
+                counter += 1
+                # 已编号保存过的同一文档同样覆盖
+                if path not in used or replaces(index, path):
+                    break
+            used.add(path)
+        claimed.add(path)
+        normalized.append((name, path))
+    return normalized
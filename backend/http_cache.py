@@ -0,0 +1,336 @@
+"""
+HTTP 缓存与压缩
+包括 JSON 接口的内容哈希 ETag / 304、响应压缩中间件、文档的 ETag/Range 响应、生产环境静态资源指纹缓存
+"""
+import os
+import re
+import json
+import zlib
+import hashlib
+import logging
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response, StreamingResponse
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.staticfiles import StaticFiles as StarletteStaticFiles
+
+try:
+    import brotli  # 可选依赖，未安装时只使用 gzip
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# 可压缩的响应类型
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "image/svg+xml")
+# 需要逐条实时送达的流式类型，压缩会把事件攒在缓冲区里
+STREAMING_TYPES = ("text/event-stream",)
+
+# 文档类型（按扩展名，text/* 的 charset 由 Response 自动补充）
+DOCUMENT_MEDIA_TYPES = {
+    ".html": "text/html",
+    ".htm": "text/html",
+    ".md": "text/markdown",
+    ".txt": "text/plain",
+}
+
+
+def compute_etag(body: bytes) -> str:
+    """根据响应内容计算强 ETag"""
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """判断 If-None-Match 是否命中（忽略弱校验前缀，兼容压缩后的弱 ETag）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+def conditional_response(request: Request, body: bytes, media_type: str, headers: Optional[Dict[str, str]] = None) -> Response:
+    """带 ETag 的响应，客户端缓存未变化时返回 304"""
+    etag = compute_etag(body)
+    response_headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if headers:
+        response_headers.update(headers)
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=response_headers)
+    return Response(content=body, media_type=media_type, headers=response_headers)
+
+
+def conditional_json(request: Request, payload: Any) -> Response:
+    """序列化 JSON 并按内容哈希生成 ETag"""
+    body = json.dumps(
+        jsonable_encoder(payload),
+        ensure_ascii=False,
+        separators=(",", ":")
+    ).encode("utf-8")
+    return conditional_response(request, body, "application/json")
+
+
+def media_type_for(filename: str) -> str:
+    """根据文件扩展名返回 Content-Type"""
+    ext = os.path.splitext(filename.lower())[1]
+    return DOCUMENT_MEDIA_TYPES.get(ext, "text/plain")
+
+
+def content_etag(digest: str) -> str:
+    """按内容哈希生成的强 ETag（blob 存储中的文档不需要读取内容即可得到）"""
+    return f'"{digest}"'
+
+
+def _parse_range(range_header: str, file_size: int) -> Optional[Tuple[int, int]]:
+    """解析单段 Range 头，返回闭区间 (start, end)；不可满足时返回 None"""
+    units, _, spec = range_header.partition("=")
+    if units.strip().lower() != "bytes" or "," in spec:
+        return None
+    start_text, _, end_text = spec.strip().partition("-")
+    try:
+        if start_text == "":
+            # bytes=-N：最后 N 个字节
+            length = int(end_text)
+            if length <= 0:
+                return None
+            start = max(file_size - length, 0)
+            end = file_size - 1
+        else:
+            start = int(start_text)
+            end = int(end_text) if end_text else file_size - 1
+    except ValueError:
+        return None
+    end = min(end, file_size - 1)
+    if start > end or start >= file_size:
+        return None
+    return start, end
+
+
+def content_response(request: Request, digest: str, size: int,
+                     open_range: Callable[[int, int], Optional[Iterator[bytes]]], media_type: str) -> Response:
+    """返回 blob 存储中的文档，支持 ETag/304 和单段 Range
+
+    ETag 即内容哈希，命中缓存或 Range 不可满足时不读取内容；open_range(start, end) 按块返回闭区间内的内容，
+    响应边解压边发送，Range 请求只解压到区间末尾。open_range 返回 None 时返回 404。
+    """
+    etag = content_etag(digest)
+    headers = {"ETag": etag, "Accept-Ranges": "bytes", "Cache-Control": "no-cache"}
+
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+
+    byte_range = None
+    range_header = request.headers.get("range")
+    if range_header:
+        # If-Range 不匹配时忽略 Range，返回完整内容
+        if_range = request.headers.get("if-range")
+        if not if_range or _etag_matches(if_range, etag):
+            byte_range = _parse_range(range_header, size)
+            if byte_range is None:
+                headers["Content-Range"] = f"bytes */{size}"
+                return Response(status_code=416, headers=headers)
+
+    status_code = 200
+    start, end = 0, size - 1
+    if byte_range is not None:
+        status_code = 206
+        start, end = byte_range
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+
+    chunks = open_range(start, end)
+    if chunks is None:
+        return Response(status_code=404)
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(chunks, status_code=status_code, media_type=media_type, headers=headers)
+
+
+class CompressionMiddleware:
+    """gzip/brotli 响应压缩中间件
+
+    只压缩超过 minimum_size 的文本类响应；已编码、206/304 响应和 Range 请求直接透传。
+    客户端支持且安装了 brotli 时优先使用 br。
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def _choose_encoding(self, accept_encoding: str) -> Optional[str]:
+        accepted = {item.split(";")[0].strip().lower() for item in accept_encoding.split(",") if item.strip()}
+        if brotli is not None and "br" in accepted:
+            return "br"
+        if "gzip" in accepted:
+            return "gzip"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        encoding = self._choose_encoding(request_headers.get("accept-encoding", ""))
+        if encoding is None or "range" in request_headers:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressingResponder(send, encoding, self.minimum_size, self.gzip_level, self.brotli_quality)
+        await self.app(scope, receive, responder)
+
+
+class _CompressingResponder:
+    def __init__(self, send, encoding: str, minimum_size: int, gzip_level: int, brotli_quality: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.start_message = None
+        self.compressor = None
+        self.passthrough = False
+
+    def _new_compressor(self):
+        if self.encoding == "br":
+            return brotli.Compressor(quality=self.brotli_quality)
+        # wbits=31 生成带 gzip 头的数据流
+        return zlib.compressobj(self.gzip_level, zlib.DEFLATED, 31)
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.process(data)
+        return self.compressor.compress(data)
+
+    def _flush(self) -> bytes:
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+    def _should_compress(self, headers: Headers, status: int) -> bool:
+        if status in (204, 206, 304) or status < 200:
+            return False
+        if "content-encoding" in headers:
+            return False
+        content_type = headers.get("content-type", "")
+        if content_type.startswith(STREAMING_TYPES):
+            return False
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def __call__(self, message):
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            self.passthrough = not self._should_compress(headers, message["status"])
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message_type != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            # 第一个 body 片段：小响应直接透传
+            if not more_body and len(body) < self.minimum_size:
+                self.passthrough = True
+                await self.send(self.start_message)
+                await self.send(message)
+                return
+
+            self.compressor = self._new_compressor()
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            # 压缩后内容与原始字节不同，强 ETag 降级为弱 ETag
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                headers["ETag"] = "W/" + etag
+
+            if not more_body:
+                compressed = self._compress(body) + self._flush()
+                headers["Content-Length"] = str(len(compressed))
+                await self.send(self.start_message)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+            del headers["Content-Length"]
+            await self.send(self.start_message)
+
+        chunk = self._compress(body)
+        if not more_body:
+            chunk += self._flush()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+
+class FingerprintedStaticFiles(StarletteStaticFiles):
+    """生产环境静态资源：index.html 中的 js/css 引用附加内容哈希，带正确哈希的资源长期缓存"""
+
+    ASSET_PATTERN = re.compile(r'((?:src|href)=")((?:js|css)/[^"?#]+)(")')
+    IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._fingerprints = self._build_fingerprints()
+        self._index_html = self._render_index()
+        logger.info(f"静态资源指纹已生成: {len(self._fingerprints)} 个文件")
+
+    def _build_fingerprints(self) -> Dict[str, str]:
+        fingerprints = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith((".js", ".css")):
+                    continue
+                full_path = os.path.join(root, name)
+                rel_path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+                with open(full_path, "rb") as f:
+                    fingerprints[rel_path] = hashlib.sha1(f.read()).hexdigest()[:12]
+        return fingerprints
+
+    def _render_index(self) -> Optional[bytes]:
+        index_path = os.path.join(self.directory, "index.html")
+        if not os.path.exists(index_path):
+            return None
+        with open(index_path, "r", encoding="utf-8") as f:
+            html = f.read()
+
+        def add_version(match):
+            asset = match.group(2)
+            version = self._fingerprints.get(asset)
+            if not version:
+                return match.group(0)
+            return f"{match.group(1)}{asset}?v={version}{match.group(3)}"
+
+        return self.ASSET_PATTERN.sub(add_version, html).encode("utf-8")
+
+    async def get_response(self, path, scope):
+        normalized = path.replace(os.sep, "/")
+        if self._index_html is not None and normalized in ("", ".", "index.html"):
+            request = Request(scope)
+            return conditional_response(request, self._index_html, "text/html; charset=utf-8")
+
+        response = await super().get_response(path, scope)
+        query = dict(
+            item.split("=", 1) for item in scope.get("query_string", b"").decode("latin-1").split("&") if "=" in item
+        )
+        version = self._fingerprints.get(normalized)
+        if version and query.get("v") == version and response.status_code == 200:
+            response.headers["Cache-Control"] = self.IMMUTABLE_CACHE
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+        return response
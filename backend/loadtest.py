@@ -0,0 +1,374 @@
+"""
+并发压测
+模拟多个用户同时使用：轮询项目列表和周报、编辑周报、上传文档、AI 聊天，
+按路由统计 p50/p95/p99 延迟、吞吐和错误率，用于评估单个实例能支撑的并发用户数。
+
+默认在子进程中启动模拟 LLM（fake_llm.py）和应用（使用临时数据目录），也可以用 --base-url 压测已运行的实例
+（见 docker-compose.yml 中的 loadtest profile）。
+
+用法：
+    python loadtest.py --users 20 --duration 60
+    python loadtest.py --base-url http://127.0.0.1:8081 --users 50 --duration 300 --output loadtest.json
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import random
+import shutil
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from synthetic_corpus import notion_corpus
+
+# 各类操作的默认权重（每个虚拟用户每轮按权重随机选择一种）
+DEFAULT_WEIGHTS = {"poll": 60, "edit": 20, "chat": 15, "upload": 5}
+
+# 路由模板，统计按模板聚合
+ROUTE_PROJECTS = "GET /api/projects"
+ROUTE_DASHBOARD = "GET /api/dashboard"
+ROUTE_WEEK = "GET /api/projects/{id}/week/{week}"
+ROUTE_EDIT = "PUT /api/projects/{id}/week/{week}"
+ROUTE_UPLOAD = "POST /api/upload"
+ROUTE_CHAT = "POST /api/ai/chat"
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _wait_until_ready(host: str, port: int, timeout: float, process: Optional[subprocess.Popen] = None):
+    """轮询 /api/ 直到服务可用"""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"应用进程已退出（返回码 {process.returncode}）")
+        try:
+            connection = http.client.HTTPConnection(host, port, timeout=2)
+            connection.request("GET", "/api/")
+            if connection.getresponse().status == 200:
+                connection.close()
+                return
+        except OSError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"等待服务 {host}:{port} 超时")
+
+
+@contextmanager
+def _local_instance(args):
+    """在子进程中启动模拟 LLM 和应用，返回应用地址"""
+    backend_dir = os.path.dirname(os.path.abspath(__file__))
+    work_dir = tempfile.mkdtemp(prefix="teamie-loadtest-")
+    llm_port, app_port = _free_port(), _free_port()
+    processes = []
+    try:
+        processes.append(subprocess.Popen(
+            [sys.executable, "fake_llm.py", "--port", str(llm_port), "--latency", str(args.llm_latency),
+             "--tokens-per-second", str(args.llm_tokens_per_second), "--section-tokens", str(args.llm_section_tokens)],
+            cwd=backend_dir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        ))
+        env = {
+            **os.environ,
+            "HOST": "127.0.0.1",
+            "PORT": str(app_port),
+            "DATA_DIR": os.path.join(work_dir, "data"),
+            "LOG_FILE": os.path.join(work_dir, "app.log"),
+            "OPENAI_API_BASE": f"http://127.0.0.1:{llm_port}/v1",
+            "OPENAI_API_KEY": "sk-loadtest",
+        }
+        app_process = subprocess.Popen([sys.executable, "main.py"], cwd=backend_dir, env=env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        processes.append(app_process)
+        _wait_until_ready("127.0.0.1", app_port, args.ready_timeout, app_process)
+        yield "127.0.0.1", app_port
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    """最近秩百分位（ordered 已排序）"""
+    if not ordered:
+        return 0.0
+    index = max(0, min(len(ordered) - 1, int(round(q * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+class Stats:
+    """按路由收集请求耗时和错误（线程安全）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, List[float]] = {}
+        self._errors: Dict[str, Dict[str, int]] = {}
+
+    def record(self, route: str, seconds: float, error: Optional[str] = None):
+        with self._lock:
+            self._latencies.setdefault(route, []).append(seconds)
+            if error:
+                errors = self._errors.setdefault(route, {})
+                errors[error] = errors.get(error, 0) + 1
+
+    def report(self, elapsed: float) -> dict:
+        with self._lock:
+            routes = {route: sorted(values) for route, values in self._latencies.items()}
+            errors = {route: dict(items) for route, items in self._errors.items()}
+
+        results = {}
+        for route, ordered in sorted(routes.items()):
+            error_count = sum(errors.get(route, {}).values())
+            results[route] = {
+                "requests": len(ordered),
+                "errors": error_count,
+                "error_rate": error_count / len(ordered),
+                "error_kinds": errors.get(route, {}),
+                "requests_per_second": len(ordered) / elapsed if elapsed else 0.0,
+                "mean": sum(ordered) / len(ordered),
+                "p50": _percentile(ordered, 0.50),
+                "p95": _percentile(ordered, 0.95),
+                "p99": _percentile(ordered, 0.99),
+                "max": ordered[-1],
+            }
+        total = sum(item["requests"] for item in results.values())
+        total_errors = sum(item["errors"] for item in results.values())
+        return {
+            "routes": results,
+            "totals": {
+                "requests": total,
+                "errors": total_errors,
+                "error_rate": total_errors / total if total else 0.0,
+                "requests_per_second": total / elapsed if elapsed else 0.0,
+            },
+        }
+
+
+def _multipart(fields: List[Tuple[str, str]], files: List[Tuple[str, str, bytes, str]]) -> Tuple[bytes, str]:
+    """编码 multipart/form-data 请求体，返回 (body, content_type)"""
+    boundary = uuid.uuid4().hex
+    chunks = []
+    for name, value in fields:
+        chunks.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"\r\n\r\n'.encode("utf-8"))
+        chunks.append(value.encode("utf-8") + b"\r\n")
+    for name, filename, content, content_type in files:
+        chunks.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; name="{name}"; filename="{filename}"\r\n'
+            f"Content-Type: {content_type}\r\n\r\n".encode("utf-8")
+        )
+        chunks.append(content + b"\r\n")
+    chunks.append(f"--{boundary}--\r\n".encode("utf-8"))
+    return b"".join(chunks), f"multipart/form-data; boundary={boundary}"
+
+
+class VirtualUser(threading.Thread):
+    """一个虚拟用户：保持一条 keep-alive 连接，按权重循环执行操作，每次操作之间随机等待"""
+
+    def __init__(self, index: int, host: str, port: int, stats: Stats, shared: dict, args, stop_at: float):
+        super().__init__(name=f"user-{index}", daemon=True)
+        self.host, self.port = host, port
+        self.stats = stats
+        self.shared = shared
+        self.args = args
+        self.stop_at = stop_at
+        self.rng = random.Random(args.seed * 1000 + index)
+        self.connection: Optional[http.client.HTTPConnection] = None
+        self.actions = list(args.weights)
+        self.weights = [args.weights[name] for name in self.actions]
+
+    def _request(self, route: str, method: str, path: str, body: Optional[bytes] = None,
+                 headers: Optional[dict] = None) -> Optional[bytes]:
+        """发送请求并记录耗时；状态码 >= 400 或连接错误计为错误，返回响应体（出错时为 None）"""
+        started = time.perf_counter()
+        try:
+            if self.connection is None:
+                self.connection = http.client.HTTPConnection(self.host, self.port, timeout=self.args.request_timeout)
+            self.connection.request(method, path, body=body, headers=headers or {})
+            response = self.connection.getresponse()
+            data = response.read()
+            elapsed = time.perf_counter() - started
+            if response.status >= 400:
+                self.stats.record(route, elapsed, f"HTTP {response.status}")
+                return None
+            self.stats.record(route, elapsed)
+            return data
+        except (OSError, http.client.HTTPException) as e:
+            self.stats.record(route, time.perf_counter() - started, type(e).__name__)
+            if self.connection is not None:
+                self.connection.close()
+            self.connection = None
+            return None
+
+    def _pick_project(self) -> Optional[Tuple[str, int]]:
+        with self.shared["lock"]:
+            if not self.shared["projects"]:
+                return None
+            return self.rng.choice(self.shared["projects"]), 1
+
+    def poll(self):
+        """仪表盘轮询：项目列表 + 总览 + 某个项目的周报"""
+        self._request(ROUTE_PROJECTS, "GET", "/api/projects")
+        self._request(ROUTE_DASHBOARD, "GET", "/api/dashboard")
+        target = self._pick_project()
+        if target:
+            project_id, week = target
+            self._request(ROUTE_WEEK, "GET", f"/api/projects/{quote(project_id)}/week/{week}")
+
+    def edit(self):
+        """编辑周报（部分更新一个字段）"""
+        target = self._pick_project()
+        if not target:
+            return
+        project_id, week = target
+        body = json.dumps({"internal_reflection": [f"{self.name} 在 {datetime.now().isoformat()} 编辑的反思"]},
+                          ensure_ascii=False).encode("utf-8")
+        self._request(ROUTE_EDIT, "PUT", f"/api/projects/{quote(project_id)}/week/{week}", body,
+                      {"Content-Type": "application/json"})
+
+    def upload(self):
+        """上传一份小型模拟 Notion 导出，创建新项目（后台分析使用模拟 LLM）"""
+        corpus = self.shared["corpus"]
+        body, content_type = _multipart(
+            [("project_name", f"压测项目 {self.name}-{uuid.uuid4().hex[:6]}"), ("week_start_date", "2025-01-06")]
+            + [("file_paths", item["relative_path"] or "") for item in corpus],
+            [("files", item["filename"], item["content"].encode("utf-8"),
+              "text/html" if item["filename"].endswith(".html") else "text/markdown") for item in corpus]
+        )
+        data = self._request(ROUTE_UPLOAD, "POST", "/api/upload", body, {"Content-Type": content_type})
+        if data:
+            project_id = json.loads(data).get("project_id")
+            if project_id:
+                with self.shared["lock"]:
+                    self.shared["projects"].append(project_id)
+
+    def chat(self):
+        target = self._pick_project()
+        payload = {"message": "请帮我精简本周已完成任务的描述", "context": {"focused_section": "completed_tasks"}}
+        if target:
+            payload["project_id"], payload["week"] = target
+        self._request(ROUTE_CHAT, "POST", "/api/ai/chat", json.dumps(payload, ensure_ascii=False).encode("utf-8"),
+                      {"Content-Type": "application/json"})
+
+    def run(self):
+        while time.time() < self.stop_at:
+            action = self.rng.choices(self.actions, self.weights)[0]
+            getattr(self, action)()
+            if self.args.think_time > 0:
+                time.sleep(self.rng.uniform(0, 2 * self.args.think_time))
+        if self.connection is not None:
+            self.connection.close()
+
+
+def run_load(host: str, port: int, args) -> dict:
+    """执行压测并返回统计结果"""
+    stats = Stats()
+    shared = {"lock": threading.Lock(), "projects": [], "corpus": notion_corpus("small", seed=args.seed)}
+
+    # 预先上传若干项目，供轮询、编辑和聊天使用
+    seeder = VirtualUser(0, host, port, Stats(), shared, args, stop_at=0)
+    for _ in range(args.seed_projects):
+        seeder.upload()
+    if not shared["projects"]:
+        raise RuntimeError("预置项目上传失败，请检查应用是否可用")
+
+    started = time.time()
+    stop_at = started + args.duration
+    users = []
+    for index in range(args.users):
+        user = VirtualUser(index + 1, host, port, stats, shared, args, stop_at)
+        user.start()
+        users.append(user)
+        if args.ramp_up > 0 and index < args.users - 1:
+            time.sleep(args.ramp_up / args.users)
+    for user in users:
+        user.join()
+    elapsed = time.time() - started
+
+    report = stats.report(elapsed)
+    report["elapsed_seconds"] = elapsed
+    return report
+
+
+def _print_report(report: dict, args):
+    print(f"\n压测结果（{args.users} 个用户, {report['elapsed_seconds']:.0f} 秒, 思考时间 {args.think_time}s）")
+    print(f"{'路由':<40}{'请求数':>8}{'错误率':>9}{'RPS':>8}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}")
+    for route, item in report["routes"].items():
+        print(f"{route:<40}{item['requests']:>8}{item['error_rate']:>9.1%}{item['requests_per_second']:>8.1f}"
+              f"{item['p50'] * 1000:>10.1f}{item['p95'] * 1000:>10.1f}{item['p99'] * 1000:>10.1f}")
+        if item["error_kinds"]:
+            print(f"{'':<4}错误: " + ", ".join(f"{kind} × {count}" for kind, count in item["error_kinds"].items()))
+    totals = report["totals"]
+    print(f"{'合计':<40}{totals['requests']:>8}{totals['error_rate']:>9.1%}{totals['requests_per_second']:>8.1f}")
+
+
+def _parse_weights(spec: str) -> Dict[str, int]:
+    """解析 "poll=60,edit=20,chat=15,upload=5"（未列出的操作权重为 0）"""
+    weights = {name: 0 for name in DEFAULT_WEIGHTS}
+    for item in spec.split(","):
+        name, _, value = item.partition("=")
+        name = name.strip()
+        if name not in weights:
+            raise argparse.ArgumentTypeError(f"未知的操作: {name}（可选 {', '.join(DEFAULT_WEIGHTS)}）")
+        weights[name] = int(value)
+    if not any(weights.values()):
+        raise argparse.ArgumentTypeError("至少需要一个操作的权重大于 0")
+    return weights
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Teamie 并发压测")
+    parser.add_argument("--base-url", help="压测已运行的实例（如 http://127.0.0.1:8081），不指定时在本地启动")
+    parser.add_argument("--users", type=int, default=20, help="并发虚拟用户数")
+    parser.add_argument("--duration", type=float, default=60, help="压测时长（秒）")
+    parser.add_argument("--ramp-up", type=float, default=10, help="在多少秒内逐步启动全部用户")
+    parser.add_argument("--think-time", type=float, default=1.0, help="两次操作之间的平均等待（秒）")
+    parser.add_argument("--weights", type=_parse_weights, default=dict(DEFAULT_WEIGHTS),
+                        help="操作权重，如 poll=60,edit=20,chat=15,upload=5")
+    parser.add_argument("--seed-projects", type=int, default=3, help="压测前预先上传的项目数")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--request-timeout", type=float, default=120, help="单个请求超时（秒）")
+    parser.add_argument("--ready-timeout", type=float, default=60, help="等待应用启动的超时（秒）")
+    parser.add_argument("--output", help="把结果写入 JSON 报告")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="本地模拟 LLM 的首 token 延迟（秒）")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=600, help="本地模拟 LLM 的输出速度")
+    parser.add_argument("--llm-section-tokens", type=int, default=100, help="本地模拟 LLM 每个分区的 token 数")
+    args = parser.parse_args(argv)
+
+    if args.base_url:
+        parts = urlsplit(args.base_url)
+        host, port = parts.hostname, parts.port or 80
+        _wait_until_ready(host, port, args.ready_timeout)
+        report = run_load(host, port, args)
+    else:
+        with _local_instance(args) as (host, port):
+            report = run_load(host, port, args)
+
+    _print_report(report, args)
+    if args.output:
+        parameters = {key: value for key, value in vars(args).items() if key != "output"}
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"created_at": datetime.now().isoformat(timespec="seconds"), "parameters": parameters, **report},
+                      f, ensure_ascii=False, indent=2)
+        print(f"\n报告已写入 {args.output}")
+    # 有错误时返回非零，便于在脚本中判断
+    return 1 if report["totals"]["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
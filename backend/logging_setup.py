@@ -0,0 +1,108 @@
+"""
+日志配置
+请求线程只把日志记录放入内存队列（QueueHandler），由后台线程（QueueListener）写控制台和 app.log，
+磁盘/终端 IO 不再阻塞请求；支持按模块设置级别，以及对高频日志采样
+
+环境变量：
+    LOG_LEVEL          根级别，默认 INFO
+    LOG_LEVELS         按模块设置级别，如 "data_manager=WARNING,ai_analyzer=DEBUG"
+    LOG_FILE           日志文件，默认 app.log，设为空字符串时只输出到控制台
+    LOG_ASYNC          是否使用队列异步写日志，默认 1
+    LOG_SAMPLE_EVERY   采样日志每 N 条输出 1 条，默认 100（1 表示不采样）
+"""
+import os
+import queue
+import atexit
+import logging
+import threading
+import logging.handlers
+from typing import Dict, Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def sampled(key: str) -> dict:
+    """标记高频日志：logger.info("...", extra=sampled("file_save"))，同一 key 每 LOG_SAMPLE_EVERY 条只输出一条"""
+    return {"sample_key": key}
+
+
+class SamplingFilter(logging.Filter):
+    """对带 sample_key 的日志采样：每个 key 输出第 1、N+1、2N+1... 条，并在消息后附上被跳过的条数"""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        key = getattr(record, "sample_key", None)
+        if key is None or self.every == 1 or record.levelno >= logging.WARNING:
+            return True
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        if count % self.every:
+            return False
+        if count:
+            record.msg = f"{record.msg}（采样：已省略 {self.every - 1} 条同类日志）"
+        return True
+
+
+def _parse_levels(spec: str) -> Dict[str, int]:
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        name, level = name.strip(), level.strip().upper()
+        if name and level:
+            levels[name] = logging.getLevelName(level) if not level.isdigit() else int(level)
+    return levels
+
+
+def setup_logging():
+    """初始化应用日志（重复调用时只生效一次）"""
+    global _listener
+    root = logging.getLogger()
+    if getattr(root, "_teamie_configured", False):
+        return
+
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+    for name, level in _parse_levels(os.getenv("LOG_LEVELS", "")).items():
+        if isinstance(level, int):
+            logging.getLogger(name).setLevel(level)
+
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+    log_file = os.getenv("LOG_FILE", "app.log")
+    if log_file:
+        handlers.append(logging.FileHandler(log_file, encoding='utf-8'))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    sampling_filter = SamplingFilter(int(os.getenv("LOG_SAMPLE_EVERY", "100")))
+
+    if os.getenv("LOG_ASYNC", "1").lower() in ("0", "false", "no"):
+        for handler in handlers:
+            handler.addFilter(sampling_filter)
+            root.addHandler(handler)
+    else:
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        # 采样在入队前进行，被丢弃的记录不产生格式化开销
+        queue_handler.addFilter(sampling_filter)
+        root.addHandler(queue_handler)
+        _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+    root._teamie_configured = True
+
+
+def shutdown_logging():
+    """停止后台日志线程并写完队列中剩余的日志"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
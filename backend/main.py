@@ -1,11 +1,17 @@
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form, BackgroundTasks, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, JSONResponse, Response
+from fastapi.responses import HTMLResponse, JSONResponse, Response, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from starlette.concurrency import run_in_threadpool
 from starlette.staticfiles import StaticFiles as StarletteStaticFiles
 import os
 import json
+import hashlib
+import time
+import asyncio
 import logging
+import threading
 import traceback
 from typing import Optional, List
 from datetime import datetime, timedelta
@@ -15,17 +21,21 @@ import openai
 
 from models import *
 from data_manager import DataManager
+from file_names import file_extension, is_supported, normalize_uploads, upload_source
 from ai_analyzer import AIAnalyzer
-
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),  # 输出到控制台
-        logging.FileHandler('app.log', encoding='utf-8')  # 输出到文件
-    ]
-)
+from trend_analyzer import TrendAnalyzer
+from analysis_progress import AnalysisProgress
+from usage_ledger import UsageLedger
+from eta_estimator import EtaEstimator
+from metrics import MetricsMiddleware, render_metrics, stage_timer, timed, record_llm_usage, ANALYSIS_QUEUE_DEPTH
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from week_patch import PatchError, PatchConflict, operations_from_fields
+from logging_setup import setup_logging, sampled
+from file_lock import JobClaims
+from http_cache import conditional_json, content_response, content_etag, media_type_for, CompressionMiddleware, FingerprintedStaticFiles
+
+# 配置日志（异步写入控制台和 app.log，级别与采样见 logging_setup）
+setup_logging()
 logger = logging.getLogger(__name__)
 
 # 加载环境变量
@@ -50,21 +60,63 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# 大于 1KB 的文本/JSON 响应启用 gzip/brotli 压缩
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+# 请求耗时指标（最外层，包含压缩耗时）
+app.add_middleware(MetricsMiddleware)
+
 # 初始化组件
 data_dir = os.getenv("DATA_DIR", "data")
 data_manager = DataManager(data_dir)
-ai_analyzer = AIAnalyzer()
+usage_ledger = UsageLedger(data_dir)
+ai_analyzer = AIAnalyzer(usage_ledger=usage_ledger)
+eta_estimator = EtaEstimator(data_dir)
+trend_analyzer = TrendAnalyzer(data_manager)
+analysis_progress = AnalysisProgress(data_dir)
+# 分析任务认领：多 worker 时同一周只由一个 worker 分析
+job_claims = JobClaims(data_dir)
+# SSE 推送分析进度的轮询间隔（秒）
+ANALYSIS_STREAM_POLL_SECONDS = 0.25
+
+
+@app.on_event("startup")
+def start_archive_sweeper():
+    """后台定期归档已结束或长期未更新的项目，并清理不再被引用的文档 blob
+
+    默认不启动（ARCHIVE_SWEEP_HOURS 默认为 0），由运维设置 ARCHIVE_SWEEP_HOURS 后开启。
+    """
+    interval_hours = get_archive_policy()["sweep_hours"]
+    if interval_hours <= 0:
+        return
+
+    def sweep():
+        while True:
+            try:
+                archived = data_manager.archive_inactive()
+                if archived:
+                    logger.info(f"已归档 {len(archived)} 个项目: {archived}")
+                data_manager.collect_garbage()
+            except Exception as e:
+                logger.error(f"归档项目失败: {str(e)}")
+                logger.error(f"错误详情: {traceback.format_exc()}")
+            time.sleep(interval_hours * 3600)
 
-# 从 config 模块导入模型配置
-from config import MODEL_CONFIG, get_current_model, get_available_models
+    threading.Thread(target=sweep, name="archive-sweeper", daemon=True).start()
 
-# 当前使用的模型（从配置文件读取）
-CURRENT_MODEL = get_current_model()
+@app.on_event("shutdown")
+def flush_pending_edits():
+    """退出前写入尚未落盘的内联编辑"""
+    data_manager.close()
+    logger.info("已写入全部缓存的编辑")
+
+# 从 config 模块导入模型配置
+from config import MODEL_CONFIG, get_current_model, get_available_models, get_analysis_mode, is_write_verification_enabled, get_archive_policy
 
 def get_model_config(model_name: str = None) -> dict:
     """获取模型配置"""
     if model_name is None:
-        model_name = CURRENT_MODEL
+        model_name = get_current_model()
     
     if model_name not in MODEL_CONFIG:
         logger.warning(f"模型 {model_name} 不在配置表中，使用默认模型")
@@ -73,10 +125,15 @@ def get_model_config(model_name: str = None) -> dict:
     return MODEL_CONFIG[model_name]
 
 def get_tokens_per_second(model_name: str = None) -> float:
-    """获取模型的处理速度（tokens/秒）"""
-    config = get_model_config(model_name)
-    return config["tokens_per_second"]
+    """获取模型的处理速度（tokens/秒），优先使用用量台账中的实测值，样本不足时使用配置值"""
+    if model_name is None:
+        model_name = get_current_model()
+    measured = usage_ledger.measured_tokens_per_second(model_name)
+    if measured:
+        return measured
+    return get_model_config(model_name)["tokens_per_second"]
 
+@timed("token_estimate")
 def estimate_total_tokens(file_contents: list, previous_week_plan: Optional[list] = None) -> int:
     """估算AI调用的总token数量（包括prompt + completion）"""
     estimated_tokens = 0
@@ -104,7 +161,32 @@ def estimate_total_tokens(file_contents: list, previous_week_plan: Optional[list
 
     return estimated_tokens
 
+def estimate_analysis_eta(file_contents: list, previous_week_plan: Optional[list] = None) -> dict:
+    """预估分析耗时：有足够历史样本时使用学习到的回归模型，否则使用常数估算"""
+    model_name = get_current_model()
+    mode = get_analysis_mode()
+    input_chars = sum(len(item['content']) for item in file_contents)
+    fallback_tokens = estimate_total_tokens(file_contents, previous_week_plan)
+    eta = eta_estimator.estimate(model_name, mode, input_chars, fallback_tokens, get_tokens_per_second(model_name))
+    return {**eta, "model": model_name, "mode": mode, "input_chars": input_chars}
+
+def start_analysis_job(eta: dict) -> dict:
+    """登记一个即将提交的后台分析任务"""
+    ANALYSIS_QUEUE_DEPTH.inc()
+    return eta_estimator.start_job(eta["model"], eta["mode"], eta["input_chars"])
+
+def finish_analysis_job(eta_job: Optional[dict], analysis_result: Optional[dict] = None):
+    """后台分析任务结束：成功时记录耗时样本，失败时只更新排队计数"""
+    ANALYSIS_QUEUE_DEPTH.dec()
+    if eta_job is None:
+        return
+    if analysis_result:
+        eta_estimator.finish_job(eta_job, analysis_result['prompt_tokens'], analysis_result['completion_tokens'])
+    else:
+        eta_estimator.abandon_job(eta_job)
+
 # 初始化 tiktoken 编码器（用于计算 token 数量）
+@timed("token_count")
 def get_token_count(text: str, model_name: str = None) -> int:
     """计算文本的 token 数量"""
     try:
@@ -119,15 +201,35 @@ def get_token_count(text: str, model_name: str = None) -> int:
         # 这里使用保守估算：1 token = 2 字符
         return len(text) // 2
 
+@app.get("/metrics", include_in_schema=False)
+def get_metrics():
+    """Prometheus 指标"""
+    return Response(content=render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
 @app.get("/api/")
 async def api_root():
     """API健康检查"""
     return {"message": "Teamie API is running", "version": "1.0.0"}
 
-async def process_files_in_background(project_id: str, file_contents: list, week_start_date: str):
+def run_streaming_analysis(project_id: str, week: int, file_contents: list, base_week_data: WeekData,
+                           previous_week_plan: Optional[list] = None) -> dict:
+    """流式分析（在线程池中运行）：每个分区生成后只更新分析进度，前端可以先渲染已完成的部分
+
+    部分结果不写入项目数据（每次保存都会重写 projects.json、生成一个历史版本），由调用方在分析结束后保存一次。
+    """
+    analysis_progress.set_base(project_id, week, base_week_data.model_dump())
+
+    def on_section(name, value):
+        analysis_progress.update_section(project_id, week, name, value)
+
+    return ai_analyzer.analyze_html_contents(project_id, file_contents, previous_week_plan, on_section=on_section, week=week)
+
+async def process_files_in_background(project_id: str, file_contents: list, week_start_date: str, eta_job: Optional[dict] = None):
     """后台处理文件保存和AI分析"""
+    analysis_result = None
     try:
         logger.info(f"后台任务开始: 项目 {project_id}")
+        analysis_progress.start(project_id, 1)
 
         # 保存原始文件内容到data目录（保持原格式和文件夹结构）
         logger.info("正在保存原始文件...")
@@ -135,38 +237,50 @@ async def process_files_in_background(project_id: str, file_contents: list, week
             filename = file_item['filename']
             content = file_item['content']
             relative_path = file_item.get('relative_path')  # 获取相对路径
-            data_manager.save_file_content(project_id, content, filename, week=1, relative_path=relative_path)
-            logger.info(f"文件 {filename} 保存成功 (路径: {relative_path or '根目录'})")
+            data_manager.save_file_content(project_id, content, filename, week=1, relative_path=relative_path, source=file_item.get('source'))
+            logger.info(f"文件 {filename} 保存成功 (路径: {relative_path or '根目录'})", extra=sampled("file_save"))
         logger.info("所有原始文件保存完成")
 
-        # 分析文件内容生成报告
-        logger.info("正在分析文件内容...")
-        analysis_result = ai_analyzer.analyze_html_contents(project_id, file_contents)
-        week_data = analysis_result['week_data']
-        logger.info("文件内容分析完成")
-        logger.info(f"AI分析统计: prompt长度={analysis_result['prompt_length']}, prompt_tokens={analysis_result['prompt_tokens']}, completion_tokens={analysis_result['completion_tokens']}, total_tokens={analysis_result['total_tokens']}")
-
         # 设置周期间隔（基于用户选择的日期）
+        week_data = WeekData()
         if week_start_date:
             start_date = datetime.fromisoformat(week_start_date)
             end_date = start_date + timedelta(days=6)  # 周一到周日
             week_data.week_period = f"{start_date.strftime('%Y-%m-%d')} 至 {end_date.strftime('%Y-%m-%d')}"
             logger.info(f"设置周期间隔: {week_data.week_period}")
 
+        # 分析文件内容生成报告（分区生成后即保存）
+        logger.info("正在分析文件内容...")
+        analysis_result = await run_in_threadpool(run_streaming_analysis, project_id, 1, file_contents, week_data)
+        week_period = week_data.week_period
+        week_data = analysis_result['week_data']
+        week_data.week_period = week_period
+        logger.info("文件内容分析完成")
+        logger.info(f"AI分析统计: prompt长度={analysis_result['prompt_length']}, prompt_tokens={analysis_result['prompt_tokens']}, completion_tokens={analysis_result['completion_tokens']}, total_tokens={analysis_result['total_tokens']}")
+
         # 保存第一周数据
         logger.info("正在保存第一周数据...")
-        data_manager.update_week_data(project_id, 1, week_data)
+        data_manager.update_week_data(project_id, 1, week_data, source="analysis")
+        analysis_progress.finish(project_id, 1)
         logger.info("第一周数据保存成功")
 
         logger.info(f"后台任务完成: 项目 {project_id} 分析完成")
     except Exception as e:
+        analysis_result = None
+        analysis_progress.finish(project_id, 1, error=str(e))
         logger.error(f"后台任务失败: 项目 {project_id}, 错误: {str(e)}")
         logger.error(f"错误详情: {traceback.format_exc()}")
+    finally:
+        finish_analysis_job(eta_job, analysis_result)
+        job_claims.release(project_id, 1)
 
-async def process_next_week_in_background(project_id: str, week: int, file_contents: list, week_start_date: str, previous_week_plan: list, is_update_current: bool):
+async def process_next_week_in_background(project_id: str, week: int, file_contents: list, week_start_date: str, previous_week_plan: list, is_update_current: bool,
+                                          eta_job: Optional[dict] = None):
     """后台处理新一周的文件保存和AI分析"""
+    analysis_result = None
     try:
         logger.info(f"后台任务开始: 项目 {project_id} 第 {week} 周")
+        analysis_progress.start(project_id, week)
 
         # 保存文件内容（保持文件夹结构）
         logger.info("正在保存新一周的文件...")
@@ -174,8 +288,8 @@ async def process_next_week_in_background(project_id: str, week: int, file_conte
             filename = file_item['filename']
             content = file_item['content']
             relative_path = file_item.get('relative_path')  # 获取相对路径
-            data_manager.save_file_content(project_id, content, filename, week=week, relative_path=relative_path)
-            logger.info(f"文件 {filename} 保存成功 (路径: {relative_path or '根目录'})")
+            data_manager.save_file_content(project_id, content, filename, week=week, relative_path=relative_path, source=file_item.get('source'))
+            logger.info(f"文件 {filename} 保存成功 (路径: {relative_path or '根目录'})", extra=sampled("file_save"))
         logger.info(f"第 {week} 周文件保存完成")
 
         # 获取现有数据（如果是更新当前周）
@@ -184,19 +298,12 @@ async def process_next_week_in_background(project_id: str, week: int, file_conte
             existing_week_data = data_manager.get_week_data(project_id, week)
             logger.info(f"更新当前周，获取现有数据: week_period={repr(existing_week_data.week_period if existing_week_data else None)}")
 
-        # 分析数据
-        action_text = "更新" if is_update_current else "分析"
-        logger.info(f"正在{action_text}第 {week} 周的数据")
-        analysis_result = ai_analyzer.analyze_html_contents(project_id, file_contents, previous_week_plan)
-        week_data = analysis_result['week_data']
-        logger.info(f"第 {week} 周数据{action_text}完成")
-        logger.info(f"AI分析统计: prompt长度={analysis_result['prompt_length']}, prompt_tokens={analysis_result['prompt_tokens']}, completion_tokens={analysis_result['completion_tokens']}, total_tokens={analysis_result['total_tokens']}")
-
         # 设置周期间隔
+        week_period = None
         if is_update_current and existing_week_data and existing_week_data.week_period:
             # 更新当前周时保留现有的周期间隔
-            week_data.week_period = existing_week_data.week_period
-            logger.info(f"保留现有周期间隔: {week_data.week_period}")
+            week_period = existing_week_data.week_period
+            logger.info(f"保留现有周期间隔: {week_period}")
         else:
             # 创建新周时设置周期间隔
             if week_start_date:
@@ -204,28 +311,47 @@ async def process_next_week_in_background(project_id: str, week: int, file_conte
                     clean_date = week_start_date.strip()
                     start_date = datetime.fromisoformat(clean_date)
                     end_date = start_date + timedelta(days=6)  # 周一到周日
-                    week_data.week_period = f"{start_date.strftime('%Y-%m-%d')} 至 {end_date.strftime('%Y-%m-%d')}"
-                    logger.info(f"设置第 {week} 周期间隔: {week_data.week_period}")
+                    week_period = f"{start_date.strftime('%Y-%m-%d')} 至 {end_date.strftime('%Y-%m-%d')}"
+                    logger.info(f"设置第 {week} 周期间隔: {week_period}")
                 except Exception as e:
                     logger.error(f"日期解析失败: {str(e)}")
-                    week_data.week_period = None
+
+        # 分析数据（更新当前周时在现有内容上逐个替换分区，新周从空白开始）
+        action_text = "更新" if is_update_current else "分析"
+        logger.info(f"正在{action_text}第 {week} 周的数据")
+        base_week_data = existing_week_data if is_update_current and existing_week_data else WeekData()
+        base_week_data.week_period = week_period
+        analysis_result = await run_in_threadpool(
+            run_streaming_analysis, project_id, week, file_contents, base_week_data, previous_week_plan
+        )
+        week_data = analysis_result['week_data']
+        week_data.week_period = week_period
+        logger.info(f"第 {week} 周数据{action_text}完成")
+        logger.info(f"AI分析统计: prompt长度={analysis_result['prompt_length']}, prompt_tokens={analysis_result['prompt_tokens']}, completion_tokens={analysis_result['completion_tokens']}, total_tokens={analysis_result['total_tokens']}")
 
         # 保存数据
         logger.info(f"正在保存第 {week} 周数据...")
-        data_manager.update_week_data(project_id, week, week_data)
+        data_manager.update_week_data(project_id, week, week_data, source="analysis")
+        analysis_progress.finish(project_id, week)
         logger.info(f"项目 {project_id} 第 {week} 周{action_text}完成")
 
-        # 验证保存结果
-        saved_data = data_manager.get_week_data(project_id, week)
-        if saved_data:
-            logger.info(f"保存后验证成功: saved_data.week_period = {repr(saved_data.week_period)}")
-        else:
-            logger.error(f"保存失败! 无法获取保存的数据")
+        # 回读校验保存结果（调试时开启）
+        if is_write_verification_enabled():
+            saved_data = data_manager.get_week_data(project_id, week)
+            if saved_data:
+                logger.info(f"保存后验证成功: saved_data.week_period = {repr(saved_data.week_period)}")
+            else:
+                logger.error("保存失败! 无法获取保存的数据")
 
         logger.info(f"后台任务完成: 项目 {project_id} 第 {week} 周{action_text}完成")
     except Exception as e:
+        analysis_result = None
+        analysis_progress.finish(project_id, week, error=str(e))
         logger.error(f"后台任务失败: 项目 {project_id} 第 {week} 周, 错误: {str(e)}")
         logger.error(f"错误详情: {traceback.format_exc()}")
+    finally:
+        finish_analysis_job(eta_job, analysis_result)
+        job_claims.release(project_id, week)
 
 @app.post("/api/upload", response_model=UploadResponse)
 async def upload_files(
@@ -241,21 +367,6 @@ async def upload_files(
     try:
         # 过滤并读取支持的文件内容（html/txt/md）
         file_contents = []
-        processed_files = []
-        supported_extensions = ('.html', '.htm', '.txt', '.md')
-
-        def get_file_extension(filename: str) -> str:
-            """获取文件扩展名（不包含点）"""
-            if not filename:
-                return ''
-            # 处理路径分隔符
-            filename = filename.replace('\\', '/')
-            # 获取文件名部分
-            basename = filename.split('/')[-1]
-            # 获取扩展名
-            if '.' in basename:
-                return '.' + basename.split('.')[-1].lower()
-            return ''
 
         # 处理文件路径信息（如果有）
         path_map = {}
@@ -266,28 +377,26 @@ async def upload_files(
         
         file_index = 0
         for file in files:
-            logger.info(f"检查文件: filename={file.filename}, content_type={file.content_type}")
-            file_ext = get_file_extension(file.filename)
-            
-            if file.filename and file_ext in supported_extensions:
-                logger.info(f"正在读取文件: {file.filename} (扩展名: {file_ext})")
+            logger.debug(f"检查文件: filename={file.filename}, content_type={file.content_type}")
+            file_ext = file_extension(file.filename)
+
+            if is_supported(file.filename):
+                logger.debug(f"正在读取文件: {file.filename} (扩展名: {file_ext})")
                 try:
-                    content = await file.read()
-                    file_content = content.decode('utf-8')
+                    with stage_timer("upload_read"):
+                        content = await file.read()
+                        file_content = content.decode('utf-8')
 
-                    # 清理文件名
-                    cleaned_filename = data_manager._clean_filename(file.filename)
-                    
                     # 获取相对路径（如果有）
                     relative_path = path_map.get(file_index)
 
                     file_contents.append({
-                        'filename': cleaned_filename,
+                        'filename': file.filename,
                         'content': file_content,
-                        'relative_path': relative_path
+                        'relative_path': relative_path,
+                        'source': upload_source(file.filename, relative_path)
                     })
-                    processed_files.append(cleaned_filename)
-                    logger.info(f"文件 {cleaned_filename} 读取成功，大小: {len(file_content)} 字符 (路径: {relative_path or '根目录'})")
+                    logger.info(f"文件 {file.filename} 读取成功，大小: {len(file_content)} 字符 (路径: {relative_path or '根目录'})", extra=sampled("file_read"))
                     file_index += 1
                 except UnicodeDecodeError as e:
                     logger.warning(f"文件 {file.filename} 解码失败，跳过: {str(e)}")
@@ -299,25 +408,28 @@ async def upload_files(
         if not file_contents:
             raise HTTPException(status_code=400, detail="未找到有效的文件（支持 html/txt/md 格式）")
 
-        # 获取当前模型的配置
-        tokens_per_second = get_tokens_per_second()
-        logger.info(f"使用模型: {CURRENT_MODEL}, 处理速度: {tokens_per_second} tokens/秒")
+        # 清理文件名（去掉 Notion ID）；清理后同名的文件自动编号，避免保存时互相覆盖
+        names = normalize_uploads([(item['filename'], item['relative_path']) for item in file_contents])
+        for item, (name, _) in zip(file_contents, names):
+            item['filename'] = name
 
-        # 计算总token数量（包括prompt + completion）
-        estimated_total_tokens = estimate_total_tokens(file_contents)
-
-        # 计算预计处理时间（秒）
-        estimated_time = estimated_total_tokens / tokens_per_second
+        # 预估总token数量（包括prompt + completion）和处理时间（秒）
+        eta = estimate_analysis_eta(file_contents)
+        estimated_total_tokens = eta["tokens"]
+        estimated_time = eta["seconds"]
+        logger.info(f"使用模型: {eta['model']}, 预估方式: {eta['method']}（样本 {eta['samples']} 个），排队任务: {eta['queue_depth']}")
 
         # 文件数量
         file_count = len(file_contents)
 
-        logger.info(f"上传文件总数: {len(files)}, 符合要求的文件数量: {file_count}, 估算总 tokens: {estimated_total_tokens}，预计处理时间: {estimated_time:.2f} 秒")
+        logger.info(f"上传文件总数: {len(files)}, 符合要求的文件数量: {file_count}, 估算总 tokens: {estimated_total_tokens}，预计处理时间: {estimated_time:.2f} 秒（{eta['lower_seconds']:.2f} - {eta['upper_seconds']:.2f}）")
 
         # 创建项目（需要立即创建，以便返回 project_id）
         logger.info(f"正在创建项目: {project_name}")
         project_id = data_manager.create_project(project_name)
         logger.info(f"项目创建成功，ID: {project_id}")
+        # 新项目的第一周由本请求的后台任务分析
+        job_claims.claim(project_id, 1)
 
         # 立即返回响应，让前端显示 token 和预计时间
         logger.info(f"立即返回响应，项目ID: {project_id}, 文件数量: {file_count}, Token: {estimated_total_tokens}, 预计时间: {estimated_time:.2f}秒")
@@ -327,7 +439,8 @@ async def upload_files(
             process_files_in_background,
             project_id=project_id,
             file_contents=file_contents,
-            week_start_date=week_start_date
+            week_start_date=week_start_date,
+            eta_job=start_analysis_job(eta)
         )
 
         return UploadResponse(
@@ -336,7 +449,10 @@ async def upload_files(
             project_id=project_id,
             file_count=file_count,
             token_count=estimated_total_tokens,
-            estimated_time_seconds=estimated_time
+            estimated_time_seconds=estimated_time,
+            estimated_time_lower_seconds=eta["lower_seconds"],
+            estimated_time_upper_seconds=eta["upper_seconds"],
+            queue_depth=eta["queue_depth"]
         )
 
     except Exception as e:
@@ -346,30 +462,100 @@ async def upload_files(
         raise HTTPException(status_code=500, detail=f"上传失败: {str(e)}")
 
 @app.get("/api/projects", response_model=List[ProjectSummary])
-async def get_projects():
+async def get_projects(request: Request):
     """获取所有项目列表"""
     logger.info("正在获取所有项目列表")
     try:
         projects = data_manager.get_all_projects()
         logger.info(f"成功获取 {len(projects)} 个项目")
-        return projects
+        return conditional_json(request, projects)
     except Exception as e:
         logger.error(f"获取项目列表失败: {str(e)}")
         logger.error(f"错误详情: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"获取项目列表失败: {str(e)}")
 
+@app.get("/api/dashboard", response_model=List[ProjectDashboard])
+async def get_dashboard(request: Request):
+    """获取所有项目的总览统计（完成率、优先级分布、跨周趋势）"""
+    logger.info("正在获取项目总览统计")
+    try:
+        dashboard = data_manager.get_dashboard()
+        logger.info(f"成功获取 {len(dashboard)} 个项目的总览统计")
+        return conditional_json(request, dashboard)
+    except Exception as e:
+        logger.error(f"获取项目总览统计失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"获取项目总览统计失败: {str(e)}")
+
+@app.get("/api/usage")
+def get_usage(group_by: str = "project,model,day", project_id: Optional[str] = None, model: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None):
+    """LLM 用量统计：按项目/模型/用途/周/天聚合，since/until 为 YYYY-MM-DD"""
+    try:
+        dimensions = [name.strip() for name in group_by.split(",") if name.strip()]
+        result = usage_ledger.query(dimensions, project_id=project_id, model=model, since=since, until=until)
+        # 各模型实测处理速度与配置值对比
+        result["models"] = {
+            model_id: {
+                "configured_tokens_per_second": config["tokens_per_second"],
+                "measured_tokens_per_second": usage_ledger.measured_tokens_per_second(model_id)
+            }
+            for model_id, config in MODEL_CONFIG.items()
+        }
+        return result
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"获取用量统计失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"获取用量统计失败: {str(e)}")
+
+@app.get("/api/trends")
+def get_all_trends(request: Request):
+    """获取所有项目的跨周趋势（计划完成率、反复延期任务、反复出现的阻碍），不调用AI"""
+    logger.info("正在计算所有项目的跨周趋势")
+    try:
+        trends = trend_analyzer.get_all_trends()
+        logger.info(f"成功获取 {len(trends['projects'])} 个项目的跨周趋势")
+        return conditional_json(request, trends)
+    except Exception as e:
+        logger.error(f"获取跨周趋势失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"获取跨周趋势失败: {str(e)}")
+
+@app.get("/api/projects/{project_id}/trends")
+def get_project_trends(project_id: str, request: Request):
+    """获取单个项目的跨周趋势"""
+    logger.info(f"正在计算项目 {project_id} 的跨周趋势")
+    try:
+        trends = trend_analyzer.get_project_trends(project_id)
+        if trends is None:
+            logger.warning(f"项目 {project_id} 不存在")
+            raise HTTPException(status_code=404, detail="项目不存在")
+        return conditional_json(request, trends)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"获取项目跨周趋势失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"获取项目跨周趋势失败: {str(e)}")
+
 @app.get("/api/projects/{project_id}/week/{week}")
-async def get_week_report(project_id: str, week: int):
+async def get_week_report(project_id: str, week: int, request: Request):
     """获取指定项目的周报"""
     logger.info(f"正在获取项目 {project_id} 的第 {week} 周周报")
     try:
         week_data = data_manager.get_week_data(project_id, week)
         if not week_data:
+            # 新的一周在分析结束后才保存，分析期间返回已完成的部分
+            partial = analysis_progress.partial_week(project_id, week)
+            if partial is not None:
+                return conditional_json(request, WeekData(**partial).dict())
             logger.warning(f"项目 {project_id} 的第 {week} 周周报不存在")
             raise HTTPException(status_code=404, detail="周报不存在")
 
         logger.info(f"成功获取项目 {project_id} 的第 {week} 周周报")
-        return week_data.dict()
+        return conditional_json(request, week_data.dict())
     except HTTPException:
         raise
     except Exception as e:
@@ -378,6 +564,48 @@ async def get_week_report(project_id: str, week: int):
         logger.error(f"项目ID: {project_id}, 周数: {week}")
         raise HTTPException(status_code=500, detail=f"获取周报失败: {str(e)}")
 
+@app.get("/api/projects/{project_id}/week/{week}/analysis/stream")
+async def stream_week_analysis(project_id: str, week: int, request: Request):
+    """以 SSE 推送周报分析进度：每生成一个分区推送一次 section 事件，结束时推送 done 事件"""
+    def sse(event: str, payload: dict) -> str:
+        data = json.dumps(jsonable_encoder(payload), ensure_ascii=False)
+        return f"event: {event}\ndata: {data}\n\n"
+
+    async def event_stream():
+        sent_sections = set()
+        last_version = None
+        idle_seconds = 0.0
+        while True:
+            snapshot = analysis_progress.snapshot(project_id, week)
+            if snapshot is None:
+                yield sse("done", {"status": "idle"})
+                return
+
+            if snapshot["version"] != last_version:
+                last_version = snapshot["version"]
+                for name, value in snapshot["sections"].items():
+                    if name not in sent_sections:
+                        sent_sections.add(name)
+                        yield sse("section", {"name": name, "value": value})
+                if snapshot["status"] != "running":
+                    yield sse("done", {"status": snapshot["status"], "error": snapshot["error"]})
+                    return
+
+            if await request.is_disconnected():
+                return
+            await asyncio.sleep(ANALYSIS_STREAM_POLL_SECONDS)
+            idle_seconds += ANALYSIS_STREAM_POLL_SECONDS
+            if idle_seconds >= 15:
+                # 心跳，防止代理断开空闲连接
+                idle_seconds = 0.0
+                yield ": keep-alive\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @app.post("/api/projects/{project_id}/week/{week}/update-plan")
 async def update_week_plan(project_id: str, week: int, plan_data: Dict[str, Any]):
     """更新周报的下周计划"""
@@ -399,7 +627,7 @@ async def update_week_plan(project_id: str, week: int, plan_data: Dict[str, Any]
 
         # 保存更新
         logger.info("正在保存更新后的周数据")
-        success = data_manager.update_week_data(project_id, week, week_data)
+        success = data_manager.update_week_data(project_id, week, week_data, source="plan")
 
         if not success:
             logger.error(f"项目 {project_id} 不存在，无法保存数据")
@@ -429,33 +657,23 @@ async def update_week_report(project_id: str, week: int, request: Request):
         is_partial_update = len(update_data) < 6  # WeekData有6个主要字段
 
         if is_partial_update:
+            # 部分更新按字段 replace 处理：只校验提交的字段，只记录增量
             logger.info("检测到部分更新请求")
-            # 获取当前周报数据
-            project = data_manager.get_project(project_id)
-            if not project:
+            week_data = data_manager.patch_week_data(project_id, week, operations_from_fields(update_data))
+            if week_data is None:
                 logger.error(f"项目 {project_id} 不存在")
                 raise HTTPException(status_code=404, detail="项目不存在")
-
-            current_week_data = project.weeks.get(week, WeekData())
-
-            # 合并更新数据
-            for field, value in update_data.items():
-                if hasattr(current_week_data, field):
-                    setattr(current_week_data, field, value)
-                    logger.debug(f"更新字段 {field}: {value}")
-
-            week_data = current_week_data
         else:
             logger.info("检测到完整更新请求")
             # 完整更新，验证所有字段
             week_data = WeekData(**update_data)
 
-        # 保存数据
-        success = data_manager.update_week_data(project_id, week, week_data)
+            # 保存数据
+            success = data_manager.update_week_data(project_id, week, week_data)
 
-        if not success:
-            logger.error(f"保存更新失败")
-            raise HTTPException(status_code=500, detail="保存更新失败")
+            if not success:
+                logger.error(f"保存项目 {project_id} 第 {week} 周的更新失败")
+                raise HTTPException(status_code=500, detail="保存更新失败")
 
         update_type = "部分" if is_partial_update else "完整"
         logger.info(f"项目 {project_id} 第 {week} 周的周报{update_type}更新成功")
@@ -463,17 +681,106 @@ async def update_week_report(project_id: str, week: int, request: Request):
 
     except HTTPException:
         raise
+    except PatchError as e:
+        logger.warning(f"周报更新内容无效: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         logger.error(f"更新周报失败: {str(e)}")
         logger.error(f"错误详情: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"更新失败: {str(e)}")
 
+@app.patch("/api/projects/{project_id}/week/{week}")
+async def patch_week_report(project_id: str, week: int, request: Request):
+    """按 JSON Patch（RFC 6902）修改周报的单个字段或条目
+
+    请求体为操作列表，例如 [{"op": "replace", "path": "/completed_tasks/3/description", "value": "..."}]；
+    只校验被修改的条目，只把增量写入变更日志。test 操作不满足时返回 409。
+    补丁立即校验并返回修改后的周报，同一周的连续编辑在停顿后合并为一次写入。
+    """
+    logger.debug(f"正在按补丁修改项目 {project_id} 第 {week} 周的周报")
+
+    try:
+        operations = await request.json()
+        logger.debug(f"补丁内容: {operations}")
+
+        week_data = data_manager.submit_week_patch(project_id, week, operations)
+        if week_data is None:
+            logger.warning(f"项目 {project_id} 不存在")
+            raise HTTPException(status_code=404, detail="项目不存在")
+
+        logger.info(f"项目 {project_id} 第 {week} 周的周报已按 {len(operations)} 个操作修改", extra=sampled("week_patch"))
+        return {"success": True, "week_data": week_data, "pending": data_manager.edit_buffer.has_pending()}
+
+    except HTTPException:
+        raise
+    except PatchConflict as e:
+        logger.warning(f"补丁与当前内容冲突: {str(e)}")
+        raise HTTPException(status_code=409, detail=str(e))
+    except PatchError as e:
+        logger.warning(f"补丁无效: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=400, detail="请求体不是有效的 JSON")
+    except Exception as e:
+        logger.error(f"修改周报失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"修改失败: {str(e)}")
+
+@app.get("/api/projects/{project_id}/week/{week}/versions")
+async def get_week_versions(project_id: str, week: int):
+    """列出周报的历史版本（从新到旧），每个版本包含来源和改动的字段"""
+    logger.info(f"正在获取项目 {project_id} 第 {week} 周的版本历史")
+    try:
+        versions = data_manager.get_week_versions(project_id, week)
+        if versions is None:
+            logger.warning(f"项目 {project_id} 不存在")
+            raise HTTPException(status_code=404, detail="项目不存在")
+        return {"project_id": project_id, "week": week, "versions": versions}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"获取版本历史失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"获取版本历史失败: {str(e)}")
+
+@app.get("/api/projects/{project_id}/week/{week}/versions/{version}")
+async def get_week_version(project_id: str, week: int, version: int):
+    """获取周报的指定历史版本"""
+    try:
+        week_data = data_manager.get_week_version(project_id, week, version)
+        if week_data is None:
+            raise HTTPException(status_code=404, detail="版本不存在")
+        return {"version": version, "week_data": week_data}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"获取历史版本失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"获取历史版本失败: {str(e)}")
+
+@app.post("/api/projects/{project_id}/week/{week}/versions/{version}/restore")
+async def restore_week_version(project_id: str, week: int, version: int):
+    """把周报恢复为指定历史版本（例如撤销重新分析对手动编辑的覆盖）"""
+    logger.info(f"正在把项目 {project_id} 第 {week} 周恢复为版本 {version}")
+    try:
+        week_data = data_manager.restore_week_version(project_id, week, version)
+        if week_data is None:
+            raise HTTPException(status_code=404, detail="项目或版本不存在")
+        logger.info(f"项目 {project_id} 第 {week} 周已恢复为版本 {version}")
+        return {"success": True, "week_data": week_data}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"恢复历史版本失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"恢复失败: {str(e)}")
+
 @app.get("/api/projects/{project_id}")
 async def get_project_info(project_id: str):
     """获取项目信息"""
     logger.info(f"正在获取项目 {project_id} 的信息")
     try:
-        project = data_manager.get_project(project_id)
+        project = data_manager.get_project_meta(project_id)
         if not project:
             logger.warning(f"项目 {project_id} 不存在")
             raise HTTPException(status_code=404, detail="项目不存在")
@@ -484,7 +791,8 @@ async def get_project_info(project_id: str):
             "created_at": project.created_at,
             "updated_at": project.updated_at,
             "total_weeks": len(project.weeks),
-            "current_week": max(project.weeks.keys()) if project.weeks else 1
+            "current_week": project.weeks[-1] if project.weeks else 1,
+            "archived": project.archived
         }
         logger.info(f"成功获取项目 {project_id} 信息: {len(project.weeks)} 周数据")
         return result
@@ -540,6 +848,68 @@ async def delete_project(project_id: str):
         logger.error(f"项目ID: {project_id}")
         raise HTTPException(status_code=500, detail=f"删除项目失败: {str(e)}")
 
+@app.post("/api/projects/{project_id}/archive")
+def archive_project(project_id: str):
+    """归档项目（周报和文件移入冷存储，项目列表中仍可见，访问时自动恢复）"""
+    logger.info(f"正在归档项目 {project_id}")
+    try:
+        project = data_manager.get_project_meta(project_id)
+        if not project:
+            logger.warning(f"项目 {project_id} 不存在")
+            raise HTTPException(status_code=404, detail="项目不存在")
+        if project.archived:
+            return {"success": True, "message": "项目已归档"}
+
+        data_manager.archive_project(project_id)
+        logger.info(f"项目 {project_id} 归档成功")
+        return {"success": True, "message": "归档成功"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"归档项目失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        logger.error(f"项目ID: {project_id}")
+        raise HTTPException(status_code=500, detail=f"归档项目失败: {str(e)}")
+
+@app.post("/api/projects/{project_id}/restore")
+def restore_project(project_id: str):
+    """把归档项目恢复到热存储（访问归档项目时会自动恢复，这里用于提前恢复）"""
+    logger.info(f"正在恢复归档项目 {project_id}")
+    try:
+        project = data_manager.get_project_meta(project_id)
+        if not project:
+            logger.warning(f"项目 {project_id} 不存在")
+            raise HTTPException(status_code=404, detail="项目不存在")
+
+        data_manager.restore_project(project_id)
+        logger.info(f"项目 {project_id} 恢复成功")
+        return {"success": True, "message": "恢复成功"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"恢复归档项目失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        logger.error(f"项目ID: {project_id}")
+        raise HTTPException(status_code=500, detail=f"恢复归档项目失败: {str(e)}")
+
+@app.post("/api/archive/run", response_model=BatchResponse)
+def run_archive():
+    """立即按归档策略归档已结束或长期未更新的项目，并清理不再被引用的文档 blob（未开启后台归档时手动执行）"""
+    logger.info("开始按归档策略归档项目")
+    try:
+        archived = data_manager.archive_inactive()
+        logger.info(f"已归档 {len(archived)} 个项目")
+        data_manager.collect_garbage()
+        return BatchResponse(
+            success=True,
+            message=f"已归档 {len(archived)} 个项目",
+            results=[{"project_id": project_id} for project_id in archived]
+        )
+    except Exception as e:
+        logger.error(f"归档项目失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"归档项目失败: {str(e)}")
+
 @app.get("/api/projects/{project_id}/week/{week}/files")
 def get_project_week_files(project_id: str, week: int):
     """获取项目指定周的所有文件列表"""
@@ -547,8 +917,7 @@ def get_project_week_files(project_id: str, week: int):
 
     try:
         # 检查项目是否存在
-        project = data_manager.get_project(project_id)
-        if not project:
+        if not data_manager.project_exists(project_id):
             logger.warning(f"项目 {project_id} 不存在")
             raise HTTPException(status_code=404, detail="项目不存在")
 
@@ -565,37 +934,69 @@ def get_project_week_files(project_id: str, week: int):
         logger.error(f"错误详情: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"获取文件列表失败: {str(e)}")
 
+@app.get("/api/projects/{project_id}/week/{week}/tree")
+def get_project_week_tree(project_id: str, week: int, path: str = "", cursor: Optional[str] = None, limit: int = 200):
+    """分页获取项目指定周某一目录的条目（文件夹懒加载展开）"""
+    logger.info(f"获取项目 {project_id} 第 {week} 周目录 {repr(path)} 的条目, cursor={repr(cursor)}, limit={limit}")
+
+    try:
+        if not data_manager.project_exists(project_id):
+            logger.warning(f"项目 {project_id} 不存在")
+            raise HTTPException(status_code=404, detail="项目不存在")
+
+        try:
+            listing = data_manager.list_directory(project_id, week, path, cursor, limit)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if listing is None:
+            # 周目录或子目录不存在时返回空列表，与 /files 行为保持一致
+            listing = {"path": path, "entries": [], "total": 0, "next_cursor": None}
+
+        logger.info(f"目录 {repr(listing['path'])} 共 {listing['total']} 项，本页 {len(listing['entries'])} 项")
+        return listing
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"获取目录条目失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"获取目录条目失败: {str(e)}")
+
 @app.get("/api/projects/{project_id}/week/{week}/files/{filename:path}")
-def get_project_week_file_content(project_id: str, week: int, filename: str):
-    """获取项目指定周的单个文件内容"""
-    logger.info(f"获取项目 {project_id} 第 {week} 周的文件 {filename} 内容")
+def get_project_week_file_content(project_id: str, week: int, filename: str, request: Request, meta: bool = False):
+    """获取项目指定周的单个文件内容（从 blob 存储流式解压返回，支持 ETag 和 Range）；meta=true 时只返回元数据"""
+    logger.info(f"获取项目 {project_id} 第 {week} 周的文件 {filename} {'元数据' if meta else '内容'}")
 
     try:
         # 检查项目是否存在
-        project = data_manager.get_project(project_id)
-        if not project:
+        if not data_manager.project_exists(project_id):
             logger.warning(f"项目 {project_id} 不存在")
             raise HTTPException(status_code=404, detail="项目不存在")
 
-        # 获取文件内容
-        content = data_manager.get_file_content_by_name(project_id, week, filename)
-        if content is None:
+        info = data_manager.get_file_info(project_id, week, filename)
+        if info is None:
             logger.warning(f"文件 {filename} 不存在")
             raise HTTPException(status_code=404, detail="文件不存在")
 
         # 根据文件扩展名设置 media_type
-        filename_lower = filename.lower()
-        if filename_lower.endswith(('.html', '.htm')):
-            media_type = "text/html"
-        elif filename_lower.endswith('.md'):
-            media_type = "text/markdown"
-        elif filename_lower.endswith('.txt'):
-            media_type = "text/plain"
-        else:
-            media_type = "text/plain"
+        media_type = media_type_for(filename)
+
+        if meta:
+            return {
+                "filename": filename.split('/')[-1],
+                "path": filename,
+                "size": info["size"],
+                "mtime": info["mtime"],
+                "media_type": media_type,
+                "etag": content_etag(info["hash"])
+            }
 
-        logger.info(f"成功获取文件 {filename} 内容，长度: {len(content)}")
-        return Response(content=content, media_type=media_type)
+        return content_response(
+            request, info["hash"], info["size"],
+            lambda start, end: data_manager.open_file_range(project_id, week, filename, start, end),
+            media_type
+        )
 
     except HTTPException:
         raise
@@ -611,8 +1012,7 @@ async def update_project_week_file_content(project_id: str, week: int, filename:
 
     try:
         # 检查项目是否存在
-        project = data_manager.get_project(project_id)
-        if not project:
+        if not data_manager.project_exists(project_id):
             logger.warning(f"项目 {project_id} 不存在")
             raise HTTPException(status_code=404, detail="项目不存在")
 
@@ -621,85 +1021,61 @@ async def update_project_week_file_content(project_id: str, week: int, filename:
         content = body.decode('utf-8')
 
         # filename 参数可能包含完整路径，如 "其他文档/test.html" 或只是 "test.html"
-        logger.info(f"=== 开始更新文件 ===")
-        logger.info(f"项目ID: {project_id}, 周数: {week}")
-        logger.info(f"接收到的filename参数: {repr(filename)}")
-        logger.info(f"文件内容长度: {len(content)} 字符")
-        logger.info(f"文件内容预览（前200字符）: {content[:200]}")
-        
+        logger.debug(f"接收到的filename参数: {repr(filename)}, 文件内容长度: {len(content)} 字符")
+
         # 获取文件列表，查找匹配的文件
         file_list = data_manager.get_files(project_id, week)
-        logger.info(f"当前文件列表（共{len(file_list)}个文件）: {file_list}")
-        
+        logger.debug(f"当前文件列表共 {len(file_list)} 个文件")
+
         # 尝试精确匹配
         full_file_path = None
         if filename in file_list:
             # 精确匹配
             full_file_path = filename
-            logger.info(f"找到精确匹配的文件: {full_file_path}")
+            logger.debug(f"找到精确匹配的文件: {full_file_path}")
         else:
             # 尝试部分匹配（文件名相同）
-            logger.info(f"未找到精确匹配，尝试部分匹配...")
             for file_path in file_list:
                 if file_path.endswith('/' + filename) or (not '/' in file_path and file_path == filename):
                     full_file_path = file_path
-                    logger.info(f"找到部分匹配的文件: {full_file_path}")
+                    logger.debug(f"找到部分匹配的文件: {full_file_path}")
                     break
         
-        # 如果还是找不到，使用传入的filename（可能已经是完整路径）
-        if full_file_path is None:
-            full_file_path = filename
-            logger.warning(f"未在文件列表中找到匹配项，使用传入的filename: {full_file_path}")
-
         # 提取文件夹路径和文件名
-        if '/' in full_file_path:
-            # 有文件夹路径，分离文件夹和文件名
-            path_parts = full_file_path.split('/')
-            actual_filename = path_parts[-1]  # 最后一部分是文件名
-            folder_path = '/'.join(path_parts[:-1])  # 前面的部分是文件夹路径
-            relative_path = folder_path
-            logger.info(f"检测到文件夹路径: {folder_path}")
-        else:
-            # 根目录文件
-            actual_filename = full_file_path
-            relative_path = None
-            logger.info(f"根目录文件，无文件夹路径")
-
-        logger.info(f"保存参数: actual_filename={repr(actual_filename)}, relative_path={repr(relative_path)}, full_file_path={repr(full_file_path)}")
-
-        # 保存前读取原文件内容（如果存在）
-        original_content = data_manager.get_file_content_by_name(project_id, week, full_file_path)
-        if original_content:
-            logger.info(f"原文件存在，长度: {len(original_content)} 字符")
-            logger.info(f"原文件内容预览（前200字符）: {original_content[:200]}")
+        upload = None
+        if full_file_path is not None:
+            # 已有文件：原路径覆盖
+            folder_path, _, actual_filename = full_file_path.rpartition('/')
+            relative_path = folder_path or None
         else:
-            logger.info(f"原文件不存在，将创建新文件")
+            # 新文件：与上传相同的规范化，规范化后与其他文档同名时自动编号，不覆盖其他文件
+            folder_path, _, raw_filename = filename.rpartition('/')
+            relative_path = folder_path or None
+            upload = {'filename': raw_filename, 'content': content, 'relative_path': relative_path,
+                      'source': upload_source(raw_filename, relative_path)}
+            actual_filename, full_file_path = normalize_week_uploads(project_id, week, [upload])[0]
+            logger.info(f"未在文件列表中找到匹配项，作为新文件保存: {full_file_path}")
+
+        logger.debug(f"保存参数: actual_filename={repr(actual_filename)}, relative_path={repr(relative_path)}, full_file_path={repr(full_file_path)}")
 
         # 保存文件内容（使用实际的文件名和相对路径）
-        logger.info(f"正在保存文件到: project_id={project_id}, week={week}, filename={actual_filename}, relative_path={relative_path}")
-        data_manager.save_file_content(project_id, content, actual_filename, week=week, relative_path=relative_path)
-        logger.info(f"save_file_content 调用完成")
-        
-        # 验证文件是否保存成功
-        logger.info(f"验证保存结果，尝试读取文件: {full_file_path}")
-        saved_content = data_manager.get_file_content_by_name(project_id, week, full_file_path)
-        if saved_content is None:
-            logger.error(f"❌ 文件保存后验证失败，无法读取文件: {full_file_path}")
-            logger.error(f"请检查文件路径是否正确: data/{project_id}/week_{week}/{full_file_path}")
-        else:
-            logger.info(f"✅ 文件保存成功并验证通过")
-            logger.info(f"保存后的文件长度: {len(saved_content)} 字符")
-            logger.info(f"保存后的文件内容预览（前200字符）: {saved_content[:200]}")
-            
-            # 对比内容是否一致
-            if saved_content == content:
-                logger.info(f"✅ 保存的内容与提交的内容完全一致")
-            else:
+        data_manager.save_file_content(project_id, content, actual_filename, week=week, relative_path=relative_path,
+                                       source=upload['source'] if upload else None)
+
+        # 回读校验只在调试时开启（DEBUG_VERIFY_WRITES=1）
+        if is_write_verification_enabled():
+            saved_content = data_manager.get_file_content_by_name(project_id, week, full_file_path)
+            if saved_content is None:
+                logger.error(f"❌ 文件保存后验证失败，无法读取文件: {full_file_path}")
+                logger.error(f"请检查文件路径是否正确: data/{project_id}/week_{week}/{full_file_path}")
+            elif saved_content != content:
                 logger.warning(f"⚠️ 保存的内容与提交的内容不一致！")
                 logger.warning(f"提交内容长度: {len(content)}, 保存内容长度: {len(saved_content)}")
-        
-        logger.info(f"=== 文件更新完成 ===")
-        return {"success": True, "message": f"文件 {filename} 更新成功"}
+            else:
+                logger.info(f"✅ 文件保存成功并验证通过，长度: {len(saved_content)} 字符")
+
+        logger.info(f"项目 {project_id} 第 {week} 周的文件 {full_file_path} 更新完成，长度: {len(content)} 字符")
+        return {"success": True, "message": f"文件 {filename} 更新成功", "path": full_file_path}
 
     except HTTPException:
         raise
@@ -722,23 +1098,31 @@ async def analyze_next_week(
     """分析新一周的进展（支持多文件，保持文件夹结构）"""
     logger.info(f"开始分析项目 {project_id} 的新一周进展, week_start_date: {repr(week_start_date)}")
 
+    claimed_week = None
     try:
         # 获取上一周的数据（用于上下文）
         logger.info(f"正在获取项目 {project_id} 的信息")
-        project = data_manager.get_project(project_id)
+        project = data_manager.get_project_meta(project_id)
         if not project:
             logger.warning(f"项目 {project_id} 不存在")
             raise HTTPException(status_code=404, detail="项目不存在")
 
-        current_week = max(project.weeks.keys()) if project.weeks else 0
+        current_week = project.weeks[-1] if project.weeks else 0
         previous_week_plan = None
 
         # 判断是更新当前周还是创建新周
         is_update_current = update_current_week.lower() == "true"
         target_week = current_week if is_update_current else (current_week + 1)
 
-        if current_week > 0 and project.weeks.get(current_week):
-            previous_week_plan = project.weeks[current_week].next_week_plan
+        # 认领该周的分析任务（可能有其他请求或 worker 正在分析同一周），任务交给后台后由后台任务释放
+        if not job_claims.claim(project_id, target_week):
+            logger.warning(f"项目 {project_id} 第 {target_week} 周正在分析中")
+            raise HTTPException(status_code=409, detail=f"第{target_week}周正在分析中，请稍后再试")
+        claimed_week = target_week
+
+        current_week_data = data_manager.get_week_data(project_id, current_week) if current_week > 0 else None
+        if current_week_data:
+            previous_week_plan = current_week_data.next_week_plan
             logger.info(f"找到上一周({current_week})的计划数据")
 
         # 如果是更新当前周，需要获取已有的文件内容
@@ -750,10 +1134,11 @@ async def analyze_next_week(
             for file_path in existing_files:
                 content = data_manager.get_file_content_by_name(project_id, current_week, file_path)
                 if content:
+                    # relative_path 为所在文件夹，后台保存时写回原路径
                     existing_file_contents.append({
                         'filename': file_path.split('/')[-1],
                         'content': content,
-                        'relative_path': file_path
+                        'relative_path': file_path.rpartition('/')[0] or None
                     })
             logger.info(f"找到 {len(existing_file_contents)} 个已有文件")
 
@@ -767,34 +1152,41 @@ async def analyze_next_week(
         # 处理输入：支持单文件字符串或多文件上传
         file_contents = existing_file_contents.copy()  # 先复制已有文件
         new_week = target_week
-        supported_extensions = ('.html', '.htm', '.txt', '.md')
-
         file_index = 0
         if files and len(files) > 0:
             # 多文件模式
             logger.info(f"处理多文件输入: {len(files)} 个文件")
+            new_files = []
             for file in files:
-                if file.filename and any(file.filename.lower().endswith(ext) for ext in supported_extensions):
-                    logger.info(f"正在读取文件: {file.filename}")
-                    content = await file.read()
-                    file_content_data = content.decode('utf-8')
-                    
-                    # 清理文件名
-                    cleaned_filename = data_manager._clean_filename(file.filename)
-                    
+                if is_supported(file.filename):
+                    logger.debug(f"正在读取文件: {file.filename}")
+                    with stage_timer("upload_read"):
+                        content = await file.read()
+                        file_content_data = content.decode('utf-8')
+
                     # 获取相对路径（如果有）
                     relative_path = path_map.get(file_index)
-                    
-                    file_contents.append({
-                        'filename': cleaned_filename,
+
+                    new_files.append({
+                        'filename': file.filename,
                         'content': file_content_data,
-                        'relative_path': relative_path
+                        'relative_path': relative_path,
+                        'source': upload_source(file.filename, relative_path)
                     })
-                    logger.info(f"文件 {cleaned_filename} 读取成功，大小: {len(file_content_data)} 字符 (路径: {relative_path or '根目录'})")
-
-                    # 保存到新一周的目录（保持文件夹结构）
-                    data_manager.save_file_content(project_id, file_content_data, cleaned_filename, week=new_week, relative_path=relative_path)
+                    logger.info(f"文件 {file.filename} 读取成功，大小: {len(file_content_data)} 字符 (路径: {relative_path or '根目录'})", extra=sampled("file_read"))
                     file_index += 1
+
+            # 清理文件名；与本次上传或目标周（更新当前周时）其他文档同名的文件自动编号，再次上传的同一文档覆盖原文件
+            names = normalize_week_uploads(project_id, new_week, new_files)
+            for item in new_files:
+                # 保存到新一周的目录（保持文件夹结构）
+                data_manager.save_file_content(project_id, item['content'], item['filename'], week=new_week,
+                                               relative_path=item['relative_path'], source=item['source'])
+            # 被覆盖的已有文件只分析新内容
+            replaced = {path for _, path in names}
+            file_contents = [item for item in file_contents
+                             if '/'.join(filter(None, (item['relative_path'], item['filename']))) not in replaced]
+            file_contents.extend(new_files)
         elif html_content:
             # 单文件模式（向后兼容）
             logger.info("处理单文件字符串输入")
@@ -815,11 +1207,11 @@ async def analyze_next_week(
         logger.info(f"共处理 {len(file_contents)} 个文件（其中 {len(existing_file_contents)} 个已有文件，{len(file_contents) - len(existing_file_contents)} 个新文件）")
 
         # 在调用AI前估算token数量（包括prompt + completion）
-        estimated_total_tokens = estimate_total_tokens(file_contents, previous_week_plan)
-        tokens_per_second = get_tokens_per_second()  # 获取当前模型的处理速度
-        estimated_time_seconds = estimated_total_tokens / tokens_per_second
+        eta = estimate_analysis_eta(file_contents, previous_week_plan)
+        estimated_total_tokens = eta["tokens"]
+        estimated_time_seconds = eta["seconds"]
 
-        logger.info(f"估算的总tokens (prompt + completion): {estimated_total_tokens}, 使用模型处理速度: {tokens_per_second} tokens/秒, 预计处理时间: {estimated_time_seconds:.2f}秒")
+        logger.info(f"估算的总tokens (prompt + completion): {estimated_total_tokens}, 预估方式: {eta['method']}（样本 {eta['samples']} 个）, 排队任务: {eta['queue_depth']}, 预计处理时间: {estimated_time_seconds:.2f}秒（{eta['lower_seconds']:.2f} - {eta['upper_seconds']:.2f}）")
 
         # 立即返回响应，让前端显示 token 和预计时间
         logger.info(f"立即返回响应，项目: {project_id}, 第{new_week}周, 文件数量: {len(file_contents)}, Token: {estimated_total_tokens}, 预计时间: {estimated_time_seconds:.2f}秒")
@@ -833,8 +1225,10 @@ async def analyze_next_week(
             file_contents=file_contents,
             week_start_date=week_start_date,
             previous_week_plan=previous_week_plan,
-            is_update_current=is_update_current
+            is_update_current=is_update_current,
+            eta_job=start_analysis_job(eta)
         )
+        claimed_week = None
 
         return {
             "success": True,
@@ -842,7 +1236,10 @@ async def analyze_next_week(
             "week": new_week,
             "file_count": len(file_contents),
             "token_count": estimated_total_tokens,
-            "estimated_time_seconds": estimated_time_seconds
+            "estimated_time_seconds": estimated_time_seconds,
+            "estimated_time_lower_seconds": eta["lower_seconds"],
+            "estimated_time_upper_seconds": eta["upper_seconds"],
+            "queue_depth": eta["queue_depth"]
         }
 
     except HTTPException:
@@ -852,6 +1249,9 @@ async def analyze_next_week(
         logger.error(f"错误详情: {traceback.format_exc()}")
         logger.error(f"项目ID: {project_id}")
         raise HTTPException(status_code=500, detail=f"分析失败: {str(e)}")
+    finally:
+        if claimed_week is not None:
+            job_claims.release(project_id, claimed_week)
 
 @app.delete("/api/projects/{project_id}/week/{week}")
 async def delete_week_data(project_id: str, week: int):
@@ -860,7 +1260,7 @@ async def delete_week_data(project_id: str, week: int):
 
     try:
         # 检查项目是否存在
-        project = data_manager.get_project(project_id)
+        project = data_manager.get_project_meta(project_id)
         if not project:
             logger.warning(f"项目 {project_id} 不存在")
             raise HTTPException(status_code=404, detail="项目不存在")
@@ -888,6 +1288,178 @@ async def delete_week_data(project_id: str, week: int):
         logger.error(f"错误详情: {traceback.format_exc()}")
         raise HTTPException(status_code=500, detail=f"删除失败: {str(e)}")
 
+def normalize_week_uploads(project_id: str, week: int, items: list) -> list:
+    """清理上传到某一周的文件名（items 为 [{filename, content, relative_path, source}]，filename 原地更新）
+
+    与本次上传或该周已有的其他文档同名的文件自动编号；该周已有同一文档（上传时的原始路径相同，
+    或内容完全相同）时覆盖原文件，不重复保存。没有记录原始路径的旧文件视为同一文档。
+    返回 [(文档名, 存储路径)]。
+    """
+    existing = data_manager.get_files(project_id, week)
+
+    def same_document(index: int, path: str) -> bool:
+        info = data_manager.get_file_info(project_id, week, path)
+        if info is None:
+            return False
+        item = items[index]
+        if info.get("source", item['source']) == item['source']:
+            return True
+        return info["hash"] == hashlib.sha256(item['content'].encode('utf-8')).hexdigest()
+
+    names = normalize_uploads([(item['filename'], item['relative_path']) for item in items], existing, same_document)
+    for item, (name, _) in zip(items, names):
+        item['filename'] = name
+    return names
+
+def load_week_file_contents(project_id: str, week: int) -> list:
+    """读取已保存的周文件，返回分析所需的 [{filename, content, relative_path}]"""
+    file_contents = []
+    for file_path in data_manager.get_files(project_id, week):
+        content = data_manager.get_file_content_by_name(project_id, week, file_path)
+        if content:
+            file_contents.append({
+                'filename': file_path.split('/')[-1],
+                'content': content,
+                'relative_path': file_path
+            })
+    return file_contents
+
+async def reanalyze_weeks_in_background(items: list):
+    """后台依次重新分析已保存的周文件（批量重新分析），每项都作为一个分析任务计入耗时预估"""
+    logger.info(f"批量重新分析任务开始，共 {len(items)} 项")
+    for item in items:
+        project_id = item['project_id']
+        week = item['week']
+        analysis_result = None
+        try:
+            previous_week_data = data_manager.get_week_data(project_id, week - 1)
+            previous_week_plan = previous_week_data.next_week_plan if previous_week_data else None
+            existing_week_data = data_manager.get_week_data(project_id, week)
+
+            analysis_progress.start(project_id, week)
+            analysis_result = await run_in_threadpool(
+                run_streaming_analysis, project_id, week, item['file_contents'], existing_week_data or WeekData(), previous_week_plan
+            )
+            week_data = analysis_result['week_data']
+            # 重新分析保留原有的周期间隔
+            if existing_week_data and existing_week_data.week_period:
+                week_data.week_period = existing_week_data.week_period
+
+            data_manager.update_week_data(project_id, week, week_data, source="analysis")
+            analysis_progress.finish(project_id, week)
+            logger.info(f"项目 {project_id} 第 {week} 周重新分析完成")
+        except Exception as e:
+            analysis_result = None
+            analysis_progress.finish(project_id, week, error=str(e))
+            logger.error(f"项目 {project_id} 第 {week} 周重新分析失败: {str(e)}")
+            logger.error(f"错误详情: {traceback.format_exc()}")
+        finally:
+            finish_analysis_job(item['eta_job'], analysis_result)
+            job_claims.release(project_id, week)
+    logger.info("批量重新分析任务完成")
+
+@app.post("/api/batch/weeks/import", response_model=BatchResponse)
+async def batch_import_weeks(batch: BatchWeekImportRequest):
+    """批量导入多个项目/多周的周报数据（单个存储事务）"""
+    logger.info(f"批量导入周数据，共 {len(batch.items)} 项")
+
+    for index, item in enumerate(batch.items):
+        if not item.project_id and not item.project_name:
+            raise HTTPException(status_code=400, detail=f"第 {index + 1} 项缺少 project_id 或 project_name")
+
+    try:
+        results = data_manager.import_weeks([item.dict(exclude={"data"}) | {"data": item.data} for item in batch.items])
+        succeeded = sum(1 for result in results if result["success"])
+        logger.info(f"批量导入完成: 成功 {succeeded}/{len(results)}")
+        return BatchResponse(success=succeeded == len(results), message=f"成功导入 {succeeded}/{len(results)} 项", results=results)
+    except Exception as e:
+        logger.error(f"批量导入失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"批量导入失败: {str(e)}")
+
+@app.post("/api/batch/projects/status", response_model=BatchResponse)
+async def batch_update_project_status(batch: BatchStatusRequest):
+    """批量更新项目状态（单个存储事务）"""
+    logger.info(f"批量更新项目状态，共 {len(batch.items)} 项")
+
+    for index, item in enumerate(batch.items):
+        if not item.status.strip():
+            raise HTTPException(status_code=400, detail=f"第 {index + 1} 项状态不能为空")
+
+    try:
+        results = data_manager.update_project_statuses([
+            {"project_id": item.project_id, "status": item.status.strip()} for item in batch.items
+        ])
+        succeeded = sum(1 for result in results if result["success"])
+        logger.info(f"批量更新状态完成: 成功 {succeeded}/{len(results)}")
+        return BatchResponse(success=succeeded == len(results), message=f"成功更新 {succeeded}/{len(results)} 个项目", results=results)
+    except Exception as e:
+        logger.error(f"批量更新状态失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"批量更新状态失败: {str(e)}")
+
+@app.post("/api/batch/analyze", response_model=BatchResponse)
+async def batch_reanalyze(batch: BatchAnalyzeRequest, background_tasks: BackgroundTasks):
+    """批量提交重新分析任务（使用已保存的周文件，后台依次执行）"""
+    logger.info(f"批量提交重新分析，共 {len(batch.items)} 项")
+
+    accepted = []
+    try:
+        summaries = {summary.id: summary for summary in data_manager.get_all_projects()}
+        results = []
+        for item in batch.items:
+            summary = summaries.get(item.project_id)
+            if not summary:
+                results.append({"project_id": item.project_id, "week": item.week, "success": False, "message": "项目不存在"})
+                continue
+            week = item.week or summary.current_week
+            file_contents = load_week_file_contents(item.project_id, week)
+            if not file_contents:
+                results.append({"project_id": item.project_id, "week": week, "success": False, "message": "该周没有可分析的文件"})
+                continue
+
+            # 每项单独登记为分析任务：排在后面的项（以及之后提交的单周分析）的预估会计入前面的任务
+            previous_week_data = data_manager.get_week_data(item.project_id, week - 1)
+            eta = estimate_analysis_eta(file_contents, previous_week_data.next_week_plan if previous_week_data else None)
+            if not job_claims.claim(item.project_id, week):
+                results.append({"project_id": item.project_id, "week": week, "success": False, "message": "该周正在分析中"})
+                continue
+            accepted.append({"project_id": item.project_id, "week": week, "file_contents": file_contents, "eta_job": start_analysis_job(eta)})
+            results.append({
+                "project_id": item.project_id, "week": week, "success": True, "message": "已加入队列",
+                "token_count": eta["tokens"],
+                "estimated_time_seconds": eta["seconds"],
+                "estimated_time_lower_seconds": eta["lower_seconds"],
+                "estimated_time_upper_seconds": eta["upper_seconds"],
+                "queue_depth": eta["queue_depth"]
+            })
+
+        if accepted:
+            background_tasks.add_task(reanalyze_weeks_in_background, items=accepted)
+
+        logger.info(f"批量重新分析已入队: {len(accepted)}/{len(batch.items)}")
+        return BatchResponse(success=len(accepted) == len(batch.items), message=f"已提交 {len(accepted)} 个重新分析任务", results=results)
+    except Exception as e:
+        for item in accepted:
+            finish_analysis_job(item["eta_job"])
+            job_claims.release(item["project_id"], item["week"])
+        logger.error(f"批量提交重新分析失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"批量提交重新分析失败: {str(e)}")
+
+@app.post("/api/batch/export")
+async def batch_export(batch: BatchExportRequest):
+    """批量导出项目数据（一次加载存储）"""
+    logger.info(f"批量导出项目数据: project_ids={batch.project_ids}, weeks={batch.weeks}")
+    try:
+        exported = data_manager.export_projects(batch.project_ids, batch.weeks)
+        logger.info(f"批量导出完成，共 {len(exported)} 个项目")
+        return {"success": True, "projects": exported}
+    except Exception as e:
+        logger.error(f"批量导出失败: {str(e)}")
+        logger.error(f"错误详情: {traceback.format_exc()}")
+        raise HTTPException(status_code=500, detail=f"批量导出失败: {str(e)}")
+
 @app.get("/api/models")
 async def get_models():
     """获取所有可用的模型列表和当前使用的模型"""
@@ -912,12 +1484,9 @@ async def set_model(model_id: str):
         if model_id not in MODEL_CONFIG:
             raise HTTPException(status_code=400, detail=f"模型 {model_id} 不在配置表中")
         
+        # 写入 data 目录中的共享配置，所有 worker 下次读取时生效
         set_current_model(model_id)
         
-        # 更新全局变量
-        global CURRENT_MODEL
-        CURRENT_MODEL = model_id
-        
         logger.info(f"模型已切换为: {model_id}")
         
         return {
@@ -932,7 +1501,10 @@ async def set_model(model_id: str):
         raise HTTPException(status_code=500, detail=f"设置模型失败: {str(e)}")
 
 # 挂载前端文件（必须在所有API路由之后）
-# 在开发环境中禁用缓存，确保每次都获取最新内容
+# STATIC_CACHE_MODE=dev（默认）：禁用缓存，确保每次都获取最新内容
+# STATIC_CACHE_MODE=production：js/css 带内容指纹，长期 immutable 缓存
+STATIC_CACHE_MODE = os.getenv("STATIC_CACHE_MODE", "dev").lower()
+
 class NoCacheStaticFiles(StarletteStaticFiles):
     async def get_response(self, path, scope):
         response = await super().get_response(path, scope)
@@ -960,9 +1532,9 @@ if not frontend_dir:
 async def ai_chat(request: Request):
     """处理AI聊天请求"""
     try:
-        logger.info("开始解析AI聊天请求数据")
         data = await request.json()
-        logger.info(f"接收到的原始数据: {data}")
+        # 原始请求体包含完整上下文，只在 DEBUG 级别输出
+        logger.debug(f"接收到的原始数据: {data}")
         user_message = data.get("message", "")
         context = data.get("context", {})
         project_id = data.get("project_id")
@@ -978,9 +1550,8 @@ async def ai_chat(request: Request):
         if project_id and week:
             try:
                 logger.info(f"开始获取项目 {project_id} 的上下文数据")
-                project = data_manager.get_project(project_id)
-                if project and project.weeks.get(week):
-                    week_data = project.weeks[week]
+                week_data = data_manager.get_week_data(project_id, week)
+                if week_data:
                     logger.info("开始构建原始上下文数据")
                     raw_context_data = {
                         "current_report": {
@@ -1017,25 +1588,18 @@ async def ai_chat(request: Request):
             current_model = get_current_model()
             logger.info(f"使用模型 {current_model} 处理AI聊天请求")
 
-            if current_model == "gpt-5-nano":
-                response = openai.ChatCompletion.create(
-                    model=current_model,
-                    messages=[
-                        {"role": "system", "content": system_prompt},
-                        {"role": "user", "content": user_prompt}
-                    ],
-                    max_completion_tokens=4000,  # 聊天回复限制在4000 tokens
-                    temperature=0.7
-                )
-            else:
+            chat_started = time.perf_counter()
+            with stage_timer("chat_llm_call"):
+                # 输出长度参数名按模型配置选择（与 ai_analyzer 一致）
+                token_limit_param = get_model_config(current_model).get("token_limit_param", "max_tokens")
                 response = openai.ChatCompletion.create(
                     model=current_model,
                     messages=[
                         {"role": "system", "content": system_prompt},
                         {"role": "user", "content": user_prompt}
                     ],
-                    max_tokens=4000,
-                    temperature=0.7
+                    temperature=0.7,
+                    **{token_limit_param: 4000}  # 聊天回复限制在4000 tokens
                 )
 
             ai_response = response.choices[0].message.content.strip()
@@ -1044,6 +1608,17 @@ async def ai_chat(request: Request):
             prompt_tokens = response.usage.get('prompt_tokens', 0)
             completion_tokens = response.usage.get('completion_tokens', 0)
             total_tokens = response.usage.get('total_tokens', 0)
+            record_llm_usage(current_model, "chat", response.usage)
+            usage_ledger.record(
+                current_model, "chat",
+                {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": completion_tokens,
+                    "cached_tokens": (response.usage.get('prompt_tokens_details') or {}).get('cached_tokens', 0)
+                },
+                time.perf_counter() - chat_started,
+                project_id=project_id, week=week
+            )
 
             logger.info(f"AI聊天响应完成: prompt_tokens={prompt_tokens}, completion_tokens={completion_tokens}, total_tokens={total_tokens}")
 
@@ -1171,11 +1746,20 @@ def get_document_content(data_manager: DataManager, project_id: str, week: int,
         return None
 
 # 挂载前端静态文件（放在最后，确保不覆盖API路由）
-app.mount("/", NoCacheStaticFiles(directory=frontend_dir, html=True), name="frontend")
+if STATIC_CACHE_MODE == "production":
+    logger.info("静态资源使用生产缓存模式（指纹 + immutable）")
+    app.mount("/", FingerprintedStaticFiles(directory=frontend_dir, html=True), name="frontend")
+else:
+    app.mount("/", NoCacheStaticFiles(directory=frontend_dir, html=True), name="frontend")
 
 if __name__ == "__main__":
     import uvicorn
     import os
     host = os.getenv("HOST", "0.0.0.0")
     port = int(os.getenv("PORT", "8000"))
-    uvicorn.run(app, host=host, port=port)
+    # WEB_CONCURRENCY > 1 时启动多个 worker 进程（存储通过 data 目录中的文件锁协调）
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    if workers > 1:
+        uvicorn.run("main:app", host=host, port=port, workers=workers)
+    else:
+        uvicorn.run(app, host=host, port=port)
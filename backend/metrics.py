@@ -0,0 +1,221 @@
+"""
+运行指标
+进程内的 Counter / Gauge / Histogram，以 Prometheus 文本格式在 /metrics 暴露；
+包括各路由请求耗时、处理流水线各阶段耗时、LLM token 用量和后台分析队列深度
+"""
+import time
+import bisect
+import functools
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Sequence, Tuple
+
+# Prometheus 文本格式的 Content-Type（charset 由 Response 自动补充）
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# 默认耗时分桶（秒）：覆盖毫秒级的磁盘操作到分钟级的模型调用
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[Tuple[str, str], ...] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    metric_type = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+    metric_type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}" for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    """可增可减的瞬时值"""
+    metric_type = "gauge"
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """累积分桶直方图"""
+    metric_type = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签 -> [各桶计数(非累积)..., +Inf 桶计数], 总和
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        lines = self._header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+REGISTRY: List[_Metric] = []
+
+HTTP_REQUEST_DURATION = Histogram(
+    "teamie_http_request_duration_seconds", "HTTP 请求耗时（按路由模板）", ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "teamie_http_requests_in_progress", "正在处理的 HTTP 请求数", ("method",)
+)
+STAGE_DURATION = Histogram(
+    "teamie_stage_duration_seconds", "处理流水线各阶段耗时", ("stage",)
+)
+LLM_REQUESTS = Counter(
+    "teamie_llm_requests_total", "LLM 调用次数", ("model", "purpose", "outcome")
+)
+LLM_TOKENS = Counter(
+    "teamie_llm_tokens_total", "LLM token 用量", ("model", "purpose", "kind")
+)
+ANALYSIS_QUEUE_DEPTH = Gauge(
+    "teamie_analysis_queue_depth", "已提交但尚未完成的后台分析任务数"
+)
+EDIT_FLUSH_FAILURES = Counter(
+    "teamie_edit_flush_failures_total", "合并写入内联编辑失败的操作数（retried 已重新排队，dropped 重试后仍失败而丢弃）", ("outcome",)
+)
+
+
+def stage_timer(stage: str):
+    """记录一个流水线阶段的耗时：with stage_timer("llm_call"): ..."""
+    return STAGE_DURATION.time(stage=stage)
+
+
+def timed(stage: str):
+    """函数装饰器形式的 stage_timer"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage_timer(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_llm_usage(model: str, purpose: str, usage: Dict[str, int], outcome: str = "success"):
+    """记录一次 LLM 调用及其 token 用量"""
+    LLM_REQUESTS.inc(model=model, purpose=purpose, outcome=outcome)
+    LLM_TOKENS.inc(usage.get("prompt_tokens", 0), model=model, purpose=purpose, kind="prompt")
+    LLM_TOKENS.inc(usage.get("completion_tokens", 0), model=model, purpose=purpose, kind="completion")
+
+
+def render_metrics() -> str:
+    """以 Prometheus 文本格式输出所有指标"""
+    lines: List[str] = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """记录每个请求的耗时，路由标签使用路由模板（如 /api/projects/{project_id}）避免基数膨胀"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "")
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_REQUESTS_IN_PROGRESS.inc(method=method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_REQUESTS_IN_PROGRESS.dec(method=method)
+            route = scope.get("route")
+            if route is not None:
+                route_label = getattr(route, "path", "other")
+            elif scope.get("path", "").startswith("/api/"):
+                route_label = "unmatched"
+            else:
+                route_label = "static"
+            HTTP_REQUEST_DURATION.observe(
+                time.perf_counter() - started, method=method, route=route_label, status=str(status["code"])
+            )
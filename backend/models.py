@@ -37,12 +37,23 @@ class Project(BaseModel):
     updated_at: datetime = datetime.now()
     weeks: Dict[int, WeekData] = {}
 
+class ProjectMeta(BaseModel):
+    # 项目元数据（不含周报内容），列表和项目信息接口只需要这些字段
+    id: str
+    name: str
+    status: str = "进行中"
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    weeks: List[int] = []  # 已有的周（升序）
+    archived: bool = False  # 已归档（周报和文件在冷存储中，访问时自动恢复）
+
 class ProjectSummary(BaseModel):
     id: str
     name: str
     current_week: int
     status: str
     total_weeks: int
+    archived: bool = False
 
 class UploadResponse(BaseModel):
     success: bool
@@ -51,8 +62,65 @@ class UploadResponse(BaseModel):
     file_count: Optional[int] = None
     token_count: Optional[int] = None
     estimated_time_seconds: Optional[float] = None
+    # 预计处理时间的置信区间和提交时的排队任务数
+    estimated_time_lower_seconds: Optional[float] = None
+    estimated_time_upper_seconds: Optional[float] = None
+    queue_depth: Optional[int] = None
 
 class ReportResponse(BaseModel):
     success: bool
     message: str
     data: Optional[WeekData] = None
+
+class WeekStats(BaseModel):
+    week: int
+    week_period: Optional[str] = None
+    completed_count: int = 0
+    incomplete_count: int = 0
+    completion_rate: float = 0.0  # completed / (completed + incomplete)
+    plan_counts: Dict[str, int] = {}  # 下周计划按优先级计数: P0, P1, P2
+
+class ProjectDashboard(BaseModel):
+    id: str
+    name: str
+    status: str
+    current_week: int
+    total_weeks: int
+    updated_at: Optional[datetime] = None
+    completion_rate: float = 0.0  # 当前周完成率
+    trend_delta: float = 0.0  # 当前周相对上一周完成率的变化
+    trend: List[float] = []  # 按周排列的完成率
+    weeks: List[WeekStats] = []
+    archived: bool = False  # 已归档（统计保留在总览中，周报和文件在冷存储中）
+
+class BatchWeekImportItem(BaseModel):
+    project_id: Optional[str] = None
+    project_name: Optional[str] = None  # 未提供 project_id 时按名称创建新项目
+    week: int
+    data: WeekData
+
+class BatchWeekImportRequest(BaseModel):
+    items: List[BatchWeekImportItem]
+
+class BatchStatusItem(BaseModel):
+    project_id: str
+    status: str
+
+class BatchStatusRequest(BaseModel):
+    items: List[BatchStatusItem]
+
+class BatchAnalyzeItem(BaseModel):
+    project_id: str
+    week: Optional[int] = None  # 为空时重新分析当前（最新）周
+
+class BatchAnalyzeRequest(BaseModel):
+    items: List[BatchAnalyzeItem]
+
+class BatchExportRequest(BaseModel):
+    project_ids: Optional[List[str]] = None  # 为空时导出全部项目
+    weeks: Optional[List[int]] = None  # 为空时导出全部周
+
+class BatchResponse(BaseModel):
+    success: bool
+    message: str
+    results: List[Dict[str, Any]] = []
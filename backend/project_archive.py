@@ -0,0 +1,104 @@
+"""
+项目归档（冷存储）
+已结束或长期未更新的项目从 projects.json 和 data/{项目ID}/ 移出，打包为 data/archive/{项目ID}.tar.gz：
+- project.json：完整的项目数据（含全部周报）
+- files/：原项目目录（各周的文件清单、版本历史）
+- blobs/：清单引用的文档内容（blob 存储中的压缩数据，原样打包）
+归档文件存在即表示项目处于归档状态；DataManager 访问归档项目时自动恢复（解包后重新放回热存储）。
+"""
+import io
+import os
+import tarfile
+from typing import Iterable, List, Optional
+
+from models import Project
+from blob_store import BlobStore
+
+ARCHIVE_DIRNAME = "archive"
+PROJECT_MEMBER = "project.json"
+FILES_PREFIX = "files"
+BLOBS_PREFIX = "blobs"
+
+
+class ProjectArchive:
+    """按项目打包的 tar.gz 归档"""
+
+    def __init__(self, data_dir: str):
+        self.archive_dir = os.path.join(data_dir, ARCHIVE_DIRNAME)
+
+    def _path(self, project_id: str) -> str:
+        return os.path.join(self.archive_dir, f"{project_id}.tar.gz")
+
+    def contains(self, project_id: str) -> bool:
+        return os.path.exists(self._path(project_id))
+
+    def list_ids(self) -> List[str]:
+        """全部已归档的项目 ID"""
+        try:
+            names = os.listdir(self.archive_dir)
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-len(".tar.gz")] for name in names if name.endswith(".tar.gz"))
+
+    def size(self, project_id: str) -> int:
+        try:
+            return os.path.getsize(self._path(project_id))
+        except OSError:
+            return 0
+
+    def write(self, project: Project, project_dir: str, blob_store: BlobStore, hashes: Iterable[str]) -> int:
+        """把项目数据、项目目录和引用的文档 blob 打包（先写临时文件再原子替换），返回归档大小（字节）"""
+        os.makedirs(self.archive_dir, exist_ok=True)
+        path = self._path(project.id)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        payload = project.model_dump_json().encode("utf-8")
+        with tarfile.open(tmp_path, "w:gz") as tar:
+            info = tarfile.TarInfo(PROJECT_MEMBER)
+            info.size = len(payload)
+            tar.addfile(info, io.BytesIO(payload))
+            if os.path.isdir(project_dir):
+                tar.add(project_dir, arcname=FILES_PREFIX)
+            for digest in sorted(hashes):
+                if blob_store.contains(digest):
+                    tar.add(blob_store.path(digest), arcname=f"{BLOBS_PREFIX}/{digest}")
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    def read_project(self, project_id: str) -> Optional[Project]:
+        """只读取归档中的项目数据（不解包文件），归档不存在时返回 None"""
+        try:
+            with tarfile.open(self._path(project_id), "r:gz") as tar:
+                member = tar.extractfile(PROJECT_MEMBER)
+                return Project.model_validate_json(member.read())
+        except FileNotFoundError:
+            return None
+
+    def extract(self, project_id: str, project_dir: str, blob_store: BlobStore) -> Project:
+        """把归档中的文件解包到项目目录、文档 blob 放回 blob 存储，返回项目数据"""
+        prefix = FILES_PREFIX + "/"
+        blob_prefix = BLOBS_PREFIX + "/"
+        with tarfile.open(self._path(project_id), "r:gz") as tar:
+            project = Project.model_validate_json(tar.extractfile(PROJECT_MEMBER).read())
+            members = []
+            for member in tar.getmembers():
+                if member.name.startswith(blob_prefix) and member.isfile():
+                    digest = member.name[len(blob_prefix):]
+                    if not blob_store.touch(digest):
+                        blob_store.put_compressed(digest, tar.extractfile(member).read())
+                    continue
+                if not member.name.startswith(prefix):
+                    continue
+                member.name = member.name[len(prefix):]
+                members.append(member)
+            os.makedirs(project_dir, exist_ok=True)
+            # data 过滤器拒绝绝对路径、越界路径和链接（Python 3.11.4+）
+            extract_filter = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+            tar.extractall(project_dir, members=members, **extract_filter)
+        return project
+
+    def remove(self, project_id: str):
+        """删除归档（项目已恢复或被删除之后调用）"""
+        try:
+            os.remove(self._path(project_id))
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,162 @@
+"""
+项目索引
+data/project_index.json 保存持久化的项目 ID 计数器和 {项目ID: 名称、状态、创建/更新时间、周列表} 索引：
+新建项目只需递增计数器（删除过的 ID 不会被重新分配），判断项目是否存在、按名称查找项目、
+项目列表和项目信息等只需要元数据的读取都不需要加载 projects.json。
+
+索引由 DataManager 在持有存储写锁时更新：计数器和元数据的变化追加到 project_index.jsonl，
+不重写整个索引（见 snapshot_journal），新建项目的开销与项目数无关。
+读取时只补读其他 worker 新追加的日志；索引文件不存在或损坏时根据全部项目重建一次。
+"""
+import os
+import re
+import logging
+import threading
+from typing import Dict, List, Optional
+
+from snapshot_journal import SnapshotJournal
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "project_index.json"
+INDEX_JOURNAL_FILENAME = "project_index.jsonl"
+PROJECT_ID_PREFIX = "project_"
+_ID_PATTERN = re.compile(rf"^{PROJECT_ID_PREFIX}(\d+)$")
+# 索引条目的字段变化时递增，旧版本的索引会被重建（保留 ID 计数器）
+INDEX_VERSION = 2
+
+
+class ProjectIndex:
+    """项目 ID 分配器 + 项目元数据索引
+
+    日志条目：{"n": 下一个 ID}、{"u": {项目ID: 元数据}}、{"r": [项目ID]}
+    """
+
+    def __init__(self, data_dir: str):
+        self.path = os.path.join(data_dir, INDEX_FILENAME)
+        self._lock = threading.Lock()
+        self._next_id = 1
+        self._projects: Dict[str, dict] = {}
+        # 名称 / 状态 -> 项目 ID 列表
+        self._by_name: Dict[str, List[str]] = {}
+        self._by_status: Dict[str, List[str]] = {}
+        self._journal = SnapshotJournal(self.path, os.path.join(data_dir, INDEX_JOURNAL_FILENAME),
+                                        self._load_snapshot, self._apply_entry)
+
+    def _load_snapshot(self, data: dict):
+        # 计数器在索引重建后继续沿用，保证删除过的 ID 不被重新分配
+        self._next_id = max(self._next_id, int(data["next_id"]))
+        if data.get("version") != INDEX_VERSION:
+            raise ValueError("项目索引格式已更新")
+        self._projects = {}
+        self._by_name, self._by_status = {}, {}
+        for project_id, entry in data["projects"].items():
+            self._upsert(project_id, entry)
+
+    def _apply_entry(self, entry: dict):
+        if "n" in entry:
+            self._next_id = max(self._next_id, int(entry["n"]))
+        for project_id in entry.get("r", ()):
+            self._remove(project_id)
+        for project_id, item in entry.get("u", {}).items():
+            self._upsert(project_id, item)
+
+    def _upsert(self, project_id: str, entry: dict):
+        previous = self._projects.get(project_id)
+        if previous is not None:
+            self._unlink(project_id, previous)
+        self._projects[project_id] = dict(entry)
+        self._by_name.setdefault(entry.get("name"), []).append(project_id)
+        self._by_status.setdefault(entry.get("status"), []).append(project_id)
+
+    def _remove(self, project_id: str):
+        entry = self._projects.pop(project_id, None)
+        if entry is not None:
+            self._unlink(project_id, entry)
+
+    def _unlink(self, project_id: str, entry: dict):
+        for lookup, key in ((self._by_name, entry.get("name")), (self._by_status, entry.get("status"))):
+            ids = lookup.get(key)
+            if ids and project_id in ids:
+                ids.remove(project_id)
+                if not ids:
+                    del lookup[key]
+
+    def _refresh(self) -> bool:
+        """读取其他 worker 的修改，索引文件不存在或损坏时返回 False（调用方持有 self._lock）"""
+        return self._journal.refresh()
+
+    def _append(self, entry: dict):
+        """追加一条修改，日志过长时压缩为新的索引文件（调用方持有 self._lock）"""
+        self._journal.append(entry)
+        if self._journal.needs_compaction():
+            self._compact()
+
+    def _compact(self):
+        self._journal.compact({"version": INDEX_VERSION, "next_id": self._next_id, "projects": self._projects})
+
+    def ready(self) -> bool:
+        """索引文件是否可用（不可用时需要调用 rebuild）"""
+        with self._lock:
+            return self._refresh()
+
+    def rebuild(self, projects: Dict[str, dict]):
+        """根据全部项目的元数据 {ID: {name, status, ...}} 重建索引，计数器从已有的最大编号之后开始"""
+        with self._lock:
+            self._refresh()
+            numbers = [int(m.group(1)) for m in map(_ID_PATTERN.match, projects) if m]
+            self._next_id = max([self._next_id, *(n + 1 for n in numbers)])
+            self._projects = {}
+            self._by_name, self._by_status = {}, {}
+            for project_id, entry in projects.items():
+                self._upsert(project_id, entry)
+            self._compact()
+
+    def allocate_id(self) -> str:
+        """分配新的项目 ID（需持有存储写锁）"""
+        with self._lock:
+            self._refresh()
+            next_id = self._next_id
+            # 防止计数器落后于索引中已有的编号（例如索引被手动修改过）
+            while f"{PROJECT_ID_PREFIX}{next_id}" in self._projects:
+                next_id += 1
+            self._append({"n": next_id + 1})
+            return f"{PROJECT_ID_PREFIX}{next_id}"
+
+    def apply(self, upserts: Dict[str, dict], removals: List[str]):
+        """写入项目元数据的变化和删除（需持有存储写锁）"""
+        if not upserts and not removals:
+            return
+        with self._lock:
+            self._refresh()
+            entry = {}
+            if removals:
+                entry["r"] = list(removals)
+            if upserts:
+                entry["u"] = upserts
+            self._append(entry)
+
+    def get(self, project_id: str) -> Optional[dict]:
+        """项目的元数据 {name, status, created_at, updated_at, weeks}，不存在时返回 None"""
+        with self._lock:
+            self._refresh()
+            entry = self._projects.get(project_id)
+            return dict(entry) if entry else None
+
+    def entries(self) -> Dict[str, dict]:
+        """全部项目的元数据（按创建顺序）"""
+        with self._lock:
+            self._refresh()
+            return {project_id: dict(entry) for project_id, entry in self._projects.items()}
+
+    def find_by_name(self, name: str) -> List[str]:
+        """按名称查找项目 ID（名称可能重复）"""
+        with self._lock:
+            self._refresh()
+            return list(self._by_name.get(name, ()))
+
+    def find_by_status(self, status: str) -> List[str]:
+        """按状态查找项目 ID"""
+        with self._lock:
+            self._refresh()
+            return list(self._by_status.get(status, ()))
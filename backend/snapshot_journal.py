@@ -0,0 +1,129 @@
+"""
+快照 + 只追加日志
+项目索引和总览统计这类按项目 ID 存储的元数据，每次修改只向 {名称}.jsonl 追加一行，不重写整个快照文件；
+日志超过阈值时把当前状态写成新快照（原子替换）并清空日志（与 change_log 压缩 projects.json 的方式相同）。
+
+读取方在内存中维护状态：快照变化（新的 inode + mtime）时整体重新加载，否则只读取日志新增的部分。
+写入（追加、压缩）由调用方在持有存储写锁时进行；不加锁的读取在读完日志后再次检查快照，
+读取期间发生了压缩时重新加载。
+"""
+import os
+import json
+import logging
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# 超过任一阈值时压缩
+COMPACT_MAX_ENTRIES = 1000
+COMPACT_MAX_BYTES = 1024 * 1024
+
+
+class SnapshotJournal:
+    """快照文件 + 日志文件的读写，状态本身由调用方维护
+
+    load_snapshot(data) 用快照内容重置状态，apply_entry(entry) 在状态上执行一条日志；
+    二者抛出 KeyError / TypeError / ValueError 时视为快照损坏。
+    """
+
+    def __init__(self, snapshot_path: str, journal_path: str,
+                 load_snapshot: Callable[[dict], None], apply_entry: Callable[[dict], None]):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self._load_snapshot = load_snapshot
+        self._apply_entry = apply_entry
+        self._signature: Optional[tuple] = None
+        # 已读取（已执行）的日志字节数和行数
+        self._offset = 0
+        self._entries = 0
+
+    def _stat_snapshot(self) -> Optional[tuple]:
+        try:
+            stat = os.stat(self.snapshot_path)
+        except OSError:
+            return None
+        # 快照总是原子替换（新的 inode），inode + mtime 可以区分同一时钟刻度内的多次写入
+        return stat.st_ino, stat.st_mtime_ns
+
+    def refresh(self) -> bool:
+        """把调用方的状态更新到最新，快照不存在或损坏时返回 False（调用方需要重建）"""
+        for _ in range(3):
+            signature = self._stat_snapshot()
+            if signature is None:
+                self._signature = None
+                return False
+            if signature != self._signature:
+                try:
+                    with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                        self._load_snapshot(json.load(f))
+                except (OSError, ValueError, KeyError, TypeError) as e:
+                    logger.warning(f"{os.path.basename(self.snapshot_path)} 损坏，将重建: {str(e)}")
+                    self._signature = None
+                    return False
+                self._signature = signature
+                self._offset = 0
+                self._entries = 0
+
+            if not self._read_journal() or self._stat_snapshot() != signature:
+                # 读取期间发生了压缩，重新加载
+                self._signature = None
+                continue
+            return True
+        return False
+
+    def _read_journal(self) -> bool:
+        """执行日志中新增的完整行；日志比已读取的部分短（已被压缩清空）时返回 False"""
+        try:
+            size = os.path.getsize(self.journal_path)
+        except OSError:
+            size = 0
+        if size < self._offset:
+            return False
+        if size == self._offset:
+            return True
+        with open(self.journal_path, "rb") as f:
+            f.seek(self._offset)
+            chunk = f.read(size - self._offset)
+        for line in chunk.splitlines(keepends=True):
+            # 其他进程正在追加的末行
+            if not line.endswith(b"\n"):
+                break
+            self._offset += len(line)
+            self._entries += 1
+            try:
+                self._apply_entry(json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                logger.warning(f"{os.path.basename(self.journal_path)} 中存在无法解析的行，已跳过")
+        return True
+
+    def append(self, entry: dict):
+        """追加一条日志并在调用方的状态上执行（需持有存储写锁，且调用前已 refresh）"""
+        line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+        with open(self.journal_path, "ab") as f:
+            start = f.tell()
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        if start == self._offset and self._signature is not None:
+            self._apply_entry(entry)
+            self._offset += len(line)
+            self._entries += 1
+        else:
+            # 状态没有跟上文件，下次 refresh 时从已读取的位置补读
+            self.refresh()
+
+    def needs_compaction(self) -> bool:
+        return self._entries >= COMPACT_MAX_ENTRIES or self._offset >= COMPACT_MAX_BYTES
+
+    def compact(self, snapshot: dict):
+        """把当前完整状态写成快照并清空日志（需持有存储写锁）"""
+        tmp_path = f"{self.snapshot_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(snapshot, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, self.snapshot_path)
+        # 先替换快照再清空日志：读取方读到清空后的日志时一定能发现快照已变化
+        with open(self.journal_path, "wb"):
+            pass
+        self._signature = self._stat_snapshot()
+        self._offset = 0
+        self._entries = 0
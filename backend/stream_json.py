@@ -0,0 +1,133 @@
+"""
+周报 JSON 增量解析
+模型流式输出时逐块喂入，顶层字段（completed_tasks、incomplete_tasks ... next_week_plan）的值一闭合就解析、校验并返回，
+不必等到最后一个 token 再整体 json.loads
+"""
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+
+from models import WeekData
+
+logger = logging.getLogger(__name__)
+
+# 可增量输出的周报分区（week_period 由系统设置）
+WEEK_DATA_SECTIONS = tuple(name for name in WeekData.model_fields if name != "week_period")
+
+
+class WeekDataStreamParser:
+    """顶层对象的增量解析器
+
+    只跟踪字符串/转义状态和嵌套深度，不构建中间语法树；每个字符只扫描一次。
+    开头的 ```json 等非 JSON 前缀会被跳过。
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.sections: Dict[str, Any] = {}
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        # key -> colon -> value -> after（值已结束，等待逗号或右括号）
+        self._state = "key"
+        self._key: Optional[str] = None
+        self._key_start = 0
+        self._value_start: Optional[int] = None
+
+    def feed(self, chunk: str) -> List[Tuple[str, Any]]:
+        """喂入一段输出，返回本次新完成的 (分区名, 校验后的值) 列表"""
+        if not chunk or self._finished:
+            return []
+        self.text += chunk
+        completed: List[Tuple[str, Any]] = []
+        text = self.text
+
+        i = self._pos
+        while i < len(text) and not self._finished:
+            ch = text[i]
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._depth = 1
+                i += 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._state == "key":
+                        self._key = self._loads(text[self._key_start:i + 1])
+                        self._state = "colon"
+                i += 1
+                continue
+
+            if self._depth == 1 and self._state == "value" and self._value_start is None and not ch.isspace():
+                self._value_start = i
+
+            if ch == '"':
+                self._in_string = True
+                if self._depth == 1 and self._state == "key":
+                    self._key_start = i
+            elif ch == ":" and self._depth == 1 and self._state == "colon":
+                self._state = "value"
+                self._value_start = None
+            elif ch in "{[":
+                self._depth += 1
+            elif ch in "}]":
+                self._depth -= 1
+                if self._depth == 1 and self._state == "value":
+                    # 数组/对象值闭合
+                    self._emit(text[self._value_start:i + 1], completed)
+                    self._state = "after"
+                elif self._depth == 0:
+                    if self._state == "value" and self._value_start is not None:
+                        self._emit(text[self._value_start:i], completed)
+                    self._finished = True
+            elif ch == "," and self._depth == 1:
+                if self._state == "value" and self._value_start is not None:
+                    # 标量值以逗号结束
+                    self._emit(text[self._value_start:i], completed)
+                self._state = "key"
+            i += 1
+
+        self._pos = i
+        return completed
+
+    @property
+    def finished(self) -> bool:
+        return self._finished
+
+    @staticmethod
+    def _loads(raw: str) -> Any:
+        try:
+            return json.loads(raw)
+        except json.JSONDecodeError:
+            return None
+
+    def _emit(self, raw: str, completed: List[Tuple[str, Any]]):
+        key = self._key
+        self._key = None
+        self._value_start = None
+        if key not in WEEK_DATA_SECTIONS:
+            return
+
+        try:
+            value = json.loads(raw.strip())
+            section = getattr(WeekData.model_validate({key: value}), key)
+        except (json.JSONDecodeError, ValidationError) as e:
+            # 单个分区不合法时先跳过，由最终的整体校验/修复处理
+            logger.warning(f"流式解析分区 {key} 失败: {str(e)[:200]}")
+            return
+
+        self.sections[key] = section
+        completed.append((key, section))
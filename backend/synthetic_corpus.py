@@ -0,0 +1,94 @@
+"""
+模拟 Notion 导出语料
+按固定随机种子生成与 Notion 导出结构一致的文件集合（html/md 混合、文件名带 32 位十六进制 ID、多级子目录），
+供基准测试和压测使用，结果可复现。
+"""
+import random
+from typing import Dict, List
+
+# 预设规模：文件数 × 每个文件的字符数
+CORPUS_PRESETS: Dict[str, Dict[str, int]] = {
+    "small": {"files": 5, "file_chars": 4000},
+    "medium": {"files": 40, "file_chars": 20000},
+    "huge": {"files": 200, "file_chars": 50000},
+}
+
+PAGE_TITLES = ("周会纪要", "需求评审", "技术方案", "用户访谈", "迭代计划", "问题复盘", "数据分析", "上线检查")
+FOLDER_TITLES = ("项目周报", "会议记录", "设计文档", "调研")
+
+
+def _notion_id(rng: random.Random) -> str:
+    return "%032x" % rng.getrandbits(128)
+
+
+def _paragraphs(rng: random.Random, chars: int) -> List[str]:
+    """生成约 chars 个字符的段落（任务列表、进展描述、问题记录交替出现）"""
+    paragraphs = []
+    total = 0
+    index = 1
+    while total < chars:
+        kind = rng.randrange(3)
+        if kind == 0:
+            text = f"[{'x' if rng.random() < 0.7 else ' '}] 任务 {index}：完成模块 {index} 的开发与联调，负责人 成员{rng.randint(1, 9)}"
+        elif kind == 1:
+            text = f"进展 {index}：本周推进了第 {rng.randint(1, 20)} 项需求，完成度约 {rng.randint(10, 100)}%，下一步安排评审和测试"
+        else:
+            text = f"问题 {index}：接口响应偶发超时，初步定位为依赖服务限流，已与对方约定在下周排查"
+        paragraphs.append(text)
+        total += len(text) + 1
+        index += 1
+    return paragraphs
+
+
+def _render_html(title: str, paragraphs: List[str]) -> str:
+    body = "\n".join(
+        f'<ul class="to-do-list"><li><div class="checkbox"></div> {p[4:]}</li></ul>' if p.startswith("[")
+        else f"<p>{p}</p>" for p in paragraphs
+    )
+    return (
+        '<html><head><meta http-equiv="Content-Type" content="text/html; charset=utf-8"/>'
+        f"<title>{title}</title><style>body {{ margin: 0; }}</style></head>"
+        f'<body><article class="page sans"><header><h1 class="page-title">{title}</h1></header>'
+        f'<div class="page-body">\n{body}\n</div></article></body></html>'
+    )
+
+
+def _render_markdown(title: str, paragraphs: List[str]) -> str:
+    lines = [f"# {title}", ""]
+    lines.extend(f"- {p}" if p.startswith("[") else p + "\n" for p in paragraphs)
+    return "\n".join(lines)
+
+
+def notion_corpus(preset: str = "small", seed: int = 0, files: int = None, file_chars: int = None) -> List[dict]:
+    """生成模拟的 Notion 导出，返回 [{filename, content, relative_path}]
+
+    filename 保留 Notion 的 ID 后缀（与用户直接上传导出包时一致），relative_path 为所在文件夹（根目录为 None）
+    """
+    config = CORPUS_PRESETS[preset]
+    files = files or config["files"]
+    file_chars = file_chars or config["file_chars"]
+    rng = random.Random(seed)
+
+    folders = [None] + [
+        f"{rng.choice(FOLDER_TITLES)} {_notion_id(rng)}" for _ in range(max(1, files // 10))
+    ]
+    corpus = []
+    for index in range(files):
+        title = f"{rng.choice(PAGE_TITLES)} {index + 1}"
+        folder = rng.choice(folders)
+        if folder and rng.random() < 0.3:
+            folder = f"{folder}/{rng.choice(PAGE_TITLES)} {_notion_id(rng)}"
+        paragraphs = _paragraphs(rng, file_chars)
+        if index % 2 == 0:
+            filename = f"{title} {_notion_id(rng)}.html"
+            content = _render_html(title, paragraphs)
+        else:
+            filename = f"{title} {_notion_id(rng)}.md"
+            content = _render_markdown(title, paragraphs)
+        corpus.append({"filename": filename, "content": content, "relative_path": folder})
+    return corpus
+
+
+def corpus_bytes(corpus: List[dict]) -> int:
+    """语料的 UTF-8 总字节数"""
+    return sum(len(item["content"].encode("utf-8")) for item in corpus)
@@ -0,0 +1,45 @@
+import main
+from models import WeekData
+
+NOTION_ID = "a" * 32
+
+
+def upload_to_current_week(client, project_id, filename, content):
+    return client.post(
+        f"/api/projects/{project_id}/analyze-next-week",
+        files=[("files", (filename, content, "text/html"))],
+        data={"week_start_date": "2025-11-03", "update_current_week": "true"},
+    )
+
+
+def test_reupload_to_current_week_replaces_stored_copy(client, data_manager, monkeypatch):
+    project_id = data_manager.create_project("重复上传", WeekData())
+
+    assert upload_to_current_week(client, project_id, f"周报 {NOTION_ID}.html", "<p>第一版</p>".encode()).status_code == 200
+
+    analyzed = []
+
+    async def capture_analysis(project_id, week, file_contents, eta_job=None, **kwargs):
+        analyzed.extend(file_contents)
+        main.finish_analysis_job(eta_job)
+        main.job_claims.release(project_id, week)
+
+    monkeypatch.setattr(main, "process_next_week_in_background", capture_analysis)
+    assert upload_to_current_week(client, project_id, f"周报 {NOTION_ID}.html", "<p>第二版</p>".encode()).status_code == 200
+
+    assert data_manager.get_files(project_id, 1) == ["周报.html"]
+    assert data_manager.get_file_content_by_name(project_id, 1, "周报.html") == "<p>第二版</p>"
+    assert [item["content"] for item in analyzed] == ["<p>第二版</p>"]
+
+
+def test_upload_of_different_document_with_same_name_is_numbered(client, data_manager):
+    project_id = data_manager.create_project("同名文档", WeekData())
+
+    upload_to_current_week(client, project_id, f"周报 {NOTION_ID}.html", "<p>一</p>".encode())
+    upload_to_current_week(client, project_id, f"周报 {'b' * 32}.html", "<p>二</p>".encode())
+    # 内容相同的文档即使原文件名不同也视为同一文档
+    upload_to_current_week(client, project_id, f"周报 {'c' * 32}.html", "<p>二</p>".encode())
+
+    assert sorted(data_manager.get_files(project_id, 1)) == ["周报 2.html", "周报.html"]
+    assert data_manager.get_file_content_by_name(project_id, 1, "周报.html") == "<p>一</p>"
+    assert data_manager.get_file_content_by_name(project_id, 1, "周报 2.html") == "<p>二</p>"
@@ -0,0 +1,18 @@
+from models import WeekData, CompletedTask
+
+
+def test_restore_version_of_archived_project(client, data_manager):
+    project_id = data_manager.create_project("归档项目", WeekData(week_period="第一版"))
+    data_manager.update_week_data(project_id, 1, WeekData(week_period="第二版", completed_tasks=[CompletedTask(task="A", description="b")]))
+    assert data_manager.archive_project(project_id)
+    assert data_manager.archive.contains(project_id)
+
+    response = client.post(f"/api/projects/{project_id}/week/1/versions/1/restore")
+
+    assert response.status_code == 200
+    assert response.json()["week_data"]["week_period"] == "第一版"
+    assert not data_manager.archive.contains(project_id)
+    assert data_manager.get_week_data(project_id, 1).week_period == "第一版"
+    versions = data_manager.get_week_versions(project_id, 1)
+    assert [item["version"] for item in versions] == [3, 2, 1]
+    assert versions[0]["source"] == "restore"
@@ -0,0 +1,271 @@
+"""
+跨周趋势分析
+不调用AI，基于所有已保存的周报确定性地计算：计划完成率、反复延期的任务、反复出现的阻碍
+任务匹配使用字符二元组（对中文友好）的 Dice 相似度，通过倒排索引一次性计算整批相似度矩阵
+"""
+import re
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from models import Project
+
+logger = logging.getLogger(__name__)
+
+# 认为两条任务描述是同一任务的最低相似度
+MATCH_THRESHOLD = 0.5
+# 反复出现的判定：至少出现在这么多个不同的周
+RECURRING_MIN_WEEKS = 2
+
+_NON_WORD_PATTERN = re.compile(r'[\s\W_]+', re.UNICODE)
+
+
+def _normalize(text: str) -> str:
+    """去掉空白和标点并转小写"""
+    return _NON_WORD_PATTERN.sub('', (text or '').lower())
+
+
+def _bigrams(text: str) -> frozenset:
+    """字符二元组集合；单字符文本退化为单字符集合"""
+    normalized = _normalize(text)
+    if len(normalized) < 2:
+        return frozenset([normalized]) if normalized else frozenset()
+    return frozenset(normalized[i:i + 2] for i in range(len(normalized) - 1))
+
+
+def similarity_matrix(sources: List[str], targets: List[str]) -> List[List[float]]:
+    """计算 sources × targets 的 Dice 相似度矩阵
+
+    对 targets 建倒排索引（二元组 -> 下标），每个 source 只需遍历自己的二元组即可累计出与所有 target 的交集大小，
+    整体开销与二元组总数成正比，而不是逐对比较字符串。
+    """
+    target_grams = [_bigrams(text) for text in targets]
+    index: Dict[str, List[int]] = defaultdict(list)
+    for j, grams in enumerate(target_grams):
+        for gram in grams:
+            index[gram].append(j)
+
+    matrix = []
+    for text in sources:
+        grams = _bigrams(text)
+        overlap = [0] * len(targets)
+        for gram in grams:
+            for j in index.get(gram, ()):
+                overlap[j] += 1
+        row = []
+        for j, count in enumerate(overlap):
+            denominator = len(grams) + len(target_grams[j])
+            row.append(2.0 * count / denominator if denominator else 0.0)
+        matrix.append(row)
+    return matrix
+
+
+def match_tasks(sources: List[str], targets: List[str], threshold: float = MATCH_THRESHOLD) -> Dict[int, Tuple[int, float]]:
+    """按相似度从高到低贪心地一对一匹配，返回 {source 下标: (target 下标, 相似度)}"""
+    if not sources or not targets:
+        return {}
+
+    matrix = similarity_matrix(sources, targets)
+    candidates = [
+        (score, i, j)
+        for i, row in enumerate(matrix)
+        for j, score in enumerate(row)
+        if score >= threshold
+    ]
+    candidates.sort(reverse=True)
+
+    matches: Dict[int, Tuple[int, float]] = {}
+    used_targets = set()
+    for score, i, j in candidates:
+        if i in matches or j in used_targets:
+            continue
+        matches[i] = (j, round(score, 4))
+        used_targets.add(j)
+    return matches
+
+
+def cluster_items(items: List[Tuple[int, str]], threshold: float = MATCH_THRESHOLD) -> List[dict]:
+    """把 (周, 文本) 列表按相似度聚类，返回出现在多个不同周的簇"""
+    if not items:
+        return []
+
+    texts = [text for _, text in items]
+    matrix = similarity_matrix(texts, texts)
+
+    # 并查集合并相似文本
+    parent = list(range(len(items)))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for i, row in enumerate(matrix):
+        for j in range(i + 1, len(row)):
+            if row[j] >= threshold:
+                parent[find(j)] = find(i)
+
+    groups: Dict[int, List[int]] = defaultdict(list)
+    for i in range(len(items)):
+        groups[find(i)].append(i)
+
+    clusters = []
+    for members in groups.values():
+        weeks = sorted({items[i][0] for i in members})
+        if len(weeks) < RECURRING_MIN_WEEKS:
+            continue
+        # 以最早出现的描述作为代表
+        first = min(members, key=lambda i: items[i][0])
+        clusters.append({
+            "text": items[first][1],
+            "weeks": weeks,
+            "occurrences": len(members),
+            "variants": sorted({items[i][1] for i in members})
+        })
+    clusters.sort(key=lambda item: (-len(item["weeks"]), item["weeks"][0]))
+    return clusters
+
+
+def analyze_project_trends(project: Project) -> dict:
+    """计算单个项目的跨周趋势指标"""
+    weeks = sorted(project.weeks.keys())
+
+    transitions = []
+    totals = {"planned": 0, "completed": 0, "incomplete": 0, "missing": 0}
+    by_priority: Dict[str, Dict[str, int]] = defaultdict(lambda: {"planned": 0, "completed": 0})
+
+    for week, next_week in zip(weeks, weeks[1:]):
+        plans = project.weeks[week].next_week_plan
+        following = project.weeks[next_week]
+        plan_texts = [plan.task for plan in plans]
+
+        completed_matches = match_tasks(plan_texts, [task.task for task in following.completed_tasks])
+        remaining = [i for i in range(len(plans)) if i not in completed_matches]
+        incomplete_matches = match_tasks(
+            [plan_texts[i] for i in remaining],
+            [task.task for task in following.incomplete_tasks]
+        )
+        incomplete_indices = {remaining[i] for i in incomplete_matches}
+
+        plan_details = []
+        for i, plan in enumerate(plans):
+            if i in completed_matches:
+                outcome = "completed"
+                matched = following.completed_tasks[completed_matches[i][0]].task
+            elif i in incomplete_indices:
+                outcome = "incomplete"
+                local = remaining.index(i)
+                matched = following.incomplete_tasks[incomplete_matches[local][0]].task
+            else:
+                outcome = "missing"
+                matched = None
+            plan_details.append({"task": plan.task, "priority": plan.priority, "outcome": outcome, "matched_task": matched})
+
+            priority_stats = by_priority[plan.priority or "P1"]
+            priority_stats["planned"] += 1
+            if outcome == "completed":
+                priority_stats["completed"] += 1
+
+        completed = len(completed_matches)
+        incomplete = len(incomplete_indices)
+        missing = len(plans) - completed - incomplete
+        totals["planned"] += len(plans)
+        totals["completed"] += completed
+        totals["incomplete"] += incomplete
+        totals["missing"] += missing
+
+        transitions.append({
+            "from_week": week,
+            "to_week": next_week,
+            "planned": len(plans),
+            "completed": completed,
+            "incomplete": incomplete,
+            "missing": missing,
+            "plan_completion_rate": round(completed / len(plans), 4) if plans else None,
+            "plans": plan_details
+        })
+
+    # 反复未完成（延期）的任务：多周出现在未完成事项中
+    carried_items = []
+    for week in weeks:
+        carried_items.extend((week, task.task) for task in project.weeks[week].incomplete_tasks)
+
+    # 反复出现的阻碍：内部反思 + 未完成原因
+    blocker_items = []
+    for week in weeks:
+        week_data = project.weeks[week]
+        blocker_items.extend((week, item) for item in week_data.internal_reflection if item)
+        blocker_items.extend((week, task.reason) for task in week_data.incomplete_tasks if task.reason)
+
+    return {
+        "project_id": project.id,
+        "name": project.name,
+        "weeks": weeks,
+        "plan_completion_rate": round(totals["completed"] / totals["planned"], 4) if totals["planned"] else None,
+        "totals": totals,
+        "priority_completion": {
+            priority: {
+                **stats,
+                "rate": round(stats["completed"] / stats["planned"], 4) if stats["planned"] else None
+            }
+            for priority, stats in sorted(by_priority.items())
+        },
+        "transitions": transitions,
+        "carried_over_tasks": cluster_items(carried_items),
+        "recurring_blockers": cluster_items(blocker_items)
+    }
+
+
+class TrendAnalyzer:
+    """带缓存的趋势分析：项目未更新时直接返回上次的结果"""
+
+    def __init__(self, data_manager):
+        self.data_manager = data_manager
+        # project_id -> (缓存版本, 结果)
+        self._cache: Dict[str, Tuple[tuple, dict]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _version(project: Project) -> tuple:
+        return (str(project.updated_at), tuple(sorted(project.weeks.keys())))
+
+    def _analyze(self, project: Project) -> dict:
+        version = self._version(project)
+        with self._lock:
+            cached = self._cache.get(project.id)
+        if cached and cached[0] == version:
+            return cached[1]
+
+        result = analyze_project_trends(project)
+        with self._lock:
+            self._cache[project.id] = (version, result)
+        return result
+
+    def get_project_trends(self, project_id: str) -> Optional[dict]:
+        """获取单个项目的趋势指标"""
+        project = self.data_manager.get_project(project_id)
+        if not project:
+            return None
+        return self._analyze(project)
+
+    def get_all_trends(self) -> dict:
+        """获取所有项目的趋势指标及整体汇总"""
+        projects = self.data_manager.get_projects()
+        with self._lock:
+            # 清理已删除项目的缓存
+            for project_id in [key for key in self._cache if key not in projects]:
+                del self._cache[project_id]
+        results = [self._analyze(project) for project in projects.values()]
+
+        totals = {"planned": 0, "completed": 0, "incomplete": 0, "missing": 0}
+        for result in results:
+            for key in totals:
+                totals[key] += result["totals"][key]
+
+        return {
+            "plan_completion_rate": round(totals["completed"] / totals["planned"], 4) if totals["planned"] else None,
+            "totals": totals,
+            "projects": results
+        }
@@ -0,0 +1,165 @@
+"""
+LLM 用量台账
+每次模型调用追加一行紧凑 JSON（只追加不改写），记录模型、项目、周、用途、token、耗时和提示词缓存命中；
+提供按项目/模型/天的聚合查询，以及按模型实测的处理速度（tokens/秒）
+"""
+import os
+import json
+import time
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+LEDGER_FILENAME = "usage_ledger.jsonl"
+
+# 支持的聚合维度 -> 记录中的字段
+GROUP_FIELDS = {
+    "project": "p",
+    "model": "m",
+    "purpose": "k",
+    "week": "w",
+    "day": "d",
+}
+
+# 计算实测速度时使用的最近调用数，以及生效所需的最少样本数
+MEASURE_WINDOW = 20
+MEASURE_MIN_SAMPLES = 3
+
+
+class UsageLedger:
+    """追加写入的用量台账，查询时增量读取新追加的行并缓存在内存中"""
+
+    def __init__(self, data_dir: str):
+        self.path = os.path.join(data_dir, LEDGER_FILENAME)
+        self._lock = threading.Lock()
+        self._records: List[dict] = []
+        self._offset = 0
+
+    def record(self, model: str, purpose: str, usage: Dict[str, int], latency_seconds: float,
+               project_id: Optional[str] = None, week: Optional[int] = None):
+        """追加一条调用记录"""
+        now = time.time()
+        entry = {
+            "t": round(now, 3),
+            "d": datetime.fromtimestamp(now).strftime("%Y-%m-%d"),
+            "m": model,
+            "k": purpose,
+            "p": project_id,
+            "w": week,
+            "pt": int(usage.get("prompt_tokens", 0) or 0),
+            "ct": int(usage.get("completion_tokens", 0) or 0),
+            "ch": int(usage.get("cached_tokens", 0) or 0),
+            "l": round(latency_seconds, 3),
+        }
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":")) + "\n"
+        try:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+        except OSError as e:
+            # 台账写入失败不影响业务流程
+            logger.error(f"写入用量台账失败: {str(e)}")
+
+    def _refresh(self) -> List[dict]:
+        """读取上次之后新追加的记录"""
+        with self._lock:
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                return self._records
+            if size < self._offset:
+                # 文件被替换或截断，重新读取
+                self._records = []
+                self._offset = 0
+            if size == self._offset:
+                return self._records
+
+            with open(self.path, "rb") as f:
+                f.seek(self._offset)
+                data = f.read()
+            # 只处理完整的行，未写完的行留到下次
+            end = data.rfind(b"\n") + 1
+            for raw in data[:end].splitlines():
+                if not raw.strip():
+                    continue
+                try:
+                    self._records.append(json.loads(raw))
+                except json.JSONDecodeError:
+                    logger.warning("用量台账中存在无法解析的行，已跳过")
+            self._offset += end
+            return self._records
+
+    def query(self, group_by: Sequence[str] = ("project", "model", "day"), project_id: Optional[str] = None,
+              model: Optional[str] = None, since: Optional[str] = None, until: Optional[str] = None) -> dict:
+        """按维度聚合用量；since/until 为 YYYY-MM-DD（含）"""
+        unknown = [name for name in group_by if name not in GROUP_FIELDS]
+        if unknown:
+            raise ValueError(f"不支持的聚合维度: {', '.join(unknown)}")
+
+        groups: Dict[tuple, dict] = {}
+        totals = _empty_aggregate()
+        for entry in list(self._refresh()):
+            if project_id and entry.get("p") != project_id:
+                continue
+            if model and entry.get("m") != model:
+                continue
+            if since and entry.get("d", "") < since:
+                continue
+            if until and entry.get("d", "") > until:
+                continue
+
+            key = tuple(entry.get(GROUP_FIELDS[name]) for name in group_by)
+            aggregate = groups.get(key)
+            if aggregate is None:
+                aggregate = groups[key] = _empty_aggregate()
+            _accumulate(aggregate, entry)
+            _accumulate(totals, entry)
+
+        results = []
+        for key, aggregate in sorted(groups.items(), key=lambda item: tuple(str(v) for v in item[0])):
+            results.append({**dict(zip(group_by, key)), **_finalize(aggregate)})
+        return {"group_by": list(group_by), "groups": results, "totals": _finalize(totals)}
+
+    def measured_tokens_per_second(self, model: str, purpose: str = "analysis") -> Optional[float]:
+        """最近若干次调用的实测处理速度（总 token / 耗时，与预计时间的计算口径一致），样本不足时返回 None"""
+        samples = [
+            entry for entry in self._refresh()
+            if entry.get("m") == model and entry.get("k") == purpose and entry.get("l", 0) > 0
+        ][-MEASURE_WINDOW:]
+        if len(samples) < MEASURE_MIN_SAMPLES:
+            return None
+        total_tokens = sum(entry["pt"] + entry["ct"] for entry in samples)
+        total_seconds = sum(entry["l"] for entry in samples)
+        return round(total_tokens / total_seconds, 1) if total_seconds > 0 else None
+
+
+def _empty_aggregate() -> dict:
+    return {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "cached_tokens": 0,
+            "cache_hits": 0, "latency_seconds": 0.0}
+
+
+def _accumulate(aggregate: dict, entry: dict):
+    aggregate["calls"] += 1
+    aggregate["prompt_tokens"] += entry.get("pt", 0)
+    aggregate["completion_tokens"] += entry.get("ct", 0)
+    aggregate["cached_tokens"] += entry.get("ch", 0)
+    aggregate["cache_hits"] += 1 if entry.get("ch", 0) > 0 else 0
+    aggregate["latency_seconds"] += entry.get("l", 0)
+
+
+def _finalize(aggregate: dict) -> dict:
+    calls = aggregate["calls"]
+    latency = aggregate["latency_seconds"]
+    total_tokens = aggregate["prompt_tokens"] + aggregate["completion_tokens"]
+    return {
+        **aggregate,
+        "total_tokens": total_tokens,
+        "latency_seconds": round(latency, 3),
+        "avg_latency_seconds": round(latency / calls, 3) if calls else None,
+        "tokens_per_second": round(total_tokens / latency, 1) if latency > 0 else None,
+        "completion_tokens_per_second": round(aggregate["completion_tokens"] / latency, 1) if latency > 0 else None,
+    }
@@ -0,0 +1,188 @@
+"""
+周报版本历史
+每个项目每周一个只追加的 JSON Lines 文件（data/{project_id}/history/week_{n}.jsonl），
+每次写入周报时追加一条相对上一版本的增量；每隔 CHECKPOINT_INTERVAL 个版本写一次完整快照，
+重建任意版本时从最近的快照开始向后重放，最多重放 CHECKPOINT_INTERVAL - 1 条增量。
+
+最新版本就是 projects.json 中的周报，读取周报的正常路径不会访问历史文件。
+    {"v": 1, "t": "...", "s": "analysis", "full": {...}}     快照
+    {"v": 2, "t": "...", "s": "patch", "d": [...]}           增量（格式见 week_patch）
+"""
+import os
+import json
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from models import WeekData
+from week_patch import apply_delta, diff_week
+
+# 每隔多少个版本写一次完整快照
+CHECKPOINT_INTERVAL = 20
+
+
+class _Head:
+    """历史文件的索引：最新版本号、各快照的位置和有效数据的结尾"""
+    __slots__ = ("version", "checkpoints", "end")
+
+    def __init__(self):
+        self.version = 0
+        self.checkpoints: List[Tuple[int, int]] = []  # (版本号, 文件偏移)
+        self.end = 0
+
+
+class WeekHistory:
+    """周报版本历史（增量 + 定期快照）"""
+
+    def __init__(self, data_dir: str, checkpoint_interval: int = CHECKPOINT_INTERVAL):
+        self.data_dir = data_dir
+        self.checkpoint_interval = max(1, checkpoint_interval)
+        self._lock = threading.Lock()
+        self._heads: Dict[Tuple[str, int], _Head] = {}
+
+    def _path(self, project_id: str, week: int) -> str:
+        return os.path.join(self.data_dir, project_id, "history", f"week_{week}.jsonl")
+
+    def _head(self, project_id: str, week: int) -> _Head:
+        """读取（首次访问时扫描文件建立）索引，调用方需持有 self._lock"""
+        key = (project_id, week)
+        path = self._path(project_id, week)
+        head = self._heads.get(key)
+        # 文件大小与索引不一致（被其他进程追加或删除）时重新扫描
+        if head is not None and head.end == (os.path.getsize(path) if os.path.exists(path) else 0):
+            return head
+
+        head = _Head()
+        if os.path.exists(path):
+            with open(path, "rb") as f:
+                offset = 0
+                for line in f:
+                    # 写到一半的末行视为无效
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    if "full" in entry:
+                        head.checkpoints.append((entry["v"], offset))
+                    head.version = entry["v"]
+                    offset += len(line)
+                head.end = offset
+        self._heads[key] = head
+        return head
+
+    def _append(self, project_id: str, week: int, head: _Head, entry: dict):
+        path = self._path(project_id, week)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        line = (json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n").encode("utf-8")
+        with open(path, "ab") as f:
+            if f.tell() != head.end:
+                # 丢弃上次写到一半的内容
+                f.truncate(head.end)
+                f.seek(head.end)
+            f.write(line)
+        if "full" in entry:
+            head.checkpoints.append((entry["v"], head.end))
+        head.version = entry["v"]
+        head.end += len(line)
+
+    def record(self, project_id: str, week: int, previous: Optional[WeekData], current: WeekData, source: str) -> Optional[int]:
+        """记录一次写入，返回新版本号（内容没有变化时返回 None）
+
+        previous 为写入前的周报；该周还没有历史时先把 previous 记为第一个版本。
+        """
+        with self._lock:
+            head = self._head(project_id, week)
+            now = datetime.now().isoformat()
+            try:
+                if head.version == 0 and previous is not None:
+                    self._append(project_id, week, head, {"v": 1, "t": now, "s": "initial", "full": previous.model_dump(mode="json")})
+
+                delta = diff_week(previous, current) if previous is not None and head.version > 0 else None
+                if delta is not None and not delta:
+                    return None
+
+                version = head.version + 1
+                entry = {"v": version, "t": now, "s": source}
+                last_checkpoint = head.checkpoints[-1][0] if head.checkpoints else 0
+                if delta is None or version - last_checkpoint >= self.checkpoint_interval:
+                    entry["full"] = current.model_dump(mode="json")
+                else:
+                    entry["d"] = delta
+                self._append(project_id, week, head, entry)
+                return version
+            except Exception:
+                # 写入失败时丢弃索引，下次访问重新扫描文件
+                self._heads.pop((project_id, week), None)
+                raise
+
+    def remove(self, project_id: str, week: Optional[int] = None):
+        """删除该周的历史文件并丢弃缓存的索引（周被删除后调用，重新创建的同一周从版本 1 开始）；
+        week 为空时只丢弃整个项目的索引（项目目录由调用方删除）"""
+        with self._lock:
+            if week is None:
+                for key in [k for k in self._heads if k[0] == project_id]:
+                    del self._heads[key]
+                return
+            self._heads.pop((project_id, week), None)
+            try:
+                os.remove(self._path(project_id, week))
+            except FileNotFoundError:
+                pass
+
+    def latest_version(self, project_id: str, week: int) -> int:
+        """最新版本号（0 表示没有历史）"""
+        with self._lock:
+            return self._head(project_id, week).version
+
+    def list_versions(self, project_id: str, week: int) -> List[dict]:
+        """列出所有版本（从新到旧），只返回元数据和改动的字段"""
+        with self._lock:
+            end = self._head(project_id, week).end
+        versions = []
+        for entry in self._read(project_id, week, 0, end):
+            if "full" in entry:
+                fields = sorted(entry["full"].keys())
+            else:
+                fields = sorted({item[0] for item in entry["d"]})
+            versions.append({
+                "version": entry["v"],
+                "created_at": entry["t"],
+                "source": entry["s"],
+                "snapshot": "full" in entry,
+                "changed_fields": fields,
+            })
+        versions.reverse()
+        return versions
+
+    def get_version(self, project_id: str, week: int, version: int) -> Optional[WeekData]:
+        """重建指定版本：从不晚于该版本的最近快照开始重放增量"""
+        with self._lock:
+            head = self._head(project_id, week)
+            if version < 1 or version > head.version:
+                return None
+            start = max((offset for v, offset in head.checkpoints if v <= version), default=None)
+            end = head.end
+        if start is None:
+            return None
+
+        week_data = None
+        for entry in self._read(project_id, week, start, end):
+            if entry["v"] > version:
+                break
+            if "full" in entry:
+                week_data = WeekData.model_validate(entry["full"])
+            else:
+                week_data = apply_delta(week_data, entry["d"])
+        return week_data
+
+    def _read(self, project_id: str, week: int, start: int, end: int):
+        path = self._path(project_id, week)
+        if end <= start or not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            f.seek(start)
+            for line in f.read(end - start).splitlines():
+                yield json.loads(line)
+
@@ -0,0 +1,275 @@
+"""
+周报字段级 PATCH
+按 RFC 6902（JSON Patch）修改 WeekData，支持 add / remove / replace / move / copy / test，例如：
+    [{"op": "replace", "path": "/completed_tasks/3/description", "value": "补充了联调结果"}]
+只校验被修改的条目（未改动的条目直接复用原对象），并生成可重复重放的增量，用于追加写入变更日志：
+    ["completed_tasks", 3, {...}]   替换单个条目
+    ["completed_tasks", [...]]      替换整个字段（条目增删时）
+"""
+import copy
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+from models import WeekData, CompletedTask, IncompleteTask, ExternalFeedback, NextWeekPlan
+
+# 列表字段 -> 条目类型
+LIST_FIELDS = {
+    "completed_tasks": CompletedTask,
+    "incomplete_tasks": IncompleteTask,
+    "motivation_direction": str,
+    "internal_reflection": str,
+    "external_feedback": ExternalFeedback,
+    "next_week_plan": NextWeekPlan,
+}
+SCALAR_FIELDS = {"week_period": Optional[str]}
+
+_ITEM_ADAPTERS = {name: TypeAdapter(item_type) for name, item_type in LIST_FIELDS.items()}
+_FIELD_ADAPTERS = {
+    **{name: TypeAdapter(List[item_type]) for name, item_type in LIST_FIELDS.items()},
+    **{name: TypeAdapter(field_type) for name, field_type in SCALAR_FIELDS.items()},
+}
+
+OPERATIONS = ("add", "remove", "replace", "move", "copy", "test")
+
+
+class PatchError(ValueError):
+    """补丁格式错误、路径无效或修改后的内容校验失败"""
+
+
+class PatchConflict(PatchError):
+    """test 操作的值与当前内容不一致"""
+
+
+def _parse_pointer(pointer: Any) -> List[str]:
+    """解析 JSON Pointer（RFC 6901）"""
+    if not isinstance(pointer, str) or not pointer.startswith("/"):
+        raise PatchError(f"无效的路径: {pointer!r}")
+    tokens = [token.replace("~1", "/").replace("~0", "~") for token in pointer[1:].split("/")]
+    if tokens[0] not in LIST_FIELDS and tokens[0] not in SCALAR_FIELDS:
+        raise PatchError(f"未知的字段: {tokens[0]}")
+    if tokens[0] in SCALAR_FIELDS and len(tokens) > 1:
+        raise PatchError(f"字段 {tokens[0]} 不是列表: {pointer}")
+    return tokens
+
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, list):
+        return [_to_json(item) for item in value]
+    return value
+
+
+def _index(container: list, token: str, pointer: str, allow_end: bool = False) -> int:
+    if allow_end and token == "-":
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token.startswith("0")):
+        raise PatchError(f"无效的列表下标: {pointer}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise PatchError(f"列表下标越界: {pointer}")
+    return index
+
+
+class _Document:
+    """补丁执行过程中的周报状态：字段按需复制，条目在被深入修改时才转换为 JSON"""
+
+    def __init__(self, week: WeekData):
+        self.week = week
+        self.fields: Dict[str, Any] = {}
+
+    def field(self, name: str) -> Any:
+        if name not in self.fields:
+            value = getattr(self.week, name)
+            self.fields[name] = list(value) if name in LIST_FIELDS else value
+        return self.fields[name]
+
+    def _parent(self, tokens: List[str], pointer: str) -> Tuple[Any, str]:
+        """定位路径的父容器，沿途把模型对象转换为可修改的 JSON"""
+        if len(tokens) == 1:
+            return self, tokens[0]
+        container = self.field(tokens[0])
+        if not isinstance(container, list):
+            raise PatchError(f"路径不存在: {pointer}")
+        for token in tokens[1:-1]:
+            if isinstance(container, list):
+                index = _index(container, token, pointer)
+                if isinstance(container[index], BaseModel):
+                    container[index] = _to_json(container[index])
+                container = container[index]
+            elif isinstance(container, dict) and token in container:
+                container = container[token]
+            else:
+                raise PatchError(f"路径不存在: {pointer}")
+            if not isinstance(container, (list, dict)):
+                raise PatchError(f"路径不存在: {pointer}")
+        return container, tokens[-1]
+
+    def get(self, tokens: List[str], pointer: str) -> Any:
+        parent, key = self._parent(tokens, pointer)
+        if parent is self:
+            return _to_json(self.field(key))
+        if isinstance(parent, list):
+            return _to_json(parent[_index(parent, key, pointer)])
+        if key not in parent:
+            raise PatchError(f"路径不存在: {pointer}")
+        return parent[key]
+
+    def add(self, tokens: List[str], pointer: str, value: Any):
+        parent, key = self._parent(tokens, pointer)
+        if parent is self:
+            self.fields[key] = value
+        elif isinstance(parent, list):
+            parent.insert(_index(parent, key, pointer, allow_end=True), value)
+        else:
+            parent[key] = value
+
+    def remove(self, tokens: List[str], pointer: str) -> Any:
+        parent, key = self._parent(tokens, pointer)
+        if parent is self:
+            # 删除整个字段即恢复默认值
+            value = self.field(key)
+            self.fields[key] = [] if key in LIST_FIELDS else None
+            return value
+        if isinstance(parent, list):
+            return parent.pop(_index(parent, key, pointer))
+        if key not in parent:
+            raise PatchError(f"路径不存在: {pointer}")
+        return parent.pop(key)
+
+    def replace(self, tokens: List[str], pointer: str, value: Any):
+        parent, key = self._parent(tokens, pointer)
+        if parent is self:
+            self.fields[key] = value
+        elif isinstance(parent, list):
+            parent[_index(parent, key, pointer)] = value
+        else:
+            if key not in parent:
+                raise PatchError(f"路径不存在: {pointer}")
+            parent[key] = value
+
+
+def apply_week_patch(week: WeekData, operations: List[dict]) -> Tuple[WeekData, List[list]]:
+    """执行补丁，返回 (修改后的周报, 增量)；原周报对象不会被修改
+
+    补丁中任何一步失败都会抛出 PatchError，不会产生部分修改。
+    """
+    if not isinstance(operations, list):
+        raise PatchError("补丁必须是操作列表")
+
+    document = _Document(week)
+    for position, operation in enumerate(operations):
+        if not isinstance(operation, dict) or operation.get("op") not in OPERATIONS:
+            raise PatchError(f"第 {position + 1} 个操作无效，op 必须是 {', '.join(OPERATIONS)} 之一")
+        op, pointer = operation["op"], operation.get("path")
+        tokens = _parse_pointer(pointer)
+        if op in ("add", "replace", "test") and "value" not in operation:
+            raise PatchError(f"{op} 操作缺少 value: {pointer}")
+
+        if op == "add":
+            document.add(tokens, pointer, copy.deepcopy(operation["value"]))
+        elif op == "remove":
+            document.remove(tokens, pointer)
+        elif op == "replace":
+            document.replace(tokens, pointer, copy.deepcopy(operation["value"]))
+        elif op == "test":
+            if document.get(tokens, pointer) != operation["value"]:
+                raise PatchConflict(f"内容已变化: {pointer}")
+        else:
+            source = operation.get("from")
+            source_tokens = _parse_pointer(source)
+            value = copy.deepcopy(document.get(source_tokens, source))
+            if op == "move":
+                document.remove(source_tokens, source)
+            document.add(tokens, pointer, value)
+
+    updates: Dict[str, Any] = {}
+    delta: List[list] = []
+    for name, value in document.fields.items():
+        original = getattr(week, name)
+        if name in SCALAR_FIELDS:
+            try:
+                value = _FIELD_ADAPTERS[name].validate_python(value)
+            except ValidationError as e:
+                raise PatchError(f"{name} 校验失败: {e.errors()[0]['msg']}")
+            if value != original:
+                updates[name] = value
+                delta.append([name, value])
+            continue
+
+        if not isinstance(value, list):
+            raise PatchError(f"{name} 必须是列表")
+        # 只校验新增或被修改过的条目，原有条目对象原样保留
+        original_ids = {id(item) for item in original}
+        validated = []
+        for index, item in enumerate(value):
+            if id(item) not in original_ids:
+                try:
+                    item = _ITEM_ADAPTERS[name].validate_python(item)
+                except ValidationError as e:
+                    error = e.errors()[0]
+                    location = ".".join(str(part) for part in error["loc"])
+                    raise PatchError(f"{name}[{index}]{'.' + location if location else ''} 校验失败: {error['msg']}")
+            validated.append(item)
+
+        if len(validated) == len(original):
+            changed = [index for index, item in enumerate(validated) if item != original[index]]
+            if not changed:
+                continue
+            if len(changed) < len(validated):
+                delta.extend([name, index, _to_json(validated[index])] for index in changed)
+            else:
+                delta.append([name, _to_json(validated)])
+        else:
+            delta.append([name, _to_json(validated)])
+        updates[name] = validated
+
+    return week.model_copy(update=updates), delta
+
+
+def apply_delta(week: WeekData, delta: List[list]) -> WeekData:
+    """把变更日志中的增量应用到周报（可重复执行）"""
+    updates: Dict[str, Any] = {}
+    for entry in delta:
+        name = entry[0]
+        if name not in _FIELD_ADAPTERS:
+            continue
+        if len(entry) == 2:
+            updates[name] = _FIELD_ADAPTERS[name].validate_python(entry[1])
+        else:
+            items = updates.get(name)
+            if items is None:
+                items = updates[name] = list(getattr(week, name))
+            index = entry[1]
+            if 0 <= index < len(items):
+                items[index] = _ITEM_ADAPTERS[name].validate_python(entry[2])
+    return week.model_copy(update=updates)
+
+
+def diff_week(old: WeekData, new: WeekData) -> List[list]:
+    """计算从 old 到 new 的增量（格式与 apply_week_patch 的增量相同，可用 apply_delta 重放）"""
+    delta: List[list] = []
+    for name in SCALAR_FIELDS:
+        value = getattr(new, name)
+        if value != getattr(old, name):
+            delta.append([name, value])
+    for name in LIST_FIELDS:
+        original, current = getattr(old, name), getattr(new, name)
+        if current == original:
+            continue
+        if len(current) == len(original):
+            changed = [index for index, item in enumerate(current) if item != original[index]]
+            if len(changed) < len(current):
+                delta.extend([name, index, _to_json(current[index])] for index in changed)
+                continue
+        delta.append([name, _to_json(current)])
+    return delta
+
+
+def operations_from_fields(data: Dict[str, Any]) -> List[dict]:
+    """把 {字段: 新值} 形式的部分更新转换为 replace 操作（忽略未知字段）"""
+    return [
+        {"op": "replace", "path": f"/{name}", "value": value}
+        for name, value in data.items() if name in LIST_FIELDS or name in SCALAR_FIELDS
+    ]
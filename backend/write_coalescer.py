@@ -0,0 +1,212 @@
+"""
+周报编辑写入合并
+内联编辑产生的补丁先按 (项目, 周) 缓存在内存中，在编辑停顿 window 秒（或最早一次编辑后 max_delay 秒）后
+合并为一次写入；读取数据前和进程退出时会先把缓存写入存储，保证读到的总是最新内容。
+编辑在缓存时已向客户端返回成功，写入失败时逐个操作重试一次，仍失败的操作重新排队、按退避间隔重试，
+超过重试次数才丢弃；失败次数记录在 teamie_edit_flush_failures_total 指标中。
+"""
+import time
+import logging
+import threading
+from typing import Callable, ContextManager, Dict, List, Optional, Tuple
+
+from models import WeekData
+from metrics import EDIT_FLUSH_FAILURES
+
+logger = logging.getLogger(__name__)
+
+# 默认合并窗口：编辑停顿这么久后写入
+DEFAULT_WINDOW_SECONDS = 1.0
+# 持续编辑时最长的写入延迟
+DEFAULT_MAX_DELAY_SECONDS = 5.0
+# 写入失败后的重试：间隔从 RETRY_BASE_SECONDS 开始翻倍，最多 MAX_RETRIES 次
+RETRY_BASE_SECONDS = 1.0
+RETRY_MAX_SECONDS = 60.0
+MAX_RETRIES = 5
+
+Key = Tuple[str, int]
+
+
+class _Batch:
+    __slots__ = ("operations", "working", "first_at", "last_at", "attempts", "retry_at")
+
+    def __init__(self, working: WeekData):
+        self.operations: List[dict] = []
+        # 应用了全部缓存补丁后的周报，用于校验后续补丁和立即返回结果
+        self.working = working
+        self.first_at = self.last_at = time.monotonic()
+        # 已失败的写入次数；重试等待期间 retry_at 为下次写入的时间
+        self.attempts = 0
+        self.retry_at: Optional[float] = None
+
+
+class WriteCoalescer:
+    """按 (项目, 周) 合并补丁写入
+
+    flush_fn(project_id, week, operations) 负责真正写入；flush_lock 与存储的写锁相同，
+    写入进行中时读取方调用 flush() 会等待写入完成。
+    """
+
+    def __init__(self, flush_fn: Callable[[str, int, List[dict]], None], flush_lock: ContextManager,
+                 window_seconds: float = DEFAULT_WINDOW_SECONDS, max_delay_seconds: float = DEFAULT_MAX_DELAY_SECONDS):
+        self._flush_fn = flush_fn
+        self._flush_lock = flush_lock
+        self.window_seconds = window_seconds
+        self.max_delay_seconds = max(max_delay_seconds, window_seconds)
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._pending: Dict[Key, _Batch] = {}
+        self._in_flight = 0
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    def has_pending(self) -> bool:
+        """是否有尚未写入（或正在写入）的编辑"""
+        with self._lock:
+            return bool(self._pending) or self._in_flight > 0
+
+    def submit(self, key: Key, operations: List[dict], base_loader: Callable[[], Optional[WeekData]],
+               apply_fn: Callable[[WeekData, List[dict]], WeekData]) -> Optional[WeekData]:
+        """缓存一个补丁，返回应用后的周报
+
+        base_loader 在该周第一次出现时读取当前周报，返回 None 表示项目不存在（此时不缓存，返回 None）；
+        apply_fn 在缓存的周报上执行补丁，补丁无效时抛出的异常会直接传给调用方，不会进入缓存。
+        """
+        while True:
+            with self._lock:
+                batch = self._pending.get(key)
+                if batch is not None:
+                    batch.working = apply_fn(batch.working, operations)
+                    batch.operations.extend(operations)
+                    batch.last_at = time.monotonic()
+                    working = batch.working
+                    closed = self._closed
+                    if not closed:
+                        self._ensure_thread()
+                        self._wakeup.notify()
+                    break
+            # 该周没有缓存时在锁外读取当前内容（读取前会等待进行中的写入完成）
+            base = base_loader()
+            if base is None:
+                return None
+            with self._lock:
+                self._pending.setdefault(key, _Batch(base))
+
+        if closed or self.window_seconds <= 0:
+            self.flush(key)
+        return working
+
+    def flush(self, key: Optional[Key] = None, include_retrying: bool = False):
+        """立即写入指定（或全部）缓存的编辑
+
+        写入全部编辑时默认跳过正在等待重试的批次（读取前的刷新不应提前消耗重试次数），include_retrying 时一并写入。
+        """
+        with self._flush_lock:
+            with self._lock:
+                if key is not None:
+                    keys = [key]
+                else:
+                    now = time.monotonic()
+                    keys = [k for k, batch in self._pending.items()
+                            if include_retrying or batch.retry_at is None or batch.retry_at <= now]
+                batches = [(k, self._pending.pop(k)) for k in keys if k in self._pending]
+                self._in_flight += len(batches)
+            for (project_id, week), batch in batches:
+                try:
+                    self._write(project_id, week, batch)
+                finally:
+                    with self._lock:
+                        self._in_flight -= 1
+
+    def _write(self, project_id: str, week: int, batch: _Batch):
+        """写入一批编辑（调用方持有 flush_lock）；失败时逐个操作写入，仍失败的操作重新排队或丢弃"""
+        while True:
+            try:
+                self._flush_fn(project_id, week, batch.operations)
+                logger.debug(f"已合并写入项目 {project_id} 第 {week} 周的 {len(batch.operations)} 个编辑操作")
+                return
+            except Exception as e:
+                logger.error(f"写入项目 {project_id} 第 {week} 周的缓存编辑失败，改为逐个操作写入: {str(e)}")
+
+            # 按顺序逐个写入（补丁依赖顺序），在第一个失败的操作处停下，其后的操作一起重新排队
+            remaining: List[dict] = []
+            for index, operation in enumerate(batch.operations):
+                try:
+                    self._flush_fn(project_id, week, [operation])
+                except Exception as e:
+                    logger.error(f"写入项目 {project_id} 第 {week} 周的编辑操作失败: {str(e)}")
+                    remaining = batch.operations[index:]
+                    break
+            if not remaining:
+                return
+            batch.operations = remaining
+            batch.attempts += 1
+            if batch.attempts <= MAX_RETRIES:
+                break
+            # 一直写不进去的操作（例如与存储中的内容冲突）丢弃，继续写入其后的操作
+            EDIT_FLUSH_FAILURES.inc(outcome="dropped")
+            logger.error(f"项目 {project_id} 第 {week} 周的编辑操作重试 {MAX_RETRIES} 次后仍写入失败，已丢弃: {remaining[0]}")
+            batch.operations = remaining[1:]
+            batch.attempts = 0
+            if not batch.operations:
+                return
+
+        EDIT_FLUSH_FAILURES.inc(len(batch.operations), outcome="retried")
+        delay = min(RETRY_BASE_SECONDS * 2 ** (batch.attempts - 1), RETRY_MAX_SECONDS)
+        with self._lock:
+            # 仍持有 flush_lock，其他线程此时无法读取存储并为该周新建缓存，直接放回即可；
+            # 放回之后提交的编辑追加在未写入的操作之后
+            batch.retry_at = time.monotonic() + delay
+            self._pending[(project_id, week)] = batch
+            if not self._closed:
+                self._ensure_thread()
+                self._wakeup.notify()
+        logger.warning(f"项目 {project_id} 第 {week} 周的 {len(batch.operations)} 个编辑操作将在 {delay:.1f} 秒后重试（第 {batch.attempts} 次）")
+
+    def close(self):
+        """停止后台线程并写入全部缓存（进程退出前调用）"""
+        with self._lock:
+            self._closed = True
+            self._wakeup.notify()
+            thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self.flush(include_retrying=True)
+        with self._lock:
+            remaining = sum(len(batch.operations) for batch in self._pending.values())
+            self._pending.clear()
+        if remaining:
+            # 进程即将退出，没有机会再重试
+            EDIT_FLUSH_FAILURES.inc(remaining, outcome="dropped")
+            logger.error(f"退出前仍有 {remaining} 个编辑操作未能写入")
+
+    def _ensure_thread(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="write-coalescer", daemon=True)
+            self._thread.start()
+
+    def _due_keys(self, now: float) -> Tuple[List[Key], Optional[float]]:
+        """返回已到期的 key 和距下一个到期的秒数"""
+        due, next_in = [], None
+        for key, batch in self._pending.items():
+            if batch.retry_at is not None:
+                deadline = batch.retry_at
+            else:
+                deadline = min(batch.last_at + self.window_seconds, batch.first_at + self.max_delay_seconds)
+            if deadline <= now:
+                due.append(key)
+            else:
+                next_in = deadline - now if next_in is None else min(next_in, deadline - now)
+        return due, next_in
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if self._closed:
+                    return
+                due, next_in = self._due_keys(time.monotonic())
+                if not due:
+                    self._wakeup.wait(timeout=next_in)
+                    continue
+            for key in due:
+                self.flush(key)
@@ -19,10 +19,10 @@ async function apiCall(endpoint, options = {}) {
     }
 }
 
-// 加载项目列表
+// 加载项目列表（总览统计接口一次返回所有项目及完成率）
 async function loadProjects() {
     try {
-        projects = await apiCall('/projects');
+        projects = await apiCall('/dashboard');
         renderProjectList();
         updateProjectStats();
         return projects;
@@ -38,6 +38,7 @@ async function loadProjects() {
 // 加载项目周报
 async function loadWeekReport(projectId, week) {
     try {
+        await flushWeekPatches();
         const report = await apiCall(`/projects/${projectId}/week/${week}`);
         return report;
     } catch (error) {
@@ -46,6 +47,28 @@ async function loadWeekReport(projectId, week) {
     }
 }
 
+// 订阅周报分析进度（SSE），返回 EventSource 以便调用方关闭
+function subscribeWeekAnalysis(projectId, week, { onSection, onDone } = {}) {
+    const source = new EventSource(`${API_BASE_URL}/projects/${projectId}/week/${week}/analysis/stream`);
+    source.addEventListener('section', (event) => {
+        if (onSection) {
+            const payload = JSON.parse(event.data);
+            onSection(payload.name, payload.value);
+        }
+    });
+    source.addEventListener('done', (event) => {
+        source.close();
+        if (onDone) {
+            onDone(JSON.parse(event.data));
+        }
+    });
+    source.onerror = () => {
+        // 连接中断时不自动重连，避免分析结束后反复请求
+        source.close();
+    };
+    return source;
+}
+
 // 获取项目信息
 async function getProjectInfo(projectId) {
     try {
@@ -138,6 +161,9 @@ async function uploadFiles(files, projectName, weekStartDate) {
 // 更新完整周报
 async function updateWeekReport(projectId, week, weekData) {
     try {
+        // 先发出排队中的自动保存，避免它们在整体保存之后才到达
+        await flushWeekPatches();
+
         const result = await apiCall(`/projects/${projectId}/week/${week}`, {
             method: 'PUT',
             body: JSON.stringify(weekData)
@@ -149,6 +175,92 @@ async function updateWeekReport(projectId, week, weekData) {
     }
 }
 
+// 按 JSON Patch 修改周报的单个字段或条目
+// operations 示例: [{ op: 'replace', path: '/completed_tasks/3/description', value: '...' }]
+async function patchWeekReport(projectId, week, operations) {
+    try {
+        return await apiCall(`/projects/${projectId}/week/${week}`, {
+            method: 'PATCH',
+            headers: { 'Content-Type': 'application/json-patch+json' },
+            body: JSON.stringify(operations)
+        });
+    } catch (error) {
+        console.error('Failed to patch week report:', error);
+        throw error;
+    }
+}
+
+// 获取周报的历史版本列表（从新到旧）
+async function loadWeekVersions(projectId, week) {
+    const result = await apiCall(`/projects/${projectId}/week/${week}/versions`);
+    return result.versions || [];
+}
+
+// 把周报恢复为指定历史版本
+async function restoreWeekVersion(projectId, week, version) {
+    await flushWeekPatches();
+    return await apiCall(`/projects/${projectId}/week/${week}/versions/${version}/restore`, {
+        method: 'POST'
+    });
+}
+
+// 内联编辑自动保存：同一周的编辑在停顿后合并为一次 PATCH 请求
+const WEEK_PATCH_DEBOUNCE_MS = 800;
+const pendingWeekPatches = new Map();  // "projectId/week" -> { projectId, week, operations, timer }
+
+function queueWeekPatch(projectId, week, operations) {
+    const key = `${projectId}/${week}`;
+    let batch = pendingWeekPatches.get(key);
+    if (!batch) {
+        batch = { projectId, week, operations: [], timer: null };
+        pendingWeekPatches.set(key, batch);
+    }
+    operations.forEach(operation => {
+        // 同一路径的多次 replace 只保留最后一次
+        if (operation.op === 'replace') {
+            batch.operations = batch.operations.filter(
+                existing => !(existing.op === 'replace' && existing.path === operation.path)
+            );
+        }
+        batch.operations.push(operation);
+    });
+    clearTimeout(batch.timer);
+    batch.timer = setTimeout(() => sendWeekPatch(key), WEEK_PATCH_DEBOUNCE_MS);
+}
+
+async function sendWeekPatch(key) {
+    const batch = pendingWeekPatches.get(key);
+    if (!batch) return;
+    pendingWeekPatches.delete(key);
+    clearTimeout(batch.timer);
+    if (batch.operations.length === 0) return;
+    try {
+        await patchWeekReport(batch.projectId, batch.week, batch.operations);
+    } catch (error) {
+        showToast('自动保存失败: ' + error.message, 'error');
+    }
+}
+
+// 立即发送所有尚未发送的编辑
+async function flushWeekPatches() {
+    await Promise.all([...pendingWeekPatches.keys()].map(sendWeekPatch));
+}
+
+// 关闭页面时用 keepalive 请求发出剩余编辑
+window.addEventListener('beforeunload', () => {
+    pendingWeekPatches.forEach(batch => {
+        clearTimeout(batch.timer);
+        if (batch.operations.length === 0) return;
+        fetch(`${API_BASE_URL}/projects/${batch.projectId}/week/${batch.week}`, {
+            method: 'PATCH',
+            headers: { 'Content-Type': 'application/json-patch+json' },
+            body: JSON.stringify(batch.operations),
+            keepalive: true
+        });
+    });
+    pendingWeekPatches.clear();
+});
+
 // 上传文件（导入新进展）
 async function uploadFilesForNextWeek(projectId, files, updateCurrentWeek = false, weekStartDate = null) {
     const formData = new FormData();
@@ -6,7 +6,7 @@ function renderProjectList() {
     if (projects.length === 0) {
         tbody.innerHTML = `
             <tr>
-                <td colspan="4" style="text-align: center; padding: 60px 20px; color: #999;">
+                <td colspan="5" style="text-align: center; padding: 60px 20px; color: #999;">
                     <div class="empty-state">
                         <h3>暂无项目</h3>
                         <p>请先上传 Notion HTML 文件来导入项目</p>
@@ -20,8 +20,9 @@ function renderProjectList() {
 
     tbody.innerHTML = projects.map(project => `
         <tr class="project-row" onclick="selectProject('${project.id}', '${project.name}')">
-            <td><strong>${project.name}</strong></td>
+            <td><strong>${project.name}</strong>${project.archived ? ' <span class="archived-tag" title="周报和文件已移入归档，打开项目时自动恢复">已归档</span>' : ''}</td>
             <td>第 ${project.current_week} 周</td>
+            <td>${formatCompletionRate(project)}</td>
             <td class="status-cell" data-project="${project.id}" onclick="editStatus(this, event)">${project.status}</td>
             <td class="project-actions">
                 <button class="delete-btn" onclick="deleteProject('${project.id}', '${project.name}', event)" title="删除项目">×</button>
@@ -30,11 +31,30 @@ function renderProjectList() {
     `).join('');
 }
 
+// 格式化当前周完成率及相对上一周的趋势
+function formatCompletionRate(project) {
+    const current = (project.weeks || []).find(week => week.week === project.current_week);
+    if (!current || current.completed_count + current.incomplete_count === 0) {
+        return '<span style="color: #999;">-</span>';
+    }
+
+    const rate = Math.round((project.completion_rate || 0) * 100);
+    const delta = Math.round((project.trend_delta || 0) * 100);
+    let trend = '';
+    if (project.total_weeks > 1 && delta !== 0) {
+        trend = delta > 0
+            ? ` <span style="color: #16a34a;" title="较上周">↑${delta}%</span>`
+            : ` <span style="color: #dc2626;" title="较上周">↓${-delta}%</span>`;
+    }
+    return `${rate}%${trend}`;
+}
+
 // 更新项目统计信息
 function updateProjectStats() {
     const statsElement = document.getElementById('project-stats');
     if (projects.length > 0) {
-        statsElement.textContent = `共 ${projects.length} 个项目`;
+        const completed = projects.reduce((sum, project) => sum + ((project.weeks || []).find(week => week.week === project.current_week)?.completed_count || 0), 0);
+        statsElement.textContent = `共 ${projects.length} 个项目，本周共完成 ${completed} 项`;
     } else {
         statsElement.textContent = '';
     }
@@ -68,6 +88,7 @@ async function selectProject(projectId, projectName) {
             }
 
             renderReport(reportData);
+            watchWeekAnalysis(projectId, currentWeek, reportData);
 
             // 显示项目信息区域
             const projectInfo = document.getElementById('projectInfo');
@@ -178,70 +199,103 @@ function updateSidebarFolderStructure(projectId, week = 1) {
     }
 }
 
-// 显示侧边栏文件夹结构
+// 显示侧边栏文件夹结构（按目录懒加载，分页获取）
 async function displaySidebarFolderStructure(projectId, week) {
     const sidebarContainer = document.getElementById('sidebarFolderStructure');
 
     try {
-        // 从后端获取文件列表
-        const response = await fetch(`${API_BASE_URL}/projects/${projectId}/week/${week}/files`);
-        const data = await response.json();
-
-        if (response.ok) {
-            const files = data.files || [];
-
-            // 使用统一的文件夹树构建逻辑（与upload.js保持一致）
-            let tree = {};
-
-            // 根据文件路径构建树结构
-            if (files.length > 0) {
-                files.forEach(file => {
-                    // file 可能是 "folder/file.html" 或 "其他文档/file.html" 或 "file.html"
-                    const pathParts = file.split('/');
-                    let current = tree;
-
-                    // 处理路径的每一部分
-                    for (let i = 0; i < pathParts.length; i++) {
-                        const part = pathParts[i];
-                        const isLast = i === pathParts.length - 1;
-
-                        if (isLast) {
-                            // 最后一部分是文件名
-                            current[part] = {
-                                type: 'file',
-                                children: {},
-                                file: null
-                            };
-                        } else {
-                            // 中间部分是文件夹
-                            if (!current[part]) {
-                                current[part] = {
-                                    type: 'folder',
-                                    children: {},
-                                    file: null
-                                };
-                            }
-                            current = current[part].children;
-                        }
-                    }
-                });
-            }
-
-            // 如果没有文件，显示空状态
-            if (Object.keys(tree).length === 0) {
-                sidebarContainer.innerHTML = '<div class="folder-item" style="color: #999; font-style: italic;">暂无文件</div>';
-                return;
-            }
+        const page = await fetchSidebarDirectory(projectId, week, '');
 
-            // 生成HTML（使用侧边栏专用的生成函数）
-            const html = generateSidebarTreeHTML(tree);
-            sidebarContainer.innerHTML = html;
-        } else {
-            console.error('获取文件列表失败:', data);
-            sidebarContainer.innerHTML = '<div class="folder-item" style="color: #999; font-style: italic;">加载失败</div>';
+        // 如果没有文件，显示空状态
+        if (page.entries.length === 0) {
+            sidebarContainer.innerHTML = '<div class="folder-item" style="color: #999; font-style: italic;">暂无文件</div>';
+            return;
         }
+
+        sidebarContainer.innerHTML = '';
+        appendSidebarEntries(sidebarContainer, page, projectId, week);
     } catch (error) {
         console.error('获取文件列表出错:', error);
         sidebarContainer.innerHTML = '<div class="folder-item" style="color: #999; font-style: italic;">加载失败</div>';
     }
 }
+
+// 获取某个目录的一页条目
+async function fetchSidebarDirectory(projectId, week, path, cursor = null) {
+    const params = new URLSearchParams({ path: path });
+    if (cursor) {
+        params.append('cursor', cursor);
+    }
+    const response = await fetch(`${API_BASE_URL}/projects/${projectId}/week/${week}/tree?${params.toString()}`);
+    const data = await response.json();
+    if (!response.ok) {
+        throw new Error(data.detail || `HTTP ${response.status}`);
+    }
+    return data;
+}
+
+// 将一页条目追加到容器中，还有更多条目时追加"加载更多"
+function appendSidebarEntries(container, page, projectId, week) {
+    const files = page.entries.filter(entry => entry.type === 'file');
+    const folders = page.entries.filter(entry => entry.type === 'folder');
+
+    let html = '';
+    folders.forEach(folder => {
+        html += `
+            <div class="folder-item folder" data-path="${folder.path}" onclick="toggleLazySidebarFolder(this, '${projectId}', ${week})">
+                <span class="folder-toggle collapsed"></span>
+                📁 ${folder.name}
+            </div>
+            <div class="folder-children" style="display: none;"></div>
+        `;
+    });
+
+    // 文件节点复用统一的树节点生成逻辑
+    const fileTree = {};
+    files.forEach(file => {
+        fileTree[file.name] = { type: 'file', children: {}, file: null };
+    });
+    html += generateSidebarTreeHTML(fileTree, '', page.path);
+
+    const moreButton = container.querySelector(':scope > .folder-item.load-more');
+    if (moreButton) {
+        moreButton.remove();
+    }
+    container.insertAdjacentHTML('beforeend', html);
+
+    if (page.next_cursor) {
+        const more = document.createElement('div');
+        more.className = 'folder-item load-more';
+        more.style.color = '#999';
+        more.textContent = `加载更多（共 ${page.total} 项）`;
+        more.onclick = async (event) => {
+            event.stopPropagation();
+            try {
+                const nextPage = await fetchSidebarDirectory(projectId, week, page.path, page.next_cursor);
+                appendSidebarEntries(container, nextPage, projectId, week);
+            } catch (error) {
+                console.error('加载更多文件失败:', error);
+                showToast('加载失败: ' + error.message, 'error');
+            }
+        };
+        container.appendChild(more);
+    }
+}
+
+// 展开文件夹时才加载其内容
+async function toggleLazySidebarFolder(element, projectId, week) {
+    const children = element.nextElementSibling;
+    if (!children.dataset.loaded) {
+        children.dataset.loaded = 'true';
+        try {
+            const page = await fetchSidebarDirectory(projectId, week, element.getAttribute('data-path'));
+            appendSidebarEntries(children, page, projectId, week);
+        } catch (error) {
+            delete children.dataset.loaded;
+            console.error('加载文件夹失败:', error);
+            showToast('加载文件夹失败: ' + error.message, 'error');
+            return;
+        }
+    }
+    toggleSidebarFolder(element);
+}
@@ -595,7 +595,7 @@ async function handleUpload() {
                 updateProcessingStatus({
                     pages: result.file_count || 0,
                     tokens: result.token_count || 0,
-                    estimatedTime: formatEstimatedTime(result.estimated_time_seconds || 0),
+                    estimatedTime: formatEstimatedTimeRange(result),
                     status: '文件上传成功，正在分析新一周进展...'
                 });
 
@@ -635,6 +635,7 @@ async function handleUpload() {
 
                         updateSidebarFolderStructure(currentProject, result.week);
                         renderReport(reportData);
+                        watchWeekAnalysis(currentProject, result.week, reportData);
                     }
                 }
                 // 返回报告页面
@@ -701,7 +702,7 @@ async function handleUpload() {
             updateProcessingStatus({
                 pages: result.file_count || 0,
                 tokens: result.token_count || 0,
-                estimatedTime: formatEstimatedTime(result.estimated_time_seconds || 0),
+                estimatedTime: formatEstimatedTimeRange(result),
                 status: '文件上传成功，正在后台分析...'
             });
 
@@ -66,6 +66,17 @@ function formatEstimatedTime(seconds) {
     }
 }
 
+// 格式化预计时间及区间（后端返回置信区间时显示范围）
+function formatEstimatedTimeRange(result) {
+    const estimate = formatEstimatedTime(result.estimated_time_seconds || 0);
+    const lower = result.estimated_time_lower_seconds;
+    const upper = result.estimated_time_upper_seconds;
+    if (lower == null || upper == null || upper <= lower) {
+        return estimate;
+    }
+    return `${estimate}（${formatEstimatedTime(lower)} - ${formatEstimatedTime(upper)}）`;
+}
+
 // 清理Notion文件名，去掉ID部分
 function cleanNotionFilename(filename) {
     // 去掉.html后缀
@@ -1,5 +1,8 @@
 // 渲染报告
 function renderReport(data) {
+    // 重新渲染后页面下标与服务端一致，恢复自动保存
+    inlineAutosaveEnabled = true;
+
     // 渲染"做了什么" (达成事项)
     const completedTasksContainer = document.getElementById('completed-tasks');
     const completedCountContainer = document.getElementById('completed-count');
@@ -202,6 +205,44 @@ function renderReport(data) {
     }
 }
 
+// 正在订阅的分析进度
+let analysisSource = null;
+
+// 订阅当前周的分析进度：每生成一个分区就重新渲染，分析结束后加载最终结果
+function watchWeekAnalysis(projectId, week, initialData) {
+    if (analysisSource) {
+        analysisSource.close();
+        analysisSource = null;
+    }
+
+    const partial = { ...(initialData || {}) };
+    const isCurrentView = () => currentProject === projectId && currentWeek === week;
+
+    analysisSource = subscribeWeekAnalysis(projectId, week, {
+        onSection: (name, value) => {
+            partial[name] = value;
+            // 编辑模式下不覆盖用户正在编辑的内容
+            if (isCurrentView() && !isEditMode) {
+                renderReport(partial);
+            }
+        },
+        onDone: async (result) => {
+            analysisSource = null;
+            if (result.status === 'idle' || !isCurrentView()) {
+                return;
+            }
+            if (result.status === 'failed') {
+                showToast('周报分析失败: ' + (result.error || '未知错误'), 'error');
+            }
+            const reportData = await loadWeekReport(projectId, week);
+            if (reportData && isCurrentView() && !isEditMode) {
+                renderReport(reportData);
+                await loadProjects();
+            }
+        }
+    });
+}
+
 // 改变周数
 async function changeWeek(direction) {
     console.log('Changing week, direction:', direction);
@@ -241,6 +282,7 @@ async function changeWeek(direction) {
         }
 
         renderReport(reportData);
+        watchWeekAnalysis(currentProject, currentWeek, reportData);
 
         // 更新侧边栏文件夹结构
         updateSidebarFolderStructure(currentProject, currentWeek);
@@ -690,6 +732,10 @@ function handleAddRow(e) {
             break;
     }
 
+    if (newRow) {
+        newRow.setAttribute('data-unsaved', 'true');
+    }
+
     // 重新绑定编辑事件到新添加的行（必须在编辑模式下）
     if (isEditMode && newRow) {
         const editableElements = newRow.querySelectorAll('.editable-text');
@@ -772,6 +818,7 @@ function disableInlineEditing() {
 // 处理编辑相关事件
 function handleEditStart(e) {
     if (!isEditMode) return;
+    e.target.dataset.originalValue = e.target.textContent.trim();
     const row = e.target.closest('.editable-row');
     if (row) {
         const allRows = document.querySelectorAll('.editable-row');
@@ -780,8 +827,31 @@ function handleEditStart(e) {
     }
 }
 
+// 删除过行之后页面上的下标与服务端不再对应，改为只能通过"保存修改"整体保存
+let inlineAutosaveEnabled = true;
+
 function handleEditEnd(e) {
-    // 可以在这里添加保存逻辑
+    // 单个字段修改后自动保存（排队合并后以 JSON Patch 发送）
+    const element = e.target;
+    const originalValue = element.dataset.originalValue;
+    delete element.dataset.originalValue;
+    if (!isEditMode || !inlineAutosaveEnabled || !currentProject || originalValue === undefined) return;
+    // 新添加的行等整体保存时再写入
+    if (element.closest('.editable-row[data-unsaved]')) return;
+
+    let value = element.textContent.trim();
+    if (value === originalValue) return;
+
+    const dataPath = element.getAttribute('data-path');
+    const dataIndex = element.getAttribute('data-index');
+    const dataField = element.getAttribute('data-field');
+    if (!dataPath || dataIndex === null || !dataField) return;
+
+    if (dataField === 'priority' && !/^P[0-2]$/.test(value)) {
+        value = 'P1';
+    }
+    const path = dataField === 'item' ? `/${dataPath}/${dataIndex}` : `/${dataPath}/${dataIndex}/${dataField}`;
+    queueWeekPatch(currentProject, currentWeek, [{ op: 'replace', path, value }]);
 }
 
 function handleInput(e) {
@@ -818,6 +888,9 @@ function handleDeleteRow(e) {
     if (dataPath && dataIndex !== undefined) {
         // 这里可以添加删除逻辑，现在只是从DOM中移除
         row.remove();
+        if (!row.hasAttribute('data-unsaved')) {
+            inlineAutosaveEnabled = false;
+        }
         console.log(`Deleted ${dataPath}[${dataIndex}]`);
     }
 }
@@ -120,6 +120,7 @@ if [ "$IS_DOCKER" = true ]; then
 else
     echo "   访问地址: http://localhost:${PORT:-8000}"
 fi
+echo "   worker 进程数: ${WEB_CONCURRENCY:-1}（设置 WEB_CONCURRENCY 调整）"
 echo ""
 echo "按 Ctrl+C 停止服务器"
 echo "================================="